@@ -3,13 +3,16 @@
 from __future__ import annotations
 
 import sys
+from multiprocessing import freeze_support
 
-from PyQt6.QtWidgets import QApplication
 
-from app.gui.main_window import MainWindow
+def main() -> None:
+    # Imported here: spawned CV worker processes (app.scoring.ml_cv)
+    # re-import this module and must not pull in the GUI
+    from PyQt6.QtWidgets import QApplication
 
+    from app.gui.main_window import MainWindow
 
-def main() -> None:
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     window = MainWindow()
@@ -18,4 +21,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    freeze_support()
     main()
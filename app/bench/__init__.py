@@ -0,0 +1 @@
+"""Ad-hoc benchmarks: ``python -m app.bench.<name>``."""
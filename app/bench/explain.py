@@ -0,0 +1,60 @@
+"""Benchmark the SHAP backends of app.scoring.ml_explain on the current DB.
+
+    python -m app.bench.explain [db_path] [--repeat N]
+
+Loads the active registry model and the feature matrix, then
+times each backend over the whole matrix and reports the largest
+difference between their values.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.db.connection import DB_PATH, get_connection
+from app.scoring.feature_store import get_feature_matrix
+from app.scoring.ml_explain import BACKENDS
+from app.scoring.ml_features import FEATURE_COLS
+from app.scoring.model_registry import ModelRegistry
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("db_path", nargs="?", default=str(DB_PATH))
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    registry = ModelRegistry()
+    registry.import_legacy()
+    version = registry.active_version()
+    if version is None:
+        raise SystemExit("保存済みモデルがありません。先に学習してください。")
+    booster = registry.booster(version)
+    conn = get_connection(args.db_path)
+    X = get_feature_matrix(conn)[FEATURE_COLS]
+    print(f"matrix: {X.shape[0]} rows × {X.shape[1]} features")
+
+    results = {}
+    for name, backend in BACKENDS.items():
+        t0 = time.perf_counter()
+        backend(booster, X)  # first call includes imports / setup
+        first = time.perf_counter() - t0
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            values, base = backend(booster, X)
+            times.append(time.perf_counter() - t0)
+        results[name] = (values, base)
+        print(f"{name:>7}: first {first:.3f}s  best {min(times):.3f}s  "
+              f"(base={base:+.4f})")
+
+    (a, base_a), (b, base_b) = results.values()
+    print(f"max |Δ| values: {np.abs(np.asarray(a) - np.asarray(b)).max():.2e}  "
+          f"base: {abs(base_a - base_b):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the start-up import time of the GUI.
+
+    python -m app.bench.startup [--repeat N] [--top K]
+
+Imports ``app.gui.main_window`` in fresh interpreters with
+``-X importtime``, reports the best total and the slowest top-level
+packages, and exits non-zero if one of the deferred stacks
+(lightgbm, shap, sklearn, matplotlib, scipy) is imported at start-up.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+
+TARGET = "app.gui.main_window"
+DEFERRED = ("lightgbm", "shap", "sklearn", "matplotlib", "scipy")
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """{module: cumulative µs} from one ``-X importtime`` run."""
+    env = {**os.environ, "QT_QPA_PLATFORM": os.environ.get(
+        "QT_QPA_PLATFORM", "offscreen")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    runs = [_import_times(TARGET) for _ in range(args.repeat)]
+    best = min(runs, key=lambda t: t[TARGET])
+    print(f"import {TARGET}: best {best[TARGET] / 1e6:.3f}s  "
+          f"(runs: {', '.join(f'{t[TARGET] / 1e6:.3f}' for t in runs)})")
+
+    roots: dict[str, int] = {}
+    for name, us in best.items():
+        root = name.split(".")[0]
+        roots[root] = max(roots.get(root, 0), us)
+    for root, us in sorted(roots.items(), key=lambda kv: -kv[1])[1:args.top + 1]:
+        print(f"  {root:<24} {us / 1e3:8.1f} ms")
+
+    loaded = [m for m in DEFERRED if m in roots]
+    if loaded:
+        raise SystemExit(f"start-up imports deferred modules: {', '.join(loaded)}")
+    print(f"deferred: {', '.join(DEFERRED)} — not imported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Integer day-number shadow columns for ISO TEXT dates.
+
+Every record date has a ``<column>_day`` twin holding days since
+1970-01-01, filled by one set-based UPDATE per column after loading.
+Range filters, joins and interval arithmetic use these integers (in
+SQLite or as NumPy arrays) instead of comparing or parsing strings.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+
+import numpy as np
+
+# julianday('1970-01-01')
+_JULIAN_EPOCH = 2440587.5
+_EPOCH = date(1970, 1, 1)
+
+# (table, TEXT date column); the shadow column is f"{column}_day"
+DATE_COLUMNS: list[tuple[str, str]] = [
+    ("sows", "birth_date"),
+    ("piglets", "birth_date"),
+    ("breeding_records", "breeding_date"),
+    ("farrowing_records", "farrowing_date"),
+    ("farrowing_records", "weaning_date"),
+    ("death_records", "event_date"),
+    ("cull_records", "event_date"),
+]
+
+
+def to_day(d: date | str | None) -> int | None:
+    """date / ISO string → day number (None passes through)."""
+    if d is None:
+        return None
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    return (d - _EPOCH).days
+
+
+def from_days(days) -> np.ndarray:
+    """Array of day numbers → ISO date strings (vectorised)."""
+    d = np.asarray(days, dtype=np.int64).astype("timedelta64[D]")
+    return (np.datetime64(_EPOCH, "D") + d).astype(str)
+
+
+def fill_day_columns(conn: sqlite3.Connection) -> None:
+    """Recompute every ``*_day`` column from its TEXT date."""
+    for table, column in DATE_COLUMNS:
+        conn.execute(
+            f"UPDATE {table} SET {column}_day = "
+            f"CAST(julianday({column}) - {_JULIAN_EPOCH} AS INTEGER)"
+        )
+    conn.commit()
+
+
+def needs_day_fill(conn: sqlite3.Connection) -> bool:
+    """True when some date has no day number yet (DBs loaded before them)."""
+    for table, column in DATE_COLUMNS:
+        if conn.execute(
+            f"SELECT 1 FROM {table} WHERE julianday({column}) IS NOT NULL "
+            f"AND {column}_day IS NULL LIMIT 1"
+        ).fetchone():
+            return True
+    return False
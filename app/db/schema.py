@@ -14,7 +14,8 @@ CREATE TABLE IF NOT EXISTS sows (
     rank            TEXT,
     teat_score      INTEGER,
     remarks         TEXT,
-    status          TEXT NOT NULL DEFAULT 'active'
+    status          TEXT NOT NULL DEFAULT 'active',
+    birth_date_day  INTEGER                 -- days since 1970-01-01 (app.db.days)
 );
 CREATE INDEX IF NOT EXISTS idx_sows_dam    ON sows(dam_id);
 CREATE INDEX IF NOT EXISTS idx_sows_status ON sows(status);
@@ -30,7 +31,10 @@ CREATE TABLE IF NOT EXISTS piglets (
     shipment_date   TEXT,
     dam_id          TEXT REFERENCES sows(individual_id),
     sire_id         TEXT,
-    shipment_age    INTEGER
+    shipment_age    INTEGER,
+    farrowing_id    INTEGER,                -- litter, linked by app.etl.litters
+    parity          INTEGER,
+    birth_date_day  INTEGER
 );
 CREATE INDEX IF NOT EXISTS idx_piglets_dam ON piglets(dam_id);
 
@@ -45,6 +49,7 @@ CREATE TABLE IF NOT EXISTS breeding_records (
     return_to_estrus TEXT,
     age_days        INTEGER,
     status          TEXT,
+    breeding_date_day INTEGER,
     UNIQUE(individual_id, parity)
 );
 CREATE INDEX IF NOT EXISTS idx_breed_sow ON breeding_records(individual_id);
@@ -65,6 +70,8 @@ CREATE TABLE IF NOT EXISTS farrowing_records (
     mortality_rate  REAL,
     nursing_days    INTEGER,
     farrowing_interval INTEGER,
+    farrowing_date_day INTEGER,
+    weaning_date_day INTEGER,
     UNIQUE(individual_id, parity)
 );
 CREATE INDEX IF NOT EXISTS idx_farrow_sow ON farrowing_records(individual_id);
@@ -75,7 +82,8 @@ CREATE TABLE IF NOT EXISTS death_records (
     event_date      TEXT,
     cause           TEXT,
     age_days        INTEGER,
-    parity          INTEGER
+    parity          INTEGER,
+    event_date_day  INTEGER
 );
 CREATE INDEX IF NOT EXISTS idx_death_sow ON death_records(individual_id);
 
@@ -85,10 +93,61 @@ CREATE TABLE IF NOT EXISTS cull_records (
     event_date      TEXT,
     cause           TEXT,
     non_productive_days INTEGER,
-    parity          INTEGER
+    parity          INTEGER,
+    event_date_day  INTEGER
 );
 CREATE INDEX IF NOT EXISTS idx_cull_sow ON cull_records(individual_id);
 
+-- Per-sow timeline built by ETL (app.etl.events). WITHOUT ROWID makes the
+-- primary key the clustered, covering index: one range scan per sow.
+CREATE TABLE IF NOT EXISTS sow_events (
+    individual_id   TEXT NOT NULL,
+    event_date      TEXT NOT NULL,
+    event_type      TEXT NOT NULL,
+    seq             INTEGER NOT NULL,       -- source row id (tie-break)
+    parity          INTEGER,
+    value1          INTEGER,
+    value2          INTEGER,
+    value3          INTEGER,
+    detail          TEXT,
+    PRIMARY KEY (individual_id, event_date, event_type, seq)
+) WITHOUT ROWID;
+
+-- Monthly herd rollups (app.etl.rollups). Only additive counts / sums are
+-- stored so new records fold in with an UPSERT delta; averages and rates
+-- are derived on read.
+CREATE TABLE IF NOT EXISTS herd_monthly (
+    month           TEXT PRIMARY KEY,       -- 'YYYY-MM'
+    farrowings      INTEGER NOT NULL DEFAULT 0,
+    total_born      INTEGER NOT NULL DEFAULT 0,
+    born_alive      INTEGER NOT NULL DEFAULT 0,
+    stillborn       INTEGER NOT NULL DEFAULT 0,
+    mummified       INTEGER NOT NULL DEFAULT 0,
+    weanings        INTEGER NOT NULL DEFAULT 0,   -- by weaning month
+    weaned          INTEGER NOT NULL DEFAULT 0,
+    piglets         INTEGER NOT NULL DEFAULT 0,   -- by birth month
+    w_promoted      INTEGER NOT NULL DEFAULT 0,   -- of w_total
+    ps_shipped      INTEGER NOT NULL DEFAULT 0,   -- of l_total
+    deaths          INTEGER NOT NULL DEFAULT 0,
+    culls           INTEGER NOT NULL DEFAULT 0,
+    w_total         INTEGER NOT NULL DEFAULT 0,   -- W-rank piglets
+    l_total         INTEGER NOT NULL DEFAULT 0    -- A/B/C-rank piglets
+);
+
+CREATE TABLE IF NOT EXISTS herd_monthly_causes (
+    month           TEXT NOT NULL,
+    kind            TEXT NOT NULL,          -- 'death' / 'cull'
+    cause           TEXT NOT NULL,
+    n               INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, kind, cause)
+) WITHOUT ROWID;
+
+-- Highest source rowid already folded into the rollups, per source table
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    source          TEXT PRIMARY KEY,
+    last_rowid      INTEGER NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS parity_scores (
     individual_id   TEXT NOT NULL REFERENCES sows(individual_id),
     parity          INTEGER NOT NULL,
@@ -105,6 +164,15 @@ CREATE TABLE IF NOT EXISTS parity_scores (
     PRIMARY KEY (individual_id, parity)
 );
 
+CREATE TABLE IF NOT EXISTS parity_stats (
+    parity          INTEGER NOT NULL,
+    metric          TEXT NOT NULL,
+    count           INTEGER NOT NULL,
+    mean            REAL NOT NULL,
+    m2              REAL NOT NULL,
+    PRIMARY KEY (parity, metric)
+);
+
 CREATE TABLE IF NOT EXISTS sow_scores (
     individual_id   TEXT PRIMARY KEY REFERENCES sows(individual_id),
     peak            REAL,
@@ -113,30 +181,265 @@ CREATE TABLE IF NOT EXISTS sow_scores (
     offspring_quality REAL,
     total_score     REAL,
     rank_all        INTEGER,
-    rank_active     INTEGER
+    rank_active     INTEGER,
+    z_w_rate        REAL,
+    z_ps_rate       REAL
+);
+
+CREATE TABLE IF NOT EXISTS score_percentiles (
+    population      TEXT NOT NULL,          -- 'all' / 'active'
+    top_fraction    REAL NOT NULL,          -- 0.10 = top 10%
+    threshold       REAL NOT NULL,
+    n_scored        INTEGER NOT NULL,
+    PRIMARY KEY (population, top_fraction)
+);
+
+CREATE TABLE IF NOT EXISTS sow_rank_intervals (
+    individual_id   TEXT PRIMARY KEY REFERENCES sows(individual_id),
+    rank_q05        INTEGER,
+    rank_q50        INTEGER,
+    rank_q95        INTEGER,
+    top10_prob      REAL,
+    n_boot          INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS lineage_members (
+    individual_id   TEXT PRIMARY KEY REFERENCES sows(individual_id),
+    root_id         TEXT NOT NULL,
+    generation      INTEGER NOT NULL,
+    has_active      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lineage_members_root ON lineage_members(root_id);
+
+CREATE TABLE IF NOT EXISTS lineage_scores (
+    view            TEXT NOT NULL,          -- 'all' / 'active'
+    root_id         TEXT NOT NULL,
+    lineage_score   REAL,
+    avg_score       REAL,
+    active_count    INTEGER,
+    top_count       INTEGER,
+    members         INTEGER,
+    PRIMARY KEY (view, root_id)
+);
+
+CREATE TABLE IF NOT EXISTS inbreeding_coefficients (
+    animal_id       TEXT PRIMARY KEY,
+    animal_type     TEXT NOT NULL,          -- 'sow' / 'piglet' / 'sire'
+    sire_id         TEXT,
+    dam_id          TEXT,
+    inbreeding      REAL NOT NULL,          -- F
+    mendelian_var   REAL NOT NULL           -- D (A = TDT')
+);
+
+CREATE TABLE IF NOT EXISTS breeding_values (
+    animal_id       TEXT PRIMARY KEY,
+    animal_type     TEXT NOT NULL,          -- 'sow' / 'piglet' / 'sire'
+    ebv_born_alive  REAL,
+    ebv_weaned      REAL,
+    n_records       INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sire_scores (
+    sire_id         TEXT PRIMARY KEY,
+    n_daughters     INTEGER,
+    n_daughters_scored INTEGER,
+    daughter_avg_score REAL,
+    n_litters       INTEGER,                -- litters sired (breeding ⋈ farrowing)
+    avg_born_alive  REAL,
+    litter_z        REAL,                   -- parity-adjusted born_alive z
+    n_piglets       INTEGER,
+    w_rate          REAL,
+    ps_rate         REAL,
+    offspring_z     REAL,
+    ebv_born_alive  REAL,
+    ebv_weaned      REAL,
+    sire_score      REAL,
+    rank            INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS reproductive_kpis (
+    individual_id   TEXT NOT NULL REFERENCES sows(individual_id),
+    parity          INTEGER NOT NULL,
+    breeding_date   TEXT,
+    wean_to_service_days INTEGER,
+    gestation_days  INTEGER,
+    conceived       INTEGER NOT NULL,
+    repeat_service  INTEGER NOT NULL,
+    non_productive_days INTEGER,
+    PRIMARY KEY (individual_id, parity)
 );
 
+CREATE TABLE IF NOT EXISTS sow_kpis (
+    individual_id   TEXT PRIMARY KEY REFERENCES sows(individual_id),
+    n_services      INTEGER,
+    n_farrowed      INTEGER,
+    repeat_count    INTEGER,
+    avg_wean_to_service REAL,
+    avg_gestation   REAL,
+    conception_rate REAL,
+    repeat_rate     REAL,
+    cull_npd        INTEGER,
+    npd_total       INTEGER
+);
+
+-- Kept across ETL runs; a pair is valid while both ancestry stamps match
+-- (app.scoring.mating)
+CREATE TABLE IF NOT EXISTS kinship_cache (
+    sow_id          TEXT NOT NULL,
+    sire_id         TEXT NOT NULL,
+    kinship         REAL NOT NULL,          -- = offspring F
+    sow_stamp       TEXT,                   -- Pedigree.ancestry_stamps
+    sire_stamp      TEXT,
+    PRIMARY KEY (sow_id, sire_id)
+);
+
+CREATE TABLE IF NOT EXISTS mating_plan (
+    individual_id   TEXT NOT NULL,
+    sire_id         TEXT NOT NULL,
+    rank            INTEGER NOT NULL,
+    merit           REAL,
+    expected_ebv    REAL,
+    offspring_inbreeding REAL,
+    over_limit      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (individual_id, sire_id)
+);
+
+CREATE TABLE IF NOT EXISTS app_meta (
+    key             TEXT PRIMARY KEY,
+    value           TEXT
+);
+
+-- Persisted ML feature matrix (app.scoring.feature_store): one float64
+-- block (parities × columns) per sow, valid for the key in app_meta.
+-- Not truncated by ETL: changed sows are patched in place.
+CREATE TABLE IF NOT EXISTS ml_features (
+    individual_id   TEXT PRIMARY KEY,
+    n_rows          INTEGER NOT NULL,
+    data            BLOB NOT NULL
+) WITHOUT ROWID;
+
 CREATE TABLE IF NOT EXISTS ml_predictions (
     individual_id   TEXT NOT NULL,
     parity          INTEGER NOT NULL,
     pred_excellent_prob REAL,
-    shap_json       TEXT,
+    shap_json       TEXT,                   -- legacy; superseded by shap_values
     model_version   TEXT,
     predicted_at    TEXT,
+    shap_values     BLOB,                   -- float32[], order in ml_model_meta
     PRIMARY KEY (individual_id, parity)
 );
+
+-- Per model version: feature order of ml_predictions.shap_values
+CREATE TABLE IF NOT EXISTS ml_model_meta (
+    model_version   TEXT PRIMARY KEY,
+    feature_cols    TEXT NOT NULL,          -- JSON list
+    base_value      REAL,
+    created_at      TEXT,
+    feature_key     TEXT                    -- feature store key predicted on
+);
+
+-- Predictions of recent model versions; ml_predictions is a copy of the
+-- active version's rows, so switching back needs no re-prediction
+CREATE TABLE IF NOT EXISTS ml_prediction_cache (
+    model_version   TEXT NOT NULL,
+    individual_id   TEXT NOT NULL,
+    parity          INTEGER NOT NULL,
+    pred_excellent_prob REAL,
+    shap_values     BLOB,
+    PRIMARY KEY (model_version, individual_id, parity)
+) WITHOUT ROWID;
+"""
+
+
+# Columns added after a table was first released: (table, column, type).
+# CREATE TABLE IF NOT EXISTS leaves existing DBs untouched, so these are
+# ALTERed in on start-up.
+ADDED_COLUMNS: list[tuple[str, str, str]] = [
+    ("sow_scores", "z_w_rate", "REAL"),
+    ("sow_scores", "z_ps_rate", "REAL"),
+    ("piglets", "farrowing_id", "INTEGER"),
+    ("piglets", "parity", "INTEGER"),
+    ("sows", "birth_date_day", "INTEGER"),
+    ("piglets", "birth_date_day", "INTEGER"),
+    ("breeding_records", "breeding_date_day", "INTEGER"),
+    ("farrowing_records", "farrowing_date_day", "INTEGER"),
+    ("farrowing_records", "weaning_date_day", "INTEGER"),
+    ("death_records", "event_date_day", "INTEGER"),
+    ("cull_records", "event_date_day", "INTEGER"),
+    ("ml_predictions", "shap_values", "BLOB"),
+    ("ml_model_meta", "feature_key", "TEXT"),
+    ("herd_monthly", "w_total", "INTEGER NOT NULL DEFAULT 0"),
+    ("herd_monthly", "l_total", "INTEGER NOT NULL DEFAULT 0"),
+    ("kinship_cache", "sow_stamp", "TEXT"),
+    ("kinship_cache", "sire_stamp", "TEXT"),
+]
+
+# Indexes on ADDED_COLUMNS; run after _ensure_columns.
+POST_MIGRATION_DDL = """
+CREATE INDEX IF NOT EXISTS idx_piglets_litter ON piglets(dam_id, parity);
+CREATE INDEX IF NOT EXISTS idx_piglets_farrowing ON piglets(farrowing_id);
+CREATE INDEX IF NOT EXISTS idx_sows_birth_day ON sows(birth_date_day);
+CREATE INDEX IF NOT EXISTS idx_piglets_dam_day ON piglets(dam_id, birth_date_day);
+CREATE INDEX IF NOT EXISTS idx_breed_sow_day
+    ON breeding_records(individual_id, breeding_date_day);
+CREATE INDEX IF NOT EXISTS idx_farrow_sow_day
+    ON farrowing_records(individual_id, farrowing_date_day);
+CREATE INDEX IF NOT EXISTS idx_cull_sow_day ON cull_records(individual_id, event_date_day);
 """
 
 
+def _ensure_columns(conn: sqlite3.Connection) -> None:
+    existing: dict[str, set[str]] = {}
+    for table, column, decl in ADDED_COLUMNS:
+        if table not in existing:
+            existing[table] = {
+                r[1] for r in conn.execute(f"PRAGMA table_info({table})")
+            }
+        if column not in existing[table]:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+            existing[table].add(column)
+    conn.commit()
+
+
 def init_db(conn: sqlite3.Connection) -> None:
     conn.executescript(DDL)
+    _ensure_columns(conn)
+    conn.executescript(POST_MIGRATION_DDL)
+
+
+def get_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def data_generation(conn: sqlite3.Connection) -> int:
+    """Counter bumped whenever record or score tables are rewritten."""
+    return int(get_meta(conn, "data_generation") or 0)
+
+
+def bump_data_generation(conn: sqlite3.Connection) -> int:
+    gen = data_generation(conn) + 1
+    set_meta(conn, "data_generation", str(gen))
+    conn.commit()
+    return gen
 
 
 def reset_data_tables(conn: sqlite3.Connection) -> None:
     """Truncate all data tables for idempotent ETL."""
     tables = [
-        "sow_scores", "parity_scores",
-        "cull_records", "death_records",
+        "sow_kpis", "reproductive_kpis",
+        "mating_plan",
+        "sire_scores", "breeding_values", "inbreeding_coefficients",
+        "lineage_scores", "lineage_members",
+        "sow_rank_intervals", "score_percentiles",
+        "sow_scores", "parity_scores", "parity_stats",
+        "rollup_watermarks", "herd_monthly_causes", "herd_monthly",
+        "sow_events", "cull_records", "death_records",
         "farrowing_records", "breeding_records",
         "piglets", "sows",
     ]
@@ -0,0 +1,110 @@
+"""Unified per-sow event timeline (sow_events).
+
+Every dated record of a sow is copied into one table clustered on
+(individual_id, event_date), so a full history is a single range scan.
+Payload columns per event_type:
+
+    event_type  parity  value1       value2      value3     detail
+    birth       -       -            -           -          dam / sire
+    service     ✓       repeat(0/1)  -           -          sire
+    farrowing   ✓       total_born   born_alive  stillborn  -
+    weaning     ✓       weaned       foster      -          -
+    piglets     ✓       piglets      W繰上げ     PS出荷     -   (per litter)
+    death       ✓       -            -           -          cause
+    cull        ✓       npd          -           -          cause
+
+``piglets`` rows group the dam's piglets by linked litter (see
+``app.etl.litters``) and are dated on the farrowing; piglets that matched
+no litter are grouped by their own birth date.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+EVENT_LABELS = {
+    "birth": "出生",
+    "service": "種付",
+    "farrowing": "分娩",
+    "weaning": "離乳",
+    "piglets": "子豚",
+    "death": "死亡",
+    "cull": "廃豚",
+}
+
+_INSERTS = [
+    """INSERT OR REPLACE INTO sow_events
+       (individual_id, event_date, event_type, seq, parity,
+        value1, value2, value3, detail)
+       SELECT individual_id, birth_date, 'birth', 0, NULL,
+              NULL, NULL, NULL,
+              COALESCE(dam_id, '') || ' / ' || COALESCE(sire_id, '')
+       FROM sows WHERE birth_date IS NOT NULL""",
+    """INSERT OR REPLACE INTO sow_events
+       (individual_id, event_date, event_type, seq, parity,
+        value1, value2, value3, detail)
+       SELECT individual_id, breeding_date, 'service', id, parity,
+              CASE WHEN TRIM(COALESCE(return_to_estrus, '')) != ''
+                   THEN 1 ELSE 0 END, NULL, NULL,
+              COALESCE(NULLIF(sire_first, ''), sire_second)
+       FROM breeding_records WHERE breeding_date IS NOT NULL""",
+    """INSERT OR REPLACE INTO sow_events
+       (individual_id, event_date, event_type, seq, parity,
+        value1, value2, value3, detail)
+       SELECT individual_id, farrowing_date, 'farrowing', id, parity,
+              total_born, born_alive, stillborn, NULL
+       FROM farrowing_records WHERE farrowing_date IS NOT NULL""",
+    """INSERT OR REPLACE INTO sow_events
+       (individual_id, event_date, event_type, seq, parity,
+        value1, value2, value3, detail)
+       SELECT individual_id, weaning_date, 'weaning', id, parity,
+              weaned, foster, NULL, NULL
+       FROM farrowing_records WHERE weaning_date IS NOT NULL""",
+    """INSERT OR REPLACE INTO sow_events
+       (individual_id, event_date, event_type, seq, parity,
+        value1, value2, value3, detail)
+       SELECT p.dam_id, COALESCE(fr.farrowing_date, MIN(p.birth_date)),
+              'piglets', COALESCE(p.farrowing_id, 0), p.parity,
+              COUNT(*),
+              SUM(CASE WHEN p.ps_shipment = 'W' THEN 1 ELSE 0 END),
+              SUM(CASE WHEN p.ps_shipment = '○' THEN 1 ELSE 0 END),
+              NULL
+       FROM piglets p
+       LEFT JOIN farrowing_records fr ON p.farrowing_id = fr.id
+       WHERE p.dam_id IS NOT NULL AND p.birth_date IS NOT NULL
+       GROUP BY p.dam_id, COALESCE(p.farrowing_id, p.birth_date)""",
+    """INSERT OR REPLACE INTO sow_events
+       (individual_id, event_date, event_type, seq, parity,
+        value1, value2, value3, detail)
+       SELECT individual_id, event_date, 'death', id, parity,
+              NULL, NULL, NULL, cause
+       FROM death_records WHERE event_date IS NOT NULL""",
+    """INSERT OR REPLACE INTO sow_events
+       (individual_id, event_date, event_type, seq, parity,
+        value1, value2, value3, detail)
+       SELECT individual_id, event_date, 'cull', id, parity,
+              non_productive_days, NULL, NULL, cause
+       FROM cull_records WHERE event_date IS NOT NULL""",
+]
+
+
+def build_sow_events(conn: sqlite3.Connection) -> int:
+    """Rebuild sow_events from the record tables. Returns the row count."""
+    conn.execute("DELETE FROM sow_events")
+    for sql in _INSERTS:
+        conn.execute(sql)
+    conn.commit()
+    return conn.execute("SELECT count(*) FROM sow_events").fetchone()[0]
+
+
+def load_timeline(conn: sqlite3.Connection,
+                  individual_id: str) -> list[sqlite3.Row]:
+    """All events of one sow in date order (one clustered range scan)."""
+    return conn.execute(
+        """SELECT event_date, event_type, parity,
+                  value1, value2, value3, detail
+           FROM sow_events
+           WHERE individual_id = ?
+           ORDER BY event_date, event_type, seq""",
+        (individual_id,),
+    ).fetchall()
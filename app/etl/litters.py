@@ -0,0 +1,55 @@
+"""Piglet → litter (farrowing record) linkage.
+
+Piglet records only carry the dam and a birth date, which does not always
+equal the dam's recorded farrowing date.  Each piglet is matched once,
+during ETL, to the dam's farrowing nearest to its birth date within
+LITTER_TOLERANCE_DAYS (``merge_asof`` by dam over the integer day columns
+of ``app.db.days``), and
+``piglets.farrowing_id`` / ``piglets.parity`` are stored so consumers can
+use an indexed (dam_id, parity) lookup instead of a text-date join.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pandas as pd
+
+# Litters are ~5 months apart, so a few days of slack cannot cross litters
+LITTER_TOLERANCE_DAYS = 3
+
+
+def link_piglets_to_litters(conn: sqlite3.Connection,
+                            tolerance_days: int = LITTER_TOLERANCE_DAYS) -> int:
+    """Fill piglets.farrowing_id / parity. Returns the number linked."""
+    pig = pd.read_sql_query(
+        """SELECT piglet_no, dam_id, birth_date_day FROM piglets
+           WHERE dam_id IS NOT NULL AND birth_date_day IS NOT NULL
+           ORDER BY birth_date_day""",
+        conn,
+    )
+    fr = pd.read_sql_query(
+        """SELECT id AS farrowing_id, individual_id AS dam_id, parity,
+                  farrowing_date_day
+           FROM farrowing_records WHERE farrowing_date_day IS NOT NULL
+           ORDER BY farrowing_date_day""",
+        conn,
+    )
+    conn.execute("UPDATE piglets SET farrowing_id = NULL, parity = NULL")
+    if pig.empty or fr.empty:
+        conn.commit()
+        return 0
+
+    linked = pd.merge_asof(
+        pig, fr, left_on="birth_date_day", right_on="farrowing_date_day",
+        by="dam_id", direction="nearest", tolerance=tolerance_days,
+    ).dropna(subset=["farrowing_id"])
+
+    conn.executemany(
+        "UPDATE piglets SET farrowing_id = ?, parity = ? WHERE piglet_no = ?",
+        zip(linked["farrowing_id"].astype(int).tolist(),
+            linked["parity"].astype(int).tolist(),
+            linked["piglet_no"].tolist()),
+    )
+    conn.commit()
+    return len(linked)
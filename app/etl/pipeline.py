@@ -5,7 +5,10 @@ from __future__ import annotations
 import sqlite3
 from datetime import date, timedelta
 
-from app.db.schema import init_db, reset_data_tables
+from app.db.days import fill_day_columns, to_day
+from app.db.schema import bump_data_generation, init_db, reset_data_tables
+from app.etl.events import build_sow_events
+from app.etl.litters import link_piglets_to_litters
 from app.etl.loaders import (
     load_breeding,
     load_culls,
@@ -13,6 +16,8 @@ from app.etl.loaders import (
     load_farrowing,
     load_piglets,
 )
+from app.etl.rollups import update_herd_rollups
+from app.scoring.feature_store import invalidate, mark_changed, sow_fingerprints
 
 
 def _collect_sow_ids(*record_lists: list[dict]) -> set[str]:
@@ -65,12 +70,12 @@ def _update_sow_status(conn: sqlite3.Connection,
 def _mark_nonproductive_sows(conn: sqlite3.Connection) -> int:
     """Mark sows as inactive: 18+ months old with 0 total births.
     Returns count of sows updated."""
-    threshold = (date.today() - timedelta(days=548)).isoformat()  # ~18 months
+    threshold = to_day(date.today() - timedelta(days=548))  # ~18 months
     cur = conn.execute(
         """UPDATE sows SET status='inactive'
            WHERE status='active'
-             AND birth_date IS NOT NULL
-             AND birth_date <= ?
+             AND birth_date_day IS NOT NULL
+             AND birth_date_day <= ?
              AND individual_id IN (
                SELECT s.individual_id FROM sows s
                LEFT JOIN (
@@ -119,6 +124,7 @@ def run_etl(conn: sqlite3.Connection,
             progress_cb=None) -> dict[str, int]:
     """Execute full ETL pipeline. Returns row counts per table."""
     init_db(conn)
+    before = sow_fingerprints(conn)
     reset_data_tables(conn)
 
     def _progress(msg: str):
@@ -156,11 +162,30 @@ def run_etl(conn: sqlite3.Connection,
     _progress("ステータス更新...")
     _update_sow_status(conn, deaths, culls)
     _enrich_sow_parents(conn, piglets)
+    fill_day_columns(conn)
     n_inactive = _mark_nonproductive_sows(conn)
     if n_inactive:
         _progress(f"未生産18ヶ月超: {n_inactive}頭を稼働外に変更")
     conn.commit()
 
+    _progress("子豚-分娩紐付け...")
+    counts["piglets_linked"] = link_piglets_to_litters(conn)
+
+    _progress("イベント履歴構築...")
+    counts["events"] = build_sow_events(conn)
+
+    _progress("月次集計更新...")
+    update_herd_rollups(conn)
+
+    # Only sows whose records changed need their ML features rebuilt
+    after = sow_fingerprints(conn)
+    if before:
+        mark_changed(conn, [sid for sid in before.keys() | after.keys()
+                            if before.get(sid) != after.get(sid)])
+    else:
+        invalidate(conn)
+
     counts["sows"] = conn.execute("SELECT count(*) FROM sows").fetchone()[0]
+    bump_data_generation(conn)
     _progress("ETL完了")
     return counts
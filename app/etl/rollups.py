@@ -0,0 +1,169 @@
+"""Monthly herd KPI rollups (herd_monthly / herd_monthly_causes).
+
+The rollup tables hold only additive counts and sums per calendar month,
+so records that land after the last update are folded in as deltas:
+
+    INSERT ... SELECT <month>, COUNT(*), SUM(...) FROM <source>
+    WHERE rowid > <watermark> GROUP BY <month>
+    ON CONFLICT(month) DO UPDATE SET col = col + excluded.col
+
+``rollup_watermarks`` remembers the highest rowid folded in per source
+table; it is truncated together with the data tables on a full ETL, so
+the next update rebuilds from scratch through the same path.  Rows that
+are edited in place are not re-counted — use ``rebuild_herd_rollups``.
+
+Months:  farrowing metrics by farrowing_date, weaning metrics by
+weaning_date, piglets by birth_date, deaths / culls by event_date.
+
+W rate = promoted W-rank piglets / W-rank piglets and PS rate = shipped
+A/B/C-rank piglets / A/B/C-rank piglets, as in the sow and sire scores.
+``ROLLUP_VERSION`` changes when a column's definition does; stored
+rollups of another version are rebuilt on the next update.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pandas as pd
+
+from app.db.schema import get_meta, set_meta
+
+ROLLUP_VERSION = "2"
+_VERSION_KEY = "herd_rollup_version"
+
+_MONTH = "strftime('%Y-%m', {})"
+
+# (source table, [(target columns, SELECT expressions, date column)])
+_MONTHLY: list[tuple[str, list[tuple[list[str], list[str], str]]]] = [
+    ("farrowing_records", [
+        (["farrowings", "total_born", "born_alive", "stillborn", "mummified"],
+         ["COUNT(*)", "COALESCE(SUM(total_born), 0)",
+          "COALESCE(SUM(born_alive), 0)", "COALESCE(SUM(stillborn), 0)",
+          "COALESCE(SUM(mummified), 0)"],
+         "farrowing_date"),
+        (["weanings", "weaned"],
+         ["COUNT(weaned)", "COALESCE(SUM(weaned), 0)"],
+         "weaning_date"),
+    ]),
+    ("piglets", [
+        (["piglets", "w_total", "w_promoted", "l_total", "ps_shipped"],
+         ["COUNT(*)",
+          "SUM(CASE WHEN rank = 'W' THEN 1 ELSE 0 END)",
+          "SUM(CASE WHEN rank = 'W' AND ps_shipment = 'W' THEN 1 ELSE 0 END)",
+          "SUM(CASE WHEN rank IN ('A','B','C') THEN 1 ELSE 0 END)",
+          "SUM(CASE WHEN rank IN ('A','B','C') AND ps_shipment = '○' "
+          "THEN 1 ELSE 0 END)"],
+         "birth_date"),
+    ]),
+    ("death_records", [(["deaths"], ["COUNT(*)"], "event_date")]),
+    ("cull_records", [(["culls"], ["COUNT(*)"], "event_date")]),
+]
+
+_CAUSES = [("death_records", "death"), ("cull_records", "cull")]
+
+
+def _watermark(conn: sqlite3.Connection, source: str) -> int:
+    row = conn.execute(
+        "SELECT last_rowid FROM rollup_watermarks WHERE source = ?",
+        (source,)).fetchone()
+    return row[0] if row else 0
+
+
+def _fold_monthly(conn: sqlite3.Connection, source: str,
+                  cols: list[str], exprs: list[str], date_col: str,
+                  lo: int, hi: int) -> None:
+    month = _MONTH.format(date_col)
+    conn.execute(
+        f"""INSERT INTO herd_monthly (month, {', '.join(cols)})
+            SELECT {month}, {', '.join(exprs)}
+            FROM {source}
+            WHERE rowid > ? AND rowid <= ? AND {month} IS NOT NULL
+            GROUP BY {month}
+            ON CONFLICT(month) DO UPDATE SET
+            {', '.join(f'{c} = {c} + excluded.{c}' for c in cols)}""",
+        (lo, hi),
+    )
+
+
+def _fold_causes(conn: sqlite3.Connection, source: str, kind: str,
+                 lo: int, hi: int) -> None:
+    month = _MONTH.format("event_date")
+    conn.execute(
+        f"""INSERT INTO herd_monthly_causes (month, kind, cause, n)
+            SELECT {month}, ?, COALESCE(NULLIF(TRIM(cause), ''), '不明'),
+                   COUNT(*)
+            FROM {source}
+            WHERE rowid > ? AND rowid <= ? AND {month} IS NOT NULL
+            GROUP BY 1, 3
+            ON CONFLICT(month, kind, cause) DO UPDATE SET
+            n = n + excluded.n""",
+        (kind, lo, hi),
+    )
+
+
+def update_herd_rollups(conn: sqlite3.Connection) -> int:
+    """Fold source rows added since the last update. Returns rows folded."""
+    if get_meta(conn, _VERSION_KEY) != ROLLUP_VERSION:
+        return rebuild_herd_rollups(conn)
+    folded = 0
+    for source, groups in _MONTHLY:
+        lo = _watermark(conn, source)
+        hi = conn.execute(
+            f"SELECT COALESCE(MAX(rowid), 0) FROM {source}").fetchone()[0]
+        if hi < lo:
+            # Source was truncated without the rollups: start over
+            conn.commit()
+            return rebuild_herd_rollups(conn)
+        if hi == lo:
+            continue
+        for cols, exprs, date_col in groups:
+            _fold_monthly(conn, source, cols, exprs, date_col, lo, hi)
+        for cause_source, kind in _CAUSES:
+            if cause_source == source:
+                _fold_causes(conn, source, kind, lo, hi)
+        folded += conn.execute(
+            f"SELECT count(*) FROM {source} WHERE rowid > ? AND rowid <= ?",
+            (lo, hi)).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO rollup_watermarks (source, last_rowid) "
+            "VALUES (?, ?)", (source, hi))
+    conn.commit()
+    return folded
+
+
+def rebuild_herd_rollups(conn: sqlite3.Connection) -> int:
+    """Drop the rollups and fold every source row again."""
+    conn.execute("DELETE FROM herd_monthly")
+    conn.execute("DELETE FROM herd_monthly_causes")
+    conn.execute("DELETE FROM rollup_watermarks")
+    set_meta(conn, _VERSION_KEY, ROLLUP_VERSION)
+    conn.commit()
+    return update_herd_rollups(conn)
+
+
+def load_herd_monthly(conn: sqlite3.Connection) -> pd.DataFrame:
+    """herd_monthly in month order with per-litter averages and rates."""
+    df = pd.read_sql_query("SELECT * FROM herd_monthly ORDER BY month", conn)
+
+    def _ratio(num: str, den: str) -> pd.Series:
+        return df[num] / df[den].where(df[den] > 0)
+
+    df["avg_born_alive"] = _ratio("born_alive", "farrowings")
+    df["avg_weaned"] = _ratio("weaned", "weanings")
+    df["stillborn_rate"] = _ratio("stillborn", "total_born")
+    df["mummified_rate"] = _ratio("mummified", "total_born")
+    df["w_rate"] = _ratio("w_promoted", "w_total")
+    df["ps_rate"] = _ratio("ps_shipped", "l_total")
+    return df
+
+
+def load_cause_counts(conn: sqlite3.Connection, kind: str,
+                      since_month: str | None = None) -> list[tuple[str, int]]:
+    """[(cause, count)] for 'death' / 'cull', most frequent first."""
+    return [tuple(r) for r in conn.execute(
+        """SELECT cause, SUM(n) AS n FROM herd_monthly_causes
+           WHERE kind = ? AND month >= ?
+           GROUP BY cause ORDER BY n DESC, cause""",
+        (kind, since_month or ""),
+    )]
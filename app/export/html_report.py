@@ -14,6 +14,8 @@ from app.export.svg_pedigree import (
     render_svg,
 )
 from app.export.templates import CSS_TEMPLATE, HTML_TEMPLATE, JS_TEMPLATE
+from app.scoring.lineage import load_lineage_lane
+from app.scoring.percentiles import top_threshold
 
 
 def export_html_report(
@@ -37,11 +39,13 @@ def export_html_report(
         "SELECT count(*) FROM sows WHERE status='active'"
     ).fetchone()[0]
 
-    # Top-10% threshold
-    top10_threshold = _compute_top10_threshold(conn)
+    # Top-10% threshold: same ranking as the pedigree views (zero scores
+    # are not ranked, so they no longer count toward the 10%)
+    top10_threshold = top_threshold(conn, 0.10)
 
     _progress("順位表生成中...")
     table_rows = _build_ranking_table(conn)
+    lineage_rows = _build_lineage_table(conn)
 
     _progress("家系図SVG生成中...")
     pedigree_cards = _build_pedigree_cards(conn, top10_threshold, _progress)
@@ -55,6 +59,7 @@ def export_html_report(
         css=CSS_TEMPLATE,
         js=JS_TEMPLATE,
         table_rows=table_rows,
+        lineage_rows=lineage_rows,
         pedigree_cards=pedigree_cards,
     )
 
@@ -67,25 +72,17 @@ def export_html_report(
     return output_path
 
 
-def _compute_top10_threshold(conn: sqlite3.Connection) -> float:
-    rows = conn.execute(
-        "SELECT total_score FROM sow_scores "
-        "WHERE total_score IS NOT NULL ORDER BY total_score DESC"
-    ).fetchall()
-    if not rows:
-        return float("inf")
-    idx = max(0, len(rows) // 10 - 1)
-    return rows[idx]["total_score"]
-
-
 def _build_ranking_table(conn: sqlite3.Connection) -> str:
     """Query sow_scores + sows, return HTML <tr> rows."""
     rows = conn.execute(
         """SELECT s.individual_id, s.dam_id, s.sire_id, s.status,
                   sc.total_score, sc.peak, sc.stability, sc.sustain,
-                  sc.offspring_quality, sc.rank_all, sc.rank_active
+                  sc.offspring_quality, sc.rank_all, sc.rank_active,
+                  ri.rank_q05, ri.rank_q95, ri.top10_prob
            FROM sow_scores sc
            JOIN sows s ON sc.individual_id = s.individual_id
+           LEFT JOIN sow_rank_intervals ri
+             ON sc.individual_id = ri.individual_id
            ORDER BY sc.rank_all"""
     ).fetchall()
 
@@ -110,12 +107,19 @@ def _build_ranking_table(conn: sqlite3.Connection) -> str:
         status_ja = {"active": "稼働", "dead": "死亡",
                      "culled": "廃豚", "inactive": "未稼働"}.get(status, status)
 
+        rank_ci = (f"{r['rank_q05']}–{r['rank_q95']}"
+                   if r["rank_q05"] is not None else "")
+        top10_prob = (f"{r['top10_prob'] * 100:.0f}%"
+                      if r["top10_prob"] is not None else "")
+
         parts.append(
             f'      <tr data-id="{escape(iid)}" '
             f'data-status="{escape(status)}" '
             f'class="status-{escape(status)}">'
             f"<td>{r['rank_all'] or ''}</td>"
             f"<td>{r['rank_active'] or ''}</td>"
+            f"<td>{rank_ci}</td>"
+            f"<td>{top10_prob}</td>"
             f'<td><strong>{escape(iid)}</strong></td>'
             f"<td>{escape(status_ja)}</td>"
             f"<td>{parity_map.get(iid, 0)}</td>"
@@ -131,6 +135,22 @@ def _build_ranking_table(conn: sqlite3.Connection) -> str:
     return "\n".join(parts)
 
 
+def _build_lineage_table(conn: sqlite3.Connection) -> str:
+    """Lineages with an active member, from lineage_scores."""
+    parts: list[str] = []
+    for i, r in enumerate(load_lineage_lane(conn, "active"), start=1):
+        parts.append(
+            f"      <tr><td>{i}</td>"
+            f"<td><strong>{escape(r['root_id'])}</strong></td>"
+            f"<td>{r['lineage_score']:+.3f}</td>"
+            f"<td>{r['avg_score']:+.3f}</td>"
+            f"<td>{r['active_count']}</td>"
+            f"<td>{r['top_count']}</td>"
+            f"<td>{r['members']}</td></tr>"
+        )
+    return "\n".join(parts)
+
+
 def _build_pedigree_cards(
     conn: sqlite3.Connection,
     top10_threshold: float,
@@ -0,0 +1,40 @@
+"""Export mating_plan as a CSV sheet for the barn."""
+
+from __future__ import annotations
+
+import csv
+import sqlite3
+from pathlib import Path
+
+_HEADERS = ["母豚番号", "推奨順位", "種雄豚", "交配評価値", "期待育種価",
+            "産子近交係数", "近交上限超過", "母豚産歴"]
+
+
+def export_mating_csv(conn: sqlite3.Connection, output_path: Path | str) -> int:
+    """Write mating_plan to output_path (UTF-8 with BOM for Excel).
+
+    Returns the number of rows written.
+    """
+    rows = conn.execute(
+        """SELECT mp.individual_id, mp.rank, mp.sire_id, mp.merit,
+                  mp.expected_ebv, mp.offspring_inbreeding, mp.over_limit,
+                  COALESCE(f.max_p, 0) AS parity
+           FROM mating_plan mp
+           LEFT JOIN (SELECT individual_id, MAX(parity) AS max_p
+                      FROM farrowing_records GROUP BY individual_id) f
+             ON mp.individual_id = f.individual_id
+           ORDER BY mp.individual_id, mp.rank"""
+    ).fetchall()
+
+    with open(output_path, "w", encoding="utf-8-sig", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(_HEADERS)
+        for r in rows:
+            writer.writerow([
+                r["individual_id"], r["rank"], r["sire_id"],
+                f"{r['merit']:.3f}", f"{r['expected_ebv']:.3f}",
+                f"{r['offspring_inbreeding']:.4f}",
+                "○" if r["over_limit"] else "",
+                r["parity"],
+            ])
+    return len(rows)
@@ -199,6 +199,8 @@ HTML_TEMPLATE = """<!DOCTYPE html>
       <tr>
         <th>全頭順位<span class="sort-arrow"></span></th>
         <th>稼働順位<span class="sort-arrow"></span></th>
+        <th>順位90%区間<span class="sort-arrow"></span></th>
+        <th>上位10%確率<span class="sort-arrow"></span></th>
         <th>個体番号<span class="sort-arrow"></span></th>
         <th>ステータス<span class="sort-arrow"></span></th>
         <th>産歴数<span class="sort-arrow"></span></th>
@@ -217,6 +219,26 @@ HTML_TEMPLATE = """<!DOCTYPE html>
   </table>
   </div>
 
+  <h2 style="margin:20px 0 8px;font-size:16px">系統ランキング（稼働系統）</h2>
+  <div class="table-wrap">
+  <table id="lineage-table">
+    <thead>
+      <tr>
+        <th>順位</th>
+        <th>系統祖</th>
+        <th>系統スコア</th>
+        <th>平均スコア</th>
+        <th>稼働頭数</th>
+        <th>上位10%頭数</th>
+        <th>系統頭数</th>
+      </tr>
+    </thead>
+    <tbody>
+{lineage_rows}
+    </tbody>
+  </table>
+  </div>
+
   <h2 style="margin:20px 0 8px;font-size:16px">母系家系図</h2>
 {pedigree_cards}
 </main>
@@ -0,0 +1,46 @@
+"""matplotlib for the Qt panels, imported on first use.
+
+matplotlib and its Qt backend are a large part of start-up time, so
+panels create their canvas with ``new_canvas`` when they first draw
+instead of importing matplotlib at module load.  MainWindow imports the
+same modules in a background thread once the window is shown
+(``WARMUP_MODULES`` in app.gui.main_window).
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+    from matplotlib.figure import Figure
+
+# 日本語表示用フォント（文字化け防止）
+_JA_FONTS = ["Meiryo", "Yu Gothic UI", "MS Gothic", "Yu Gothic", "MS PGothic"]
+
+_configured = False
+
+
+def setup_matplotlib() -> None:
+    """Qt backend + Japanese fonts (once per process)."""
+    global _configured
+    if _configured:
+        return
+    import matplotlib
+
+    matplotlib.use("QtAgg")
+    matplotlib.rcParams["font.sans-serif"] = (
+        _JA_FONTS + list(matplotlib.rcParams["font.sans-serif"]))
+    matplotlib.rcParams["axes.unicode_minus"] = False
+    _configured = True
+
+
+def new_canvas(figsize: tuple[float, float],
+               **kwargs) -> tuple[Figure, FigureCanvasQTAgg]:
+    """(Figure, Qt canvas widget) — call from the GUI thread."""
+    setup_matplotlib()
+    from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize, **kwargs)
+    return figure, FigureCanvasQTAgg(figure)
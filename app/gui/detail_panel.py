@@ -15,6 +15,26 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from app.etl.events import EVENT_LABELS, load_timeline
+
+
+def _event_text(r: sqlite3.Row) -> str:
+    """One-line description of a sow_events row."""
+    t = r["event_type"]
+    v1, v2, v3 = (("-" if v is None else v)
+                  for v in (r["value1"], r["value2"], r["value3"]))
+    if t == "service":
+        return f"♂{r['detail'] or '-'}" + ("  再帰" if r["value1"] else "")
+    if t == "farrowing":
+        return f"総産子{v1}  生存{v2}  死産{v3}"
+    if t == "weaning":
+        return f"離乳{v1}  里子{v2}"
+    if t == "piglets":
+        return f"子豚{v1}頭  W繰上げ{v2}  PS出荷{v3}"
+    if t == "cull":
+        return f"{r['detail'] or ''}  非生産{v1}日"
+    return r["detail"] or ""
+
 
 class DetailPanel(QWidget):
     """Tab showing selected sow's full scoring breakdown."""
@@ -37,13 +57,14 @@ class DetailPanel(QWidget):
         # Parity scores table
         layout.addWidget(QLabel("産歴別スコア"))
         self.parity_table = QTableWidget()
-        self.parity_table.setColumnCount(20)
+        self.parity_table.setColumnCount(22)
         self.parity_table.setHorizontalHeaderLabels([
             "産歴", "総産子", "生存産子", "死産", "黒子", "里子",
             "離乳", "事故率",
             "z(生存)", "z(総産)", "z(死産)", "z(自己率)",
             "産歴スコア", "全頭順位", "稼働順位",
             "子豚数", "PS出荷", "繰上げ", "PS/W率", "ML優秀確率",
+            "離乳後種付日数", "妊娠期間",
         ])
         hdr = self.parity_table.horizontalHeader()
         hdr.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
@@ -61,6 +82,18 @@ class DetailPanel(QWidget):
         hdr2.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         layout.addWidget(self.piglet_table)
 
+        # Event timeline
+        layout.addWidget(QLabel("イベント履歴"))
+        self.timeline_table = QTableWidget()
+        self.timeline_table.setColumnCount(4)
+        self.timeline_table.setHorizontalHeaderLabels([
+            "日付", "イベント", "産歴", "内容",
+        ])
+        hdr3 = self.timeline_table.horizontalHeader()
+        hdr3.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        hdr3.setStretchLastSection(True)
+        layout.addWidget(self.timeline_table)
+
     def show_sow(self, individual_id: str) -> None:
         """Populate panels for the selected sow."""
         self.header_label.setText(f"母豚: {individual_id}")
@@ -82,6 +115,22 @@ class DetailPanel(QWidget):
                 parts.append(f"母: {sow['dam_id']}")
             if sow["sire_id"]:
                 parts.append(f"父: {sow['sire_id']}")
+            inb = self.conn.execute(
+                "SELECT inbreeding FROM inbreeding_coefficients WHERE animal_id = ?",
+                (individual_id,),
+            ).fetchone()
+            if inb:
+                parts.append(f"近交係数 F: {inb['inbreeding']:.4f}")
+            bv = self.conn.execute(
+                """SELECT ebv_born_alive, ebv_weaned
+                   FROM breeding_values WHERE animal_id = ?""",
+                (individual_id,),
+            ).fetchone()
+            if bv:
+                parts.append(
+                    f"育種価(EBV): 生存産子数 {bv['ebv_born_alive']:+.2f}  "
+                    f"離乳頭数 {bv['ebv_weaned']:+.2f}"
+                )
             if sow["total_score"] is not None:
                 parts.append(
                     f"TotalScore: {sow['total_score']:.3f}  "
@@ -100,6 +149,36 @@ class DetailPanel(QWidget):
                 if sow["rank_active"] is not None:
                     rank_str += f"  稼働順位: {sow['rank_active']}/{totals['active']}"
                 parts.append(rank_str)
+                # Bootstrap rank interval
+                ci = self.conn.execute(
+                    """SELECT rank_q05, rank_q50, rank_q95, top10_prob, n_boot
+                       FROM sow_rank_intervals WHERE individual_id = ?""",
+                    (individual_id,),
+                ).fetchone()
+                if ci:
+                    parts.append(
+                        f"順位90%区間: {ci['rank_q05']}〜{ci['rank_q95']}位 "
+                        f"(中央値 {ci['rank_q50']}位, n={ci['n_boot']})  "
+                        f"上位10%確率: {ci['top10_prob'] * 100:.0f}%"
+                    )
+            # Reproductive KPIs
+            kpi = self.conn.execute(
+                """SELECT n_services, conception_rate, repeat_count,
+                          avg_wean_to_service, avg_gestation, npd_total
+                   FROM sow_kpis WHERE individual_id = ?""",
+                (individual_id,),
+            ).fetchone()
+            if kpi:
+                wsi = (f"{kpi['avg_wean_to_service']:.1f}日"
+                       if kpi["avg_wean_to_service"] is not None else "-")
+                gest = (f"{kpi['avg_gestation']:.1f}日"
+                        if kpi["avg_gestation"] is not None else "-")
+                parts.append(
+                    f"受胎率: {kpi['conception_rate'] * 100:.0f}% "
+                    f"({kpi['n_services']}回種付, 再帰{kpi['repeat_count']}回)  "
+                    f"離乳後種付: {wsi}  妊娠期間: {gest}  "
+                    f"非生産日数: {kpi['npd_total'] or 0}日"
+                )
             # ML prediction average
             ml_avg = self.conn.execute(
                 """SELECT AVG(pred_excellent_prob) AS avg_prob
@@ -141,16 +220,13 @@ class DetailPanel(QWidget):
         # Per-parity piglet stats (PS shipment, W promotion, total)
         piglet_stats = {}
         for row in self.conn.execute(
-            """SELECT fr.parity,
+            """SELECT p.parity,
                       COUNT(*) AS total,
                       SUM(CASE WHEN p.ps_shipment = '○' THEN 1 ELSE 0 END) AS ps,
                       SUM(CASE WHEN p.ps_shipment = 'W' THEN 1 ELSE 0 END) AS w
                FROM piglets p
-               JOIN farrowing_records fr
-                 ON p.dam_id = fr.individual_id
-                 AND p.birth_date = fr.farrowing_date
-               WHERE p.dam_id = ?
-               GROUP BY fr.parity""",
+               WHERE p.dam_id = ? AND p.parity IS NOT NULL
+               GROUP BY p.parity""",
             (individual_id,),
         ).fetchall():
             piglet_stats[row["parity"]] = (
@@ -165,6 +241,16 @@ class DetailPanel(QWidget):
         ).fetchall():
             ml_preds[row["parity"]] = row["pred_excellent_prob"]
 
+        # Reproductive KPIs per parity
+        parity_kpis = {}
+        for row in self.conn.execute(
+            """SELECT parity, wean_to_service_days, gestation_days
+               FROM reproductive_kpis WHERE individual_id = ?""",
+            (individual_id,),
+        ).fetchall():
+            parity_kpis[row["parity"]] = (
+                row["wean_to_service_days"], row["gestation_days"])
+
         self.parity_table.setRowCount(len(p_rows))
         for i, r in enumerate(p_rows):
             pt = parity_totals.get(r["parity"], (0, 0))
@@ -199,6 +285,11 @@ class DetailPanel(QWidget):
                 f"{ml_preds[r['parity']]:.3f}"
                 if r["parity"] in ml_preds else "",
             ]
+            wsi, gest = parity_kpis.get(r["parity"], (None, None))
+            vals += [
+                str(wsi) if wsi is not None else "",
+                str(gest) if gest is not None else "",
+            ]
             for j, v in enumerate(vals):
                 item = QTableWidgetItem(v)
                 item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
@@ -227,3 +318,18 @@ class DetailPanel(QWidget):
                 item = QTableWidgetItem(v)
                 item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                 self.piglet_table.setItem(i, j, item)
+
+        # Timeline
+        events = load_timeline(self.conn, individual_id)
+        self.timeline_table.setRowCount(len(events))
+        for i, r in enumerate(events):
+            vals = [
+                r["event_date"],
+                EVENT_LABELS.get(r["event_type"], r["event_type"]),
+                str(r["parity"]) if r["parity"] is not None else "",
+                _event_text(r),
+            ]
+            for j, v in enumerate(vals):
+                item = QTableWidgetItem(v)
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                self.timeline_table.setItem(i, j, item)
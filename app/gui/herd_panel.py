@@ -0,0 +1,182 @@
+"""HerdPanel — 農場推移ダッシュボードタブ。
+
+herd_monthly / herd_monthly_causes（月次集計テーブル）だけを読むので、
+10年分の推移でも生データを走査せずに描画できる。
+グラフ（matplotlib）はタブ表示時かウォームアップ後に作成する。
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (
+    QHBoxLayout,
+    QLabel,
+    QSplitter,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from app.etl.rollups import load_cause_counts, load_herd_monthly
+from app.gui.charts import new_canvas
+
+_HEADERS = ["年月", "分娩腹数", "平均生存産子", "平均離乳", "死産率%", "ミイラ率%",
+            "子豚数", "W率%", "PS率%", "死亡", "廃豚"]
+
+# 死亡・廃豚原因の集計期間（直近Nヶ月）
+CAUSE_MONTHS = 12
+
+
+def _table(headers: list[str]) -> QTableWidget:
+    t = QTableWidget(0, len(headers))
+    t.setHorizontalHeaderLabels(headers)
+    t.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    t.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+    t.setAlternatingRowColors(True)
+    t.horizontalHeader().setStretchLastSection(True)
+    t.verticalHeader().setVisible(False)
+    return t
+
+
+def _item(text: str) -> QTableWidgetItem:
+    it = QTableWidgetItem(text)
+    it.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+    return it
+
+
+def _fmt(v, spec: str, scale: float = 1.0) -> str:
+    return "" if v is None or v != v else format(v * scale, spec)
+
+
+class HerdPanel(QWidget):
+    """農場全体の月次推移パネル。"""
+
+    def __init__(self, conn: sqlite3.Connection | None, parent: QWidget | None = None):
+        super().__init__(parent)
+        self.conn = conn
+
+        self.info_label = QLabel("")
+
+        # グラフは ensure_chart() で作成（起動時に matplotlib を読まない）
+        self.figure = None
+        self.canvas = None
+        self._pending_df = None
+        self._chart_box = QWidget()
+        self._chart_layout = QVBoxLayout(self._chart_box)
+        self._chart_layout.setContentsMargins(0, 0, 0, 0)
+        self._chart_box.setMinimumHeight(250)
+
+        self.month_table = _table(_HEADERS)
+        self.death_table = _table(["死亡原因", "頭数"])
+        self.cull_table = _table(["廃豚原因", "頭数"])
+
+        causes = QWidget()
+        cause_layout = QHBoxLayout(causes)
+        cause_layout.setContentsMargins(0, 0, 0, 0)
+        cause_layout.addWidget(self.death_table)
+        cause_layout.addWidget(self.cull_table)
+
+        bottom = QSplitter(Qt.Orientation.Horizontal)
+        bottom.addWidget(self.month_table)
+        bottom.addWidget(causes)
+        bottom.setStretchFactor(0, 3)
+        bottom.setStretchFactor(1, 1)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self._chart_box)
+        splitter.addWidget(bottom)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.info_label)
+        layout.addWidget(splitter)
+
+    def showEvent(self, event) -> None:
+        self.ensure_chart()
+        super().showEvent(event)
+
+    def ensure_chart(self) -> None:
+        """グラフ領域を作成し、保留中のデータを描画する。"""
+        if self.canvas is not None:
+            return
+        self.figure, self.canvas = new_canvas((8, 3.5), tight_layout=True)
+        self._chart_layout.addWidget(self.canvas)
+        if self._pending_df is not None:
+            self._draw_chart(self._pending_df)
+            self._pending_df = None
+
+    def refresh(self) -> None:
+        """月次集計テーブルからグラフと表を再描画する。"""
+        if self.conn is None:
+            return
+        try:
+            df = load_herd_monthly(self.conn)
+        except Exception:
+            return
+        self._draw_chart(df)
+        self._fill_months(df)
+
+        since = df["month"].iloc[-CAUSE_MONTHS] if len(df) >= CAUSE_MONTHS else None
+        for table, kind in ((self.death_table, "death"), (self.cull_table, "cull")):
+            table.setRowCount(0)
+            for cause, n in load_cause_counts(self.conn, kind, since):
+                row = table.rowCount()
+                table.insertRow(row)
+                table.setItem(row, 0, _item(cause))
+                table.setItem(row, 1, _item(str(n)))
+            table.resizeColumnsToContents()
+
+        if df.empty:
+            self.info_label.setText("月次集計: データなし")
+        else:
+            self.info_label.setText(
+                f"月次集計: {df['month'].iloc[0]} 〜 {df['month'].iloc[-1]}"
+                f"（{len(df)}ヶ月）  原因別は直近{CAUSE_MONTHS}ヶ月")
+
+    def _draw_chart(self, df) -> None:
+        if self.canvas is None:
+            self._pending_df = df
+            return
+        self.figure.clear()
+        ax = self.figure.add_subplot(111)
+        if not df.empty:
+            x = range(len(df))
+            ax.bar(x, df["farrowings"], color="#d0d8e8", label="分娩腹数")
+            ax.set_ylabel("分娩腹数")
+            ax2 = ax.twinx()
+            ax2.plot(x, df["avg_born_alive"], color="#1f77b4", label="平均生存産子")
+            ax2.plot(x, df["avg_weaned"], color="#2ca02c", label="平均離乳")
+            ax2.set_ylabel("頭/腹")
+            step = max(1, len(df) // 12)
+            ax.set_xticks(list(x)[::step])
+            ax.set_xticklabels(df["month"].iloc[::step], rotation=45, fontsize=8)
+            h1, l1 = ax.get_legend_handles_labels()
+            h2, l2 = ax2.get_legend_handles_labels()
+            ax.legend(h1 + h2, l1 + l2, loc="upper left", fontsize=8)
+        self.canvas.draw_idle()
+
+    def _fill_months(self, df) -> None:
+        self.month_table.setRowCount(0)
+        # 新しい月を上に
+        for r in df.iloc[::-1].itertuples(index=False):
+            row = self.month_table.rowCount()
+            self.month_table.insertRow(row)
+            values = [
+                r.month,
+                str(r.farrowings),
+                _fmt(r.avg_born_alive, ".2f"),
+                _fmt(r.avg_weaned, ".2f"),
+                _fmt(r.stillborn_rate, ".1f", 100),
+                _fmt(r.mummified_rate, ".1f", 100),
+                str(r.piglets),
+                _fmt(r.w_rate, ".1f", 100),
+                _fmt(r.ps_rate, ".1f", 100),
+                str(r.deaths),
+                str(r.culls),
+            ]
+            for col, text in enumerate(values):
+                self.month_table.setItem(row, col, _item(text))
+        self.month_table.resizeColumnsToContents()
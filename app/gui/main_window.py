@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
+import importlib
 import sqlite3
 from pathlib import Path
 
-from PyQt6.QtCore import QThread, Qt, pyqtSignal
+from PyQt6.QtCore import QThread, QTimer, Qt, pyqtSignal
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import (
     QFileDialog,
@@ -24,17 +25,36 @@ from PyQt6.QtWidgets import (
 )
 
 from app.db.connection import DB_PATH, get_connection
-from app.db.schema import init_db
+from app.db.days import fill_day_columns, needs_day_fill
+from app.db.schema import bump_data_generation, init_db
+from app.etl.events import build_sow_events
+from app.etl.litters import link_piglets_to_litters
 from app.etl.pipeline import run_etl
+from app.etl.rollups import update_herd_rollups
 from app.gui.detail_panel import DetailPanel
+from app.gui.herd_panel import HerdPanel
 from app.gui.ml_panel import MLPanel
+from app.gui.sire_report_panel import SireReportPanel
 from app.gui.sow_report_panel import SowReportPanel
 from app.gui.pedigree_widget import PedigreeWidget
 from app.gui.pedigree_widget2 import PedigreeWidget2
 from app.gui.pedigree_widget3 import PedigreeWidget3
 from app.gui.pedigree_widget4 import PedigreeWidget4
 from app.export.html_report import export_html_report
-from app.scoring.engine import run_scoring
+from app.export.mating_csv import export_mating_csv
+from app.scoring.feature_store import invalidate as invalidate_features
+from app.scoring.pipeline import run_missing_stages, run_scoring_pipeline
+
+# Heavy stacks that no tab needs to paint the first window; imported by
+# WarmupWorker after the window is shown (python -m app.bench.startup
+# checks that they stay out of the start-up import graph)
+WARMUP_MODULES = [
+    "matplotlib.figure",
+    "matplotlib.backends.backend_qtagg",
+    "lightgbm",
+    "sklearn.model_selection",
+    "sklearn.metrics",
+]
 
 
 class ExportWorker(QThread):
@@ -62,6 +82,21 @@ class ExportWorker(QThread):
             self.error.emit(traceback.format_exc())
 
 
+class WarmupWorker(QThread):
+    """Background import of WARMUP_MODULES after start-up."""
+
+    def run(self):
+        from app.gui.charts import setup_matplotlib
+
+        try:
+            setup_matplotlib()
+            for name in WARMUP_MODULES:
+                importlib.import_module(name)
+        except Exception:
+            # Not fatal: the panel that needs it imports it again on use
+            pass
+
+
 class ETLWorker(QThread):
     """Background thread for ETL + scoring.
 
@@ -79,7 +114,7 @@ class ETLWorker(QThread):
         try:
             conn = get_connection(self.db_path)
             counts = run_etl(conn, progress_cb=self.progress.emit)
-            run_scoring(conn, progress_cb=self.progress.emit)
+            run_scoring_pipeline(conn, progress_cb=self.progress.emit)
             conn.close()
             self.finished.emit(counts)
         except Exception as e:
@@ -87,6 +122,36 @@ class ETLWorker(QThread):
             self.error.emit(traceback.format_exc())
 
 
+class ScoringWorker(QThread):
+    """Background scoring of an existing DB at start-up.
+
+    full=True reruns the whole scoring pipeline (empty or legacy
+    sow_scores); otherwise only stages that never completed are run.
+    """
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(int)  # stages run (-1: full pipeline)
+    error = pyqtSignal(str)
+
+    def __init__(self, db_path: str, full: bool):
+        super().__init__()
+        self.db_path = db_path
+        self.full = full
+
+    def run(self):
+        try:
+            conn = get_connection(self.db_path)
+            if self.full:
+                run_scoring_pipeline(conn, progress_cb=self.progress.emit)
+                ran = -1
+            else:
+                ran = run_missing_stages(conn, progress_cb=self.progress.emit)
+            conn.close()
+            self.finished.emit(ran)
+        except Exception:
+            import traceback
+            self.error.emit(traceback.format_exc())
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -102,6 +167,9 @@ class MainWindow(QMainWindow):
         export_action = QAction("HTMLレポート出力...", self)
         export_action.triggered.connect(self._on_export_html)
         file_menu.addAction(export_action)
+        mating_action = QAction("交配計画CSV出力...", self)
+        mating_action.triggered.connect(self._on_export_mating_csv)
+        file_menu.addAction(mating_action)
 
         # Central widget: shared toolbar + tabs
         self.tabs = QTabWidget()
@@ -174,6 +242,12 @@ class MainWindow(QMainWindow):
         self.sow_report = SowReportPanel(self.conn)
         self.tabs.addTab(self.sow_report, "母豚レポート")
 
+        self.sire_report = SireReportPanel(self.conn)
+        self.tabs.addTab(self.sire_report, "種雄豚評価")
+
+        self.herd = HerdPanel(self.conn)
+        self.tabs.addTab(self.herd, "農場推移")
+
         self.ml_panel = MLPanel(self.conn)
         self.tabs.addTab(self.ml_panel, "ML分析")
 
@@ -199,23 +273,89 @@ class MainWindow(QMainWindow):
         sow_count = self.conn.execute(
             "SELECT count(*) FROM sows").fetchone()[0]
         if sow_count > 0:
+            # DBs loaded before day numbers / piglet linkage / the event
+            # timeline existed
+            if needs_day_fill(self.conn):
+                fill_day_columns(self.conn)
+            relinked = False
+            if self.conn.execute(
+                    "SELECT 1 FROM piglets WHERE farrowing_id IS NOT NULL "
+                    "LIMIT 1").fetchone() is None:
+                relinked = link_piglets_to_litters(self.conn) > 0
+                if relinked:
+                    bump_data_generation(self.conn)
+                    invalidate_features(self.conn)
+            if relinked or self.conn.execute(
+                    "SELECT 1 FROM sow_events LIMIT 1").fetchone() is None:
+                build_sow_events(self.conn)
+            # Fold in records added since the last rollup (cheap when none)
+            update_herd_rollups(self.conn)
             # Ensure scoring tables are populated
             score_count = self.conn.execute(
                 "SELECT count(*) FROM sow_scores").fetchone()[0]
-            if score_count == 0:
-                self.status_bar.showMessage("スコア再計算中...")
-                run_scoring(self.conn, progress_cb=lambda m:
-                            self.status_bar.showMessage(m))
+            # DBs scored before the cached z components were stored
+            legacy_scores = self.conn.execute(
+                "SELECT 1 FROM sow_scores WHERE z_w_rate IS NULL LIMIT 1"
+            ).fetchone()
             self.status_bar.showMessage(
                 f"既存DB読み込み — 母豚{sow_count}頭")
-            self.pedigree.load_data()
-            self.pedigree2.load_data()
-            self.pedigree3.load_data()
-            self.pedigree4.load_data()
-            self.sow_report.refresh()
+            self._reload_panels()
+            # Scoring runs off the GUI thread; panels reload when it ran
+            # anything (WAL: the main connection keeps reading meanwhile)
+            self._start_scoring(
+                full=score_count == 0 or legacy_scores is not None)
         else:
             self._start_etl()
 
+        # Runs once the event loop starts, i.e. after the window is shown
+        QTimer.singleShot(0, self._start_warmup)
+
+    def _start_warmup(self) -> None:
+        self._warmup = WarmupWorker()
+        self._warmup.finished.connect(self._on_warmup_done)
+        self._warmup.start()
+
+    def _on_warmup_done(self) -> None:
+        # Imports are cached now: creating the deferred charts is cheap
+        self.herd.ensure_chart()
+        self.ml_panel.ensure_ready()
+
+    def _reload_panels(self) -> None:
+        self.pedigree.load_data()
+        self.pedigree2.load_data()
+        self.pedigree3.load_data()
+        self.pedigree4.load_data()
+        self.sow_report.refresh()
+        self.sire_report.refresh()
+        self.herd.refresh()
+
+    def _start_scoring(self, full: bool) -> None:
+        if full:
+            self.progress_bar.show()
+            self.status_bar.showMessage("スコア再計算中...")
+        self._scoring_worker = ScoringWorker(str(DB_PATH), full)
+        self._scoring_worker.progress.connect(self._on_scoring_progress)
+        self._scoring_worker.finished.connect(self._on_scoring_done)
+        self._scoring_worker.error.connect(self._on_scoring_error)
+        self._scoring_worker.start()
+
+    def _on_scoring_progress(self, msg: str) -> None:
+        # Missing stages report only when one actually runs
+        self.progress_bar.show()
+        self.status_bar.showMessage(msg)
+
+    def _on_scoring_done(self, ran: int) -> None:
+        self.progress_bar.hide()
+        if ran == 0:
+            return
+        self.status_bar.showMessage("スコア計算完了")
+        self._reload_panels()
+
+    def _on_scoring_error(self, msg: str) -> None:
+        self.progress_bar.hide()
+        self.status_bar.showMessage("スコア計算エラー")
+        QMessageBox.critical(self, "スコア計算エラー", msg)
+
     def _start_etl(self) -> None:
         self.progress_bar.show()
         self.status_bar.showMessage("データ読み込み中...")
@@ -241,15 +381,13 @@ class MainWindow(QMainWindow):
         self.pedigree4.conn = self.conn
         self.detail.conn = self.conn
         self.sow_report.conn = self.conn
+        self.sire_report.conn = self.conn
+        self.herd.conn = self.conn
         self.ml_panel.conn = self.conn
 
         summary = ", ".join(f"{k}: {v}" for k, v in counts.items())
         self.status_bar.showMessage(f"読み込み完了 — {summary}")
-        self.pedigree.load_data()
-        self.pedigree2.load_data()
-        self.pedigree3.load_data()
-        self.pedigree4.load_data()
-        self.sow_report.refresh()
+        self._reload_panels()
 
     def _on_etl_error(self, msg: str) -> None:
         self.progress_bar.hide()
@@ -262,6 +400,8 @@ class MainWindow(QMainWindow):
         self.pedigree4.conn = self.conn
         self.detail.conn = self.conn
         self.sow_report.conn = self.conn
+        self.sire_report.conn = self.conn
+        self.herd.conn = self.conn
         self.ml_panel.conn = self.conn
 
         self.status_bar.showMessage("ETLエラー")
@@ -323,6 +463,21 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("エクスポートエラー")
         QMessageBox.critical(self, "エクスポートエラー", msg)
 
+    # ── Mating plan CSV ──
+
+    def _on_export_mating_csv(self) -> None:
+        default_path = str(Path.home() / "交配計画.csv")
+        path, _ = QFileDialog.getSaveFileName(
+            self, "交配計画CSVの保存先", default_path, "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            count = export_mating_csv(self.conn, path)
+        except Exception as e:
+            QMessageBox.critical(self, "エクスポートエラー", str(e))
+            return
+        self.status_bar.showMessage(f"交配計画CSV出力完了: {path} ({count}行)")
+
 
 if __name__ == "__main__":
     import sys
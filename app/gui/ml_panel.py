@@ -1,4 +1,8 @@
-"""ML Analysis panel – LightGBM training, SHAP visualization, individual search."""
+"""ML Analysis panel – LightGBM training, SHAP visualization, individual search.
+
+Charts and model state are set up on first show (or after the start-up
+warm-up), so importing this module does not load matplotlib/LightGBM.
+"""
 
 from __future__ import annotations
 
@@ -9,12 +13,14 @@ import numpy as np
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import (
+    QComboBox,
     QGroupBox,
     QHBoxLayout,
     QHeaderView,
     QLabel,
     QLineEdit,
     QPushButton,
+    QSpinBox,
     QSplitter,
     QTableWidget,
     QTableWidgetItem,
@@ -22,19 +28,10 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-import matplotlib
-matplotlib.use("QtAgg")
-
-# 日本語表示用フォント設定（文字化け防止）
-_ja_fonts = ["Meiryo", "Yu Gothic UI", "MS Gothic", "Yu Gothic", "MS PGothic"]
-matplotlib.rcParams["font.sans-serif"] = _ja_fonts + list(matplotlib.rcParams["font.sans-serif"])
-matplotlib.rcParams["axes.unicode_minus"] = False
-
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
-from matplotlib.figure import Figure
-
 from app.db.connection import get_connection
-from app.scoring.ml_engine import MLEngine
+from app.gui.charts import new_canvas
+from app.scoring.ml_engine import TUNE_BUDGET_S, MLEngine, is_compatible
+from app.scoring.ml_explain import decode_shap, stored_importance
 from app.scoring.ml_features import FEATURE_NAMES_JA
 
 
@@ -44,15 +41,23 @@ class _TrainWorker(QThread):
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
 
-    def __init__(self, db_path: str, engine: MLEngine):
+    def __init__(self, db_path: str, engine: MLEngine,
+                 tune_budget_s: float | None = None):
         super().__init__()
         self.db_path = db_path
         self.engine = engine
+        # None: train with LGB_PARAMS; else hyperparameter search first
+        self.tune_budget_s = tune_budget_s
 
     def run(self):
         try:
             conn = get_connection(self.db_path)
-            metrics = self.engine.train(conn, progress_cb=self.progress.emit)
+            if self.tune_budget_s:
+                metrics = self.engine.tune(conn, self.tune_budget_s,
+                                           progress_cb=self.progress.emit)
+            else:
+                metrics = self.engine.train(conn,
+                                            progress_cb=self.progress.emit)
             self.engine.predict_all(conn, progress_cb=self.progress.emit)
 
             # Compute global SHAP for importance chart
@@ -68,6 +73,30 @@ class _TrainWorker(QThread):
             self.error.emit(traceback.format_exc())
 
 
+class _ActivateWorker(QThread):
+    """Background thread for switching the active model version."""
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(str, bool)
+    error = pyqtSignal(str)
+
+    def __init__(self, db_path: str, engine: MLEngine, version: str):
+        super().__init__()
+        self.db_path = db_path
+        self.engine = engine
+        self.version = version
+
+    def run(self):
+        try:
+            conn = get_connection(self.db_path)
+            cached = self.engine.activate(conn, self.version,
+                                          progress_cb=self.progress.emit)
+            conn.close()
+            self.finished.emit(self.version, cached)
+        except Exception:
+            import traceback
+            self.error.emit(traceback.format_exc())
+
+
 class MLPanel(QWidget):
     """ML analysis tab with training, SHAP importance, and individual search."""
 
@@ -85,13 +114,33 @@ class MLPanel(QWidget):
 
         self.train_btn = QPushButton("モデル学習")
         self.train_btn.setFixedWidth(120)
-        self.train_btn.clicked.connect(self._on_train)
+        self.train_btn.clicked.connect(lambda: self._on_train())
         top_layout.addWidget(self.train_btn)
 
+        # ハイパーパラメータ探索（制限時間内）→ 最良設定で学習
+        self.tune_btn = QPushButton("チューニング")
+        self.tune_btn.clicked.connect(self._on_tune)
+        top_layout.addWidget(self.tune_btn)
+        self.tune_minutes = QSpinBox()
+        self.tune_minutes.setRange(1, 120)
+        self.tune_minutes.setValue(max(1, TUNE_BUDGET_S // 60))
+        self.tune_minutes.setSuffix(" 分")
+        self.tune_minutes.setToolTip("探索の制限時間")
+        top_layout.addWidget(self.tune_minutes)
+
         self.status_label = QLabel("未学習")
         self.status_label.setWordWrap(True)
         top_layout.addWidget(self.status_label, 1)
 
+        # 登録済みモデルの切替（再起動不要）
+        top_layout.addWidget(QLabel("モデル:"))
+        self.model_combo = QComboBox()
+        self.model_combo.setMinimumWidth(260)
+        top_layout.addWidget(self.model_combo)
+        self.switch_btn = QPushButton("切替")
+        self.switch_btn.clicked.connect(self._on_switch)
+        top_layout.addWidget(self.switch_btn)
+
         layout.addWidget(top_group)
 
         # ── Middle: SHAP importance chart ──
@@ -99,15 +148,12 @@ class MLPanel(QWidget):
 
         # Left: SHAP bar chart
         shap_group = QGroupBox("特徴量重要度 (SHAP)")
-        shap_layout = QVBoxLayout(shap_group)
-        self.shap_figure = Figure(figsize=(6, 5))
-        self.shap_canvas = FigureCanvasQTAgg(self.shap_figure)
-        shap_layout.addWidget(self.shap_canvas)
+        self._shap_layout = QVBoxLayout(shap_group)
         splitter.addWidget(shap_group)
 
         # Right: Individual search + waterfall
         right_widget = QWidget()
-        right_layout = QVBoxLayout(right_widget)
+        right_layout = self._right_layout = QVBoxLayout(right_widget)
         right_layout.setContentsMargins(0, 0, 0, 0)
 
         # Search bar
@@ -134,10 +180,10 @@ class MLPanel(QWidget):
             self._on_parity_selected)
         right_layout.addWidget(self.pred_table)
 
-        # Individual SHAP waterfall
-        self.ind_figure = Figure(figsize=(6, 4))
-        self.ind_canvas = FigureCanvasQTAgg(self.ind_figure)
-        right_layout.addWidget(self.ind_canvas)
+        # Charts are created in _ensure_charts(), model state in ensure_ready()
+        self.shap_figure = self.shap_canvas = None
+        self.ind_figure = self.ind_canvas = None
+        self._ready = False
 
         splitter.addWidget(right_widget)
         splitter.setStretchFactor(0, 1)
@@ -145,17 +191,116 @@ class MLPanel(QWidget):
 
         layout.addWidget(splitter, 1)
 
+    def showEvent(self, event) -> None:
+        self.ensure_ready()
+        super().showEvent(event)
+
+    def _ensure_charts(self) -> None:
+        """Create both chart canvases; every draw path calls this first."""
+        if self.ind_canvas is not None:
+            return
+        shap_figure, shap_canvas = new_canvas((6, 5))
+        # Individual SHAP waterfall
+        ind_figure, ind_canvas = new_canvas((6, 4))
+        self._shap_layout.addWidget(shap_canvas)
+        self._right_layout.addWidget(ind_canvas)
+        self.shap_figure, self.shap_canvas = shap_figure, shap_canvas
+        self.ind_figure, self.ind_canvas = ind_figure, ind_canvas
+
+    def ensure_ready(self) -> None:
+        """Create the charts and select the active model (once)."""
+        self._ensure_charts()
+        if self._ready:
+            return
+        self._ready = True
+        if self.engine.load_model():
+            self._show_active_model()
+        self._refresh_models()
+
+    def _refresh_models(self) -> None:
+        """Fill the model selector from the registry (newest first)."""
+        self.model_combo.clear()
+        for version in self.engine.registry.versions():
+            meta = self.engine.registry.meta(version)
+            text = version
+            auc = meta.get("metrics", {}).get("cv_auc")
+            if auc is not None:
+                text += f"  AUC {auc:.4f}"
+            if "tuning" in meta:
+                text += "  (チューニング済)"
+            if not is_compatible(meta):
+                text += "  (特徴量不一致)"
+            if version == self.engine.version:
+                text += "  [使用中]"
+            self.model_combo.addItem(text, version)
+        idx = self.model_combo.findData(self.engine.version)
+        if idx >= 0:
+            self.model_combo.setCurrentIndex(idx)
+        self.switch_btn.setEnabled(self.model_combo.count() > 0)
+
+    def _show_active_model(self, note: str = "") -> None:
+        """Status line and importance chart of the active version."""
+        version = self.engine.version
+        auc = self.engine.registry.meta(version).get("metrics", {}).get("cv_auc")
+        text = f"使用中モデル: {version}"
+        if auc is not None:
+            text += f"  |  CV AUC: {auc:.4f}"
+        self.status_label.setText(text + note)
+        # 予測キャッシュのSHAP値から描画（モデル読込なし）
+        try:
+            imp = stored_importance(self.conn, version)
+        except sqlite3.Error:
+            # ETL中は接続が閉じている
+            imp = None
+        if imp is not None:
+            self._draw_shap_importance(imp[0], imp[1].tolist())
+
+    def _on_switch(self) -> None:
+        version = self.model_combo.currentData()
+        if not version or version == self.engine.version:
+            return
+        self.train_btn.setEnabled(False)
+        self.tune_btn.setEnabled(False)
+        self.switch_btn.setEnabled(False)
+        self.status_label.setText(f"モデル切替中... ({version})")
+
+        from app.db.connection import DB_PATH
+        self._worker = _ActivateWorker(str(DB_PATH), self.engine, version)
+        self._worker.progress.connect(
+            lambda msg: self.status_label.setText(msg))
+        self._worker.finished.connect(self._on_switch_done)
+        self._worker.error.connect(self._on_train_error)
+        self._worker.start()
+
+    def _on_switch_done(self, version: str, cached: bool) -> None:
+        self.train_btn.setEnabled(True)
+        self.tune_btn.setEnabled(True)
+        self.conn = get_connection()
+        self._refresh_models()
+        self._show_active_model(
+            "  (キャッシュ済み予測)" if cached else "  (再予測)")
+        self._ensure_charts()
+        self.ind_figure.clear()
+        self.ind_canvas.draw()
+        if self.search_input.text().strip():
+            self._on_search()
+
     def show_sow(self, individual_id: str) -> None:
         """Navigate to a specific sow's ML predictions."""
         self.search_input.setText(individual_id)
         self._on_search()
 
-    def _on_train(self) -> None:
+    def _on_tune(self) -> None:
+        self._on_train(tune_budget_s=self.tune_minutes.value() * 60)
+
+    def _on_train(self, tune_budget_s: float | None = None) -> None:
         self.train_btn.setEnabled(False)
-        self.status_label.setText("学習中...")
+        self.tune_btn.setEnabled(False)
+        self.switch_btn.setEnabled(False)
+        self.status_label.setText("探索中..." if tune_budget_s else "学習中...")
 
         from app.db.connection import DB_PATH
-        self._worker = _TrainWorker(str(DB_PATH), self.engine)
+        self._worker = _TrainWorker(str(DB_PATH), self.engine, tune_budget_s)
         self._worker.progress.connect(
             lambda msg: self.status_label.setText(msg))
         self._worker.finished.connect(self._on_train_done)
@@ -164,6 +309,7 @@ class MLPanel(QWidget):
 
     def _on_train_done(self, metrics: dict) -> None:
         self.train_btn.setEnabled(True)
+        self.tune_btn.setEnabled(True)
 
         auc = metrics["cv_auc"]
         acc = metrics["cv_accuracy"]
@@ -175,6 +321,9 @@ class MLPanel(QWidget):
             f"学習完了  |  AUC: {auc:.4f}  Accuracy: {acc:.4f}  "
             f"F1: {f1:.4f}  |  優秀: {n_pos}/{n_total} "
             f"({n_pos / n_total * 100:.1f}%)"
+            + (f"  |  探索: {metrics['tuning']['trials']}候補 "
+               f"木{metrics['tuning']['best_iteration']}本"
+               if "tuning" in metrics else "")
         )
 
         # Draw SHAP importance chart
@@ -183,14 +332,18 @@ class MLPanel(QWidget):
 
         # Refresh connection for predictions
         self.conn = get_connection()
+        self._refresh_models()
 
     def _on_train_error(self, msg: str) -> None:
         self.train_btn.setEnabled(True)
+        self.tune_btn.setEnabled(True)
+        self.switch_btn.setEnabled(self.model_combo.count() > 0)
         self.status_label.setText(f"エラー: {msg[:200]}")
 
     def _draw_shap_importance(self, names: list[str],
                               values: list[float]) -> None:
         """Draw horizontal bar chart of mean |SHAP| values."""
+        self._ensure_charts()
         self.shap_figure.clear()
         ax = self.shap_figure.add_subplot(111)
 
@@ -219,7 +372,8 @@ class MLPanel(QWidget):
             return
 
         rows = self.conn.execute(
-            """SELECT parity, pred_excellent_prob, shap_json
+            """SELECT parity, pred_excellent_prob, shap_values, shap_json,
+                      model_version
                FROM ml_predictions
                WHERE individual_id = ?
                ORDER BY parity""",
@@ -263,17 +417,23 @@ class MLPanel(QWidget):
             return
 
         r = self._search_rows[row_idx]
-        shap_json = r["shap_json"]
-        if not shap_json:
+        shap_dict = None
+        if r["shap_values"] is not None:
+            shap_dict = decode_shap(self.conn, r["model_version"],
+                                    r["shap_values"])
+        elif r["shap_json"]:
+            # Predictions saved before the BLOB column
+            shap_dict = json.loads(r["shap_json"])
+        if not shap_dict:
             return
 
-        shap_dict = json.loads(shap_json)
         self._draw_waterfall(shap_dict, r["parity"],
                              r["pred_excellent_prob"])
 
     def _draw_waterfall(self, shap_dict: dict, parity: int,
                         prob: float) -> None:
         """Draw a simplified waterfall chart for one prediction."""
+        self._ensure_charts()
         self.ind_figure.clear()
         ax = self.ind_figure.add_subplot(111)
 
@@ -19,6 +19,8 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from app.scoring.percentiles import top_threshold
+
 # Layout constants
 NODE_W = 160
 NODE_H = 60
@@ -97,6 +99,7 @@ class PedigreeWidget(QWidget):
         self._remark_keyword = ""
         self._remark_threshold = 0
         self._remark_exceed_sows: set[str] = set()
+        self._top10_threshold = float("inf")
 
         # ── Toolbar ──
         layout = QVBoxLayout(self)
@@ -154,6 +157,7 @@ class PedigreeWidget(QWidget):
         ).fetchone()
         self._ranked_all = rank_counts["total"] if rank_counts else 0
         self._ranked_active = rank_counts["active"] if rank_counts else 0
+        self._top10_threshold = top_threshold(self.conn, 0.10)
 
         # Parity count
         for r in self.conn.execute(
@@ -278,15 +282,8 @@ class PedigreeWidget(QWidget):
         finally:
             sys.setrecursionlimit(old_limit)
 
-        # Compute top-10% threshold
-        scored = [n for n in self.all_nodes.values()
-                  if n.total_score is not None and n.total_score != 0]
-        if scored:
-            scored.sort(key=lambda n: n.total_score, reverse=True)
-            idx = max(0, len(scored) // 10 - 1)
-            top10_threshold = scored[idx].total_score
-        else:
-            top10_threshold = float("inf")
+        # Top-10% threshold (precomputed by the scoring stage)
+        top10_threshold = self._top10_threshold
 
         # Draw all visible nodes and mother-line edges
         drawn = 0
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import math
 import sqlite3
 
 from PyQt6.QtCore import QPointF, QRectF, Qt
@@ -34,6 +33,7 @@ from app.gui.pedigree_widget import (
     TreeNode,
     V_SPACING,
 )
+from app.scoring.lineage import load_lineage_lane, load_member_roots
 
 
 class PedigreeWidget2(PedigreeWidget):
@@ -99,80 +99,18 @@ class PedigreeWidget2(PedigreeWidget):
             self.view.centerOn(self._node_items[self._spotlight_root])
 
     def _rebuild_node_root_map(self) -> None:
-        self._node_root.clear()
-        for root in self.root_nodes:
-            stack = [root]
-            while stack:
-                node = stack.pop()
-                self._node_root[node.individual_id] = root.individual_id
-                for child in node.children:
-                    stack.append(child)
-
-    def _visible_descendants(self, root: TreeNode) -> list[TreeNode]:
-        out: list[TreeNode] = []
-        stack = [root]
-        while stack:
-            node = stack.pop()
-            if self._active_only and not node.has_active:
-                continue
-            out.append(node)
-            for child in node.children:
-                stack.append(child)
-        return out
+        self._node_root = load_member_roots(self.conn)
+
+    def _lineage_view(self) -> str:
+        return "active" if self._active_only else "all"
 
     def _compute_top10_threshold(self) -> float:
-        scored = [
-            n for n in self.all_nodes.values()
-            if n.total_score is not None and n.total_score != 0
-        ]
-        if not scored:
-            return float("inf")
-        scored.sort(key=lambda n: n.total_score, reverse=True)
-        idx = max(0, len(scored) // 10 - 1)
-        return scored[idx].total_score
+        # Read once per load_data from score_percentiles
+        return self._top10_threshold
 
     def _refresh_ranking_lane(self) -> None:
-        top10_thr = self._compute_top10_threshold()
-        rows: list[dict] = []
-
-        for root in self.root_nodes:
-            if self._active_only and not root.has_active:
-                continue
-
-            members = self._visible_descendants(root)
-            if not members:
-                continue
-
-            active_count = sum(1 for n in members if n.status == "active")
-            top_count = sum(
-                1
-                for n in members
-                if (n.total_score is not None and n.total_score >= top10_thr and
-                    top10_thr != float("inf"))
-            )
-            scored = [
-                n.total_score for n in members
-                if n.total_score is not None and n.total_score != 0
-            ]
-            avg_score = (sum(scored) / len(scored)) if scored else 0.0
-            lineage_score = avg_score * math.log(active_count + 1.0)
-
-            rows.append(
-                {
-                    "root_id": root.individual_id,
-                    "lineage_score": lineage_score,
-                    "active_count": active_count,
-                    "top_count": top_count,
-                    "members": len(members),
-                }
-            )
-
-        rows.sort(
-            key=lambda r: (
-                r["lineage_score"], r["top_count"], r["active_count"], r["members"]
-            ),
-            reverse=True,
-        )
+        # Lineage figures are precomputed by app.scoring.lineage
+        rows = [dict(r) for r in load_lineage_lane(self.conn, self._lineage_view())]
 
         self.rank_list.blockSignals(True)
         self.rank_list.clear()
@@ -11,6 +11,7 @@ from PyQt6.QtWidgets import QGraphicsItem, QLabel, QLineEdit, QListWidgetItem
 
 from app.gui.pedigree_widget import COL_BG, COL_CULLED, COL_DEAD, COL_MOTHER_LINE, COL_REMARK_LINE, NODE_W, TreeNode
 from app.gui.pedigree_widget3 import PedigreeWidget3
+from app.scoring.lineage import lineage_ml_summary, load_lineage_lane
 
 
 class PedigreeWidget4(PedigreeWidget3):
@@ -113,50 +114,26 @@ class PedigreeWidget4(PedigreeWidget3):
         return self._blend_color(base, self._prob_color(p), 0.55)
 
     def _refresh_ranking_lane(self) -> None:
-        top10_thr = self._compute_top10_threshold()
+        view = self._lineage_view()
+        ml = lineage_ml_summary(self.conn, view, self._ml_prob_threshold)
         rows: list[dict] = []
 
-        for root in self.root_nodes:
-            if self._active_only and not root.has_active:
-                continue
-
-            members = self._visible_descendants(root)
-            if not members:
-                continue
-
-            active_count = sum(1 for n in members if n.status == "active")
-            top_count = sum(
-                1
-                for n in members
-                if (n.total_score is not None and n.total_score >= top10_thr and
-                    top10_thr != float("inf"))
-            )
-            scored = [
-                n.total_score for n in members
-                if n.total_score is not None and n.total_score != 0
-            ]
-            avg_score = (sum(scored) / len(scored)) if scored else 0.0
-
-            probs = [
-                self._ml_avg_prob[n.individual_id]
-                for n in members
-                if n.individual_id in self._ml_avg_prob
-            ]
-            ml_avg = (sum(probs) / len(probs)) if probs else 0.0
-            ml_high = sum(1 for p in probs if p >= self._ml_prob_threshold)
+        for base in load_lineage_lane(self.conn, view):
+            ml_avg, ml_high = ml.get(base["root_id"], (0.0, 0))
+            active_count = base["active_count"]
 
             # Keep the same score axis by converting probability to centered score.
             ml_component = (ml_avg - 0.5) * 4.0
-            lineage_score = (avg_score + ml_component) * math.log(active_count + 1.0)
+            lineage_score = (base["avg_score"] + ml_component) * math.log(active_count + 1.0)
             lineage_score += ml_high * 0.12
 
             rows.append(
                 {
-                    "root_id": root.individual_id,
+                    "root_id": base["root_id"],
                     "lineage_score": lineage_score,
                     "active_count": active_count,
-                    "top_count": top_count,
-                    "members": len(members),
+                    "top_count": base["top_count"],
+                    "members": base["members"],
                     "ml_avg": ml_avg,
                     "ml_high": ml_high,
                 }
@@ -0,0 +1,99 @@
+"""SireReportPanel — 種雄豚評価一覧タブ。
+
+sire_scores を SireScore 順に表示する。
+娘豚成績・交配産子成績・子豚成績（W/PS率）と育種価を並べて比較できる。
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (
+    QLabel,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+_SQL = """
+SELECT rank, sire_id, sire_score,
+       n_daughters, daughter_avg_score,
+       n_litters, avg_born_alive, litter_z,
+       n_piglets, w_rate, ps_rate,
+       ebv_born_alive, ebv_weaned
+FROM sire_scores
+ORDER BY rank
+"""
+
+_HEADERS = ["順位", "種雄豚", "SireScore", "娘豚数", "娘豚平均スコア",
+            "交配産子腹数", "平均生存産子数", "産子z", "子豚数", "W率", "PS率",
+            "EBV生存産子", "EBV離乳"]
+
+
+class SireReportPanel(QWidget):
+    """種雄豚評価一覧パネル。"""
+
+    def __init__(self, conn: sqlite3.Connection | None, parent: QWidget | None = None):
+        super().__init__(parent)
+        self.conn = conn
+
+        self.info_label = QLabel("")
+
+        self.table = QTableWidget(0, len(_HEADERS))
+        self.table.setHorizontalHeaderLabels(_HEADERS)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.info_label)
+        layout.addWidget(self.table)
+
+    def refresh(self) -> None:
+        """DB から sire_scores を取得してテーブルを再描画する。"""
+        if self.conn is None:
+            return
+        try:
+            rows = self.conn.execute(_SQL).fetchall()
+        except Exception:
+            rows = []
+        self.info_label.setText(f"種雄豚: {len(rows)}頭")
+
+        def _item(text: str, align=Qt.AlignmentFlag.AlignCenter) -> QTableWidgetItem:
+            it = QTableWidgetItem(text)
+            it.setTextAlignment(align)
+            return it
+
+        def _fmt(v: float | None, spec: str) -> str:
+            return format(v, spec) if v is not None else ""
+
+        self.table.setRowCount(0)
+        for r in rows:
+            row_idx = self.table.rowCount()
+            self.table.insertRow(row_idx)
+            values = [
+                str(r["rank"]),
+                r["sire_id"],
+                _fmt(r["sire_score"], "+.3f"),
+                str(r["n_daughters"] or 0),
+                _fmt(r["daughter_avg_score"], "+.3f"),
+                str(r["n_litters"] or 0),
+                _fmt(r["avg_born_alive"], ".2f"),
+                _fmt(r["litter_z"], "+.2f"),
+                str(r["n_piglets"] or 0),
+                _fmt(r["w_rate"] * 100 if r["w_rate"] is not None else None, ".1f"),
+                _fmt(r["ps_rate"] * 100 if r["ps_rate"] is not None else None, ".1f"),
+                _fmt(r["ebv_born_alive"], "+.2f"),
+                _fmt(r["ebv_weaned"], "+.2f"),
+            ]
+            for col, text in enumerate(values):
+                align = (Qt.AlignmentFlag.AlignLeft if col == 1
+                         else Qt.AlignmentFlag.AlignCenter)
+                self.table.setItem(row_idx, col, _item(text, align))
+
+        self.table.resizeColumnsToContents()
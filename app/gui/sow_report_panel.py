@@ -2,6 +2,8 @@
 
 成績順にソートされた母豚一覧を表示し、
 ダブルクリックで家系図検索シグナルを emit する。
+重みプロファイルを切り替えると、キャッシュ済みのスコア成分から
+総合スコアと順位を即時に再計算して表示する。
 """
 
 from __future__ import annotations
@@ -11,7 +13,9 @@ import sqlite3
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtWidgets import (
     QButtonGroup,
+    QComboBox,
     QHBoxLayout,
+    QLabel,
     QPushButton,
     QTableWidget,
     QTableWidgetItem,
@@ -19,6 +23,13 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from app.scoring.reweight import (
+    DEFAULT_PROFILE_NAME,
+    WEIGHT_PROFILES,
+    ReweightResult,
+    ScoreComponents,
+)
+
 _SQL_ALL = """
 SELECT
     sc.rank_all,
@@ -60,7 +71,8 @@ _STATUS_LABEL = {
     "culled": "廃豚",
 }
 
-_HEADERS = ["全頭順位", "稼働順位", "個体番号", "ステータス", "産歴", "総合スコア", "母番号", "父番号"]
+_HEADERS = ["全頭順位", "稼働順位", "個体番号", "ステータス", "産歴", "総合スコア", "母番号", "父番号",
+            "順位変動"]
 
 
 class SowReportPanel(QWidget):
@@ -73,6 +85,8 @@ class SowReportPanel(QWidget):
         self.conn = conn
         self._show_active = False
         self._all_rows: list[tuple] = []
+        self._components: ScoreComponents | None = None
+        self._reweighted: dict[str, tuple] | None = None
 
         # ── toolbar ──
         toolbar = QHBoxLayout()
@@ -95,6 +109,12 @@ class SowReportPanel(QWidget):
 
         toolbar.addWidget(self.btn_all)
         toolbar.addWidget(self.btn_active)
+
+        toolbar.addWidget(QLabel("重みプロファイル"))
+        self.cmb_profile = QComboBox()
+        self.cmb_profile.addItems(list(WEIGHT_PROFILES))
+        self.cmb_profile.currentTextChanged.connect(self._on_profile_changed)
+        toolbar.addWidget(self.cmb_profile)
         toolbar.addStretch()
 
         # ── table ──
@@ -124,6 +144,8 @@ class SowReportPanel(QWidget):
         except Exception:
             rows = []
         self._all_rows = rows
+        self._components = None
+        self._reweight()
         self._apply_filter()
 
     # ── private ──
@@ -136,6 +158,37 @@ class SowReportPanel(QWidget):
         self._show_active = True
         self._apply_filter()
 
+    def _on_profile_changed(self, _name: str) -> None:
+        self._reweight()
+        self._apply_filter()
+
+    def _reweight(self) -> None:
+        """選択中の重みプロファイルで総合スコア・順位を再計算する。"""
+        name = self.cmb_profile.currentText()
+        if self.conn is None or name == DEFAULT_PROFILE_NAME:
+            self._reweighted = None
+            return
+        if self._components is None:
+            self._components = ScoreComponents.from_db(self.conn)
+        result: ReweightResult = self._components.reweight(WEIGHT_PROFILES[name])
+        self._reweighted = result.as_dict()
+
+    def _apply_reweight(self, rows: list[tuple]) -> list[tuple]:
+        """行の順位・スコアを再計算値に置き換え、順位変動を付加して並べ替える。"""
+        out: list[tuple] = []
+        for row_data in rows:
+            rank_all, rank_active, individual_id, status, parity, score, dam_id, sire_id = row_data
+            rw = self._reweighted.get(individual_id)
+            if rw is None:
+                out.append((*row_data, None))
+                continue
+            score, new_all, new_active, base_all = rw
+            out.append((new_all, new_active, individual_id, status, parity, score,
+                        dam_id, sire_id, base_all - new_all))
+        key_idx = 1 if self._show_active else 0
+        out.sort(key=lambda r: (r[key_idx] is None, r[key_idx] or 0))
+        return out
+
     def _apply_filter(self) -> None:
         if self._show_active:
             try:
@@ -145,9 +198,15 @@ class SowReportPanel(QWidget):
         else:
             rows = self._all_rows
 
+        if self._reweighted is not None:
+            rows = self._apply_reweight(rows)
+        else:
+            rows = [(*r, None) for r in rows]
+
         self.table.setRowCount(0)
         for row_data in rows:
-            rank_all, rank_active, individual_id, status, parity, score, dam_id, sire_id = row_data
+            (rank_all, rank_active, individual_id, status, parity, score,
+             dam_id, sire_id, rank_delta) = row_data
 
             row_idx = self.table.rowCount()
             self.table.insertRow(row_idx)
@@ -168,6 +227,11 @@ class SowReportPanel(QWidget):
             )
             self.table.setItem(row_idx, 6, _item(dam_id or "", Qt.AlignmentFlag.AlignLeft))
             self.table.setItem(row_idx, 7, _item(sire_id or "", Qt.AlignmentFlag.AlignLeft))
+            if rank_delta:
+                delta_text = f"▲{rank_delta}" if rank_delta > 0 else f"▼{-rank_delta}"
+            else:
+                delta_text = "" if rank_delta is None else "±0"
+            self.table.setItem(row_idx, 8, _item(delta_text))
 
         self.table.resizeColumnsToContents()
 
@@ -0,0 +1,129 @@
+"""Bootstrap rank confidence intervals.
+
+Each replicate resamples every sow's parities with replacement and
+recomputes Peak / Stability / Sustain / TotalScore, then re-ranks the herd.
+Sows are processed in blocks of equal parity count so one replicate chunk
+is a single (chunk, sows, parities) array gather; no per-sow Python loop.
+
+Parity z-scores (and their shrinkage) are taken as fixed from the scoring
+run – the bootstrap measures how much a sow's rank depends on *which* of
+her litters we happened to observe.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+
+from app.scoring.percentiles import RANKED, top_count
+from app.scoring.reweight import ScoreComponents, WeightProfile
+
+N_BOOTSTRAP = 1000
+BOOTSTRAP_SEED = 42
+CHUNK = 100          # replicates per vectorised block
+TOP_FRACTION = 0.10  # "top 10%" for top10_prob
+
+
+def bootstrap_totals(comps: ScoreComponents, profile: WeightProfile,
+                     n_boot: int = N_BOOTSTRAP,
+                     seed: int = BOOTSTRAP_SEED) -> np.ndarray:
+    """Return (n_boot, n_sows) TotalScore replicates."""
+    rng = np.random.default_rng(seed)
+    n_sows = len(comps.sow_ids)
+    ps = comps.parity_scores(profile)
+    oq = profile.w_rate * comps.z_w_rate + profile.ps_rate * comps.z_ps_rate
+
+    # Rows are ordered by (sow, parity); start offset of each sow's block
+    counts = comps.n_parities.astype(int)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+
+    totals = np.empty((n_boot, n_sows))
+    for n in np.unique(counts):
+        sows = np.flatnonzero(counts == n)
+        cols = starts[sows][:, None] + np.arange(n)[None, :]
+        scores = ps[cols]                     # (m, n), parity order
+        peak_mask = comps.peak_row[cols]
+        mid = n // 2
+
+        for b0 in range(0, n_boot, CHUNK):
+            b1 = min(n_boot, b0 + CHUNK)
+            idx = rng.integers(0, n, size=(b1 - b0, len(sows), n))
+            idx.sort(axis=2)  # keep resampled litters in parity order
+            s = np.take_along_axis(
+                np.broadcast_to(scores, idx.shape), idx, axis=2)
+            pm = np.take_along_axis(
+                np.broadcast_to(peak_mask, idx.shape), idx, axis=2)
+
+            mean = s.mean(axis=2)
+            n_peak = pm.sum(axis=2)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                peak = np.where(n_peak > 0,
+                                (s * pm).sum(axis=2) / n_peak, mean)
+            if n >= 2:
+                stability = -s.var(axis=2)
+                sustain = s[:, :, mid:].mean(axis=2) - s[:, :, :mid].mean(axis=2)
+            else:
+                stability = sustain = np.zeros_like(mean)
+
+            totals[b0:b1, sows] = (profile.peak * peak +
+                                   profile.stability * stability +
+                                   profile.sustain * sustain +
+                                   profile.offspring * oq[sows])
+    return totals
+
+
+def rank_quantiles(totals: np.ndarray, ranked: np.ndarray | None = None
+                   ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Per-sow 5/50/95% rank quantiles and P(rank within top 10%).
+
+    *ranked* marks the sows counted by the percentile thresholds
+    (``percentiles.RANKED``); the others rank last and have P = 0, so
+    "top 10%" is the same number of sows as ``top_threshold(conn, 0.10)``.
+    """
+    n_boot, n_sows = totals.shape
+    if ranked is None:
+        ranked = np.ones(n_sows, dtype=bool)
+    totals = np.where(ranked, totals, -np.inf)
+    order = np.argsort(-totals, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order,
+                      np.broadcast_to(np.arange(1, n_sows + 1), order.shape),
+                      axis=1)
+    q05, q50, q95 = np.quantile(ranks, [0.05, 0.50, 0.95], axis=0,
+                                method="inverted_cdf")
+    top_n = top_count(int(ranked.sum()), TOP_FRACTION)
+    top_prob = np.where(ranked, (ranks <= top_n).mean(axis=0), 0.0)
+    return q05, q50, q95, top_prob
+
+
+def run_bootstrap(conn: sqlite3.Connection, progress_cb=None,
+                  n_boot: int = N_BOOTSTRAP) -> None:
+    """Compute bootstrap rank intervals and write sow_rank_intervals."""
+    def _progress(msg: str):
+        if progress_cb:
+            progress_cb(msg)
+
+    _progress(f"順位ブートストラップ計算中 ({n_boot}回)...")
+    conn.execute("DELETE FROM sow_rank_intervals")
+    comps = ScoreComponents.from_db(conn)
+    if len(comps.sow_ids) == 0:
+        conn.commit()
+        return
+
+    totals = bootstrap_totals(comps, WeightProfile(), n_boot=n_boot)
+    ranked_ids = {
+        r[0] for r in conn.execute(
+            f"SELECT sc.individual_id FROM sow_scores sc WHERE {RANKED}")
+    }
+    ranked = np.array([sid in ranked_ids for sid in comps.sow_ids])
+    q05, q50, q95, top_prob = rank_quantiles(totals, ranked)
+
+    conn.executemany(
+        """INSERT INTO sow_rank_intervals
+           (individual_id, rank_q05, rank_q50, rank_q95, top10_prob, n_boot)
+           VALUES (?,?,?,?,?,?)""",
+        [(sid, int(a), int(b), int(c), float(p), n_boot)
+         for sid, a, b, c, p in zip(comps.sow_ids, q05, q50, q95, top_prob)],
+    )
+    conn.commit()
@@ -2,7 +2,7 @@
 
 Implements:
   1. Per-parity base indicators (OWN_W, OWN_RATE, LIVE_BORN, TOTAL_BORN, STILLBORN)
-  2. Parity-wise z-score standardisation
+  2. Parity-wise z-score standardisation (Welford stats → parity_stats)
   3. Shrinkage correction (α=3)
   4. Weighted ParityScore
   5. Three-axis sow-level score (Peak / Stability / Sustain)
@@ -16,6 +16,14 @@ import math
 import sqlite3
 from dataclasses import dataclass
 
+from app.scoring.parity_stats import (
+    StatsMap,
+    accumulate,
+    group_stat,
+    metric_values,
+    save_parity_stats,
+)
+
 ALPHA = 3  # shrinkage parameter
 
 # ParityScore weights (z_own_weaned excluded; proportionally redistributed)
@@ -97,18 +105,27 @@ def run_scoring(conn: sqlite3.Connection, progress_cb=None) -> None:
             stillborn=r["stillborn"],
         )
         # OWN_W = W - F
-        if pr.weaned is not None:
-            f = pr.foster if pr.foster is not None else 0
-            pr.own_w = pr.weaned - f
-            pr.own_rate = pr.own_w / pr.weaned if pr.weaned > 0 else None
+        metrics = metric_values(pr.weaned, pr.foster, pr.born_alive,
+                                pr.total_born, pr.stillborn)
+        pr.own_w = metrics["own_w"]
+        pr.own_rate = metrics["own_rate"]
         parity_data.append(pr)
 
     # ── Step 2: Parity-wise z-scores ──
     _progress("zスコア算出中...")
-    # Group by parity
+    # Group by parity; group mean/SD come from streaming accumulators
     by_parity: dict[int, list[ParityRow]] = {}
+    stats: StatsMap = {}
     for pr in parity_data:
         by_parity.setdefault(pr.parity, []).append(pr)
+        accumulate(stats, pr.parity, {
+            "own_w": pr.own_w,
+            "born_alive": pr.born_alive,
+            "total_born": pr.total_born,
+            "stillborn": pr.stillborn,
+            "own_rate": pr.own_rate,
+        })
+    save_parity_stats(conn, stats)
 
     # Count parities per sow for shrinkage
     sow_n: dict[str, int] = {}
@@ -125,17 +142,17 @@ def run_scoring(conn: sqlite3.Connection, progress_cb=None) -> None:
     # Compute z-scores per parity group
     parity_results: list[dict] = []
     for k, group in by_parity.items():
-        vals_ow = [p.own_w for p in group if p.own_w is not None]
-        vals_lb = [p.born_alive for p in group if p.born_alive is not None]
-        vals_tb = [p.total_born for p in group if p.total_born is not None]
-        vals_sb = [p.stillborn for p in group if p.stillborn is not None]
-        vals_or = [p.own_rate for p in group if p.own_rate is not None]
-
-        m_ow, s_ow = _mean_sd(vals_ow) if vals_ow else (0, 0)
-        m_lb, s_lb = _mean_sd(vals_lb) if vals_lb else (0, 0)
-        m_tb, s_tb = _mean_sd(vals_tb) if vals_tb else (0, 0)
-        m_sb, s_sb = _mean_sd(vals_sb) if vals_sb else (0, 0)
-        m_or, s_or = _mean_sd(vals_or) if vals_or else (0, 0)
+        g_ow = group_stat(stats, k, "own_w")
+        g_lb = group_stat(stats, k, "born_alive")
+        g_tb = group_stat(stats, k, "total_born")
+        g_sb = group_stat(stats, k, "stillborn")
+        g_or = group_stat(stats, k, "own_rate")
+
+        m_ow, s_ow = g_ow.mean, g_ow.sd
+        m_lb, s_lb = g_lb.mean, g_lb.sd
+        m_tb, s_tb = g_tb.mean, g_tb.sd
+        m_sb, s_sb = g_sb.mean, g_sb.sd
+        m_or, s_or = g_or.mean, g_or.sd
 
         for pr in group:
             n = sow_n.get(pr.individual_id, 1)
@@ -289,6 +306,8 @@ def run_scoring(conn: sqlite3.Connection, progress_cb=None) -> None:
         z_wr = _zscore(w_rates.get(sid), m_wr, s_wr) if sid in w_rates else 0.0
         z_pr = _zscore(ps_rates.get(sid), m_pr, s_pr) if sid in ps_rates else 0.0
         oq = W_W_RATE * z_wr + W_PS_RATE * z_pr
+        ss["z_w_rate"] = z_wr
+        ss["z_ps_rate"] = z_pr
         ss["offspring_quality"] = oq
         ss["total_score"] = (W_PEAK * ss["peak"] +
                              W_STABILITY * ss["stability"] +
@@ -316,11 +335,13 @@ def run_scoring(conn: sqlite3.Connection, progress_cb=None) -> None:
         conn.execute(
             """INSERT INTO sow_scores
                (individual_id, peak, stability, sustain,
-                offspring_quality, total_score, rank_all, rank_active)
-               VALUES (?,?,?,?,?,?,?,?)""",
+                offspring_quality, total_score, rank_all, rank_active,
+                z_w_rate, z_ps_rate)
+               VALUES (?,?,?,?,?,?,?,?,?,?)""",
             (ss["individual_id"], ss["peak"], ss["stability"],
              ss["sustain"], ss["offspring_quality"], ss["total_score"],
-             ss["rank_all"], ss.get("rank_active")),
+             ss["rank_all"], ss.get("rank_active"),
+             ss["z_w_rate"], ss["z_ps_rate"]),
         )
 
     conn.commit()
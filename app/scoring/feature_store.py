@@ -0,0 +1,243 @@
+"""Persistent ML feature store (ml_features table).
+
+``build_feature_matrix`` output is saved as one float64 block per sow
+(its parities × STORE_COLS) and reused while the store key is unchanged:
+
+    key = data_generation : sha1(FEATURE_COLS, FEATURE_CODE_VERSION)
+
+``data_generation`` (app_meta) is bumped by ETL and the scoring pipeline,
+so any rewrite of records or scores — or a change to the feature set or
+feature code — makes the stored matrix stale.
+
+A stale store is patched instead of rebuilt when the sows whose records
+changed are known (``mark_changed``, called by ETL):
+
+- the changed sows and their daughters (``sows.dam_id``) are rebuilt —
+  a sow's records feed her own Tier 1–3/5 rows and her daughters'
+  Tier 4 dam columns;
+- the herd-relative parts (dam score columns from sow_scores and the
+  is_excellent label) are refreshed for every row;
+- only partitions whose bytes changed are rewritten.
+
+``invalidate`` forces the next load to rebuild from scratch.
+``update_features(..., verify=True)`` checks a patch against a full build.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from app.db.schema import data_generation, get_meta, set_meta
+from app.scoring.ml_features import (
+    FEATURE_CODE_VERSION,
+    FEATURE_COLS,
+    build_feature_matrix,
+    build_label,
+    load_dam_scores,
+)
+
+# Columns stored per row (individual_id is the partition key)
+STORE_COLS = FEATURE_COLS + ["is_excellent"]
+# Stored as float64; restored to int on load
+_INT_COLS = ["parity", "is_excellent"]
+_DAM_SCORE_COLS = ["dam_total_score", "dam_peak"]
+
+_KEY = "feature_store_key"
+# JSON list of sows changed since the store was written; absent = unknown
+_PENDING = "feature_store_pending"
+
+
+def schema_hash() -> str:
+    h = hashlib.sha1()
+    h.update("\t".join(STORE_COLS).encode())
+    h.update(f"\nv{FEATURE_CODE_VERSION}".encode())
+    return h.hexdigest()[:16]
+
+
+def store_key(conn: sqlite3.Connection) -> str:
+    return f"{data_generation(conn)}:{schema_hash()}"
+
+
+def sow_fingerprints(conn: sqlite3.Connection) -> dict[str, str]:
+    """Per-sow hash of every record that feeds her feature rows.
+
+    Covers her dam link, breeding / farrowing records and the piglets she
+    is the dam of. Surrogate ids (record ``id``, ``farrowing_id``) are left
+    out so an unchanged reload hashes the same.
+    """
+    sources = [
+        ("sows", "individual_id", {"individual_id", "dam_id"}, True),
+        ("breeding_records", "individual_id", {"id"}, False),
+        ("farrowing_records", "individual_id", {"id"}, False),
+        ("piglets", "dam_id", {"farrowing_id"}, False),
+    ]
+    hashes = {}
+    for table, owner, cols, keep_only in sources:
+        names = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+        names = ([c for c in names if c in cols] if keep_only
+                 else [c for c in names if c not in cols])
+        for r in conn.execute(
+                f"SELECT {owner}, {', '.join(names)} FROM {table} "
+                f"WHERE {owner} IS NOT NULL ORDER BY {', '.join(names)}"):
+            h = hashes.get(r[0])
+            if h is None:
+                h = hashes[r[0]] = hashlib.sha1()
+            h.update(f"{table}\t{r[1:]!r}\n".encode())
+    return {k: h.hexdigest() for k, h in hashes.items()}
+
+
+def mark_changed(conn: sqlite3.Connection, individual_ids) -> None:
+    """Record sows whose records changed, for the next incremental update."""
+    pending = _pending(conn)
+    if pending is None:
+        return  # already invalid → full rebuild anyway
+    set_meta(conn, _PENDING, json.dumps(sorted(set(pending) | set(individual_ids))))
+    conn.commit()
+
+
+def invalidate(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM app_meta WHERE key = ?", (_PENDING,))
+    conn.commit()
+
+
+def _pending(conn: sqlite3.Connection) -> list[str] | None:
+    raw = get_meta(conn, _PENDING)
+    return None if raw is None else json.loads(raw)
+
+
+def _partitions(df: pd.DataFrame) -> dict[str, bytes]:
+    """individual_id → float64 block; df is grouped by individual_id."""
+    if df.empty:
+        return {}
+    values = df[STORE_COLS].to_numpy(dtype=np.float64)
+    ids = df["individual_id"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+    return {ids[a]: values[a:b].tobytes() for a, b in zip(starts, ends)}
+
+
+def _write(conn: sqlite3.Connection, parts: dict[str, bytes],
+           key: str) -> None:
+    row_bytes = 8 * len(STORE_COLS)
+    conn.executemany(
+        "INSERT OR REPLACE INTO ml_features (individual_id, n_rows, data) "
+        "VALUES (?, ?, ?)",
+        ((sid, len(blob) // row_bytes, blob) for sid, blob in parts.items()),
+    )
+    set_meta(conn, _KEY, key)
+    set_meta(conn, _PENDING, "[]")
+    conn.commit()
+
+
+def save_features(conn: sqlite3.Connection, df: pd.DataFrame,
+                  key: str | None = None) -> None:
+    """Replace the store with *df* (sorted by individual_id, parity)."""
+    conn.execute("DELETE FROM ml_features")
+    _write(conn, _partitions(df), key or store_key(conn))
+
+
+def _read(conn: sqlite3.Connection) -> tuple[pd.DataFrame, dict[str, bytes]]:
+    rows = conn.execute(
+        "SELECT individual_id, n_rows, data FROM ml_features "
+        "ORDER BY individual_id").fetchall()
+    blobs = b"".join(r[2] for r in rows)
+    values = np.frombuffer(blobs, dtype=np.float64)
+    df = pd.DataFrame(values.reshape(-1, len(STORE_COLS)), columns=STORE_COLS)
+    df.insert(0, "individual_id",
+              np.repeat([r[0] for r in rows], [r[1] for r in rows]))
+    for col in _INT_COLS:
+        df[col] = df[col].astype(int)
+    return df, {r[0]: r[2] for r in rows}
+
+
+def load_features(conn: sqlite3.Connection) -> pd.DataFrame | None:
+    """Stored feature matrix, or None when the store is stale / empty."""
+    if get_meta(conn, _KEY) != store_key(conn):
+        return None
+    df, parts = _read(conn)
+    return df if parts else None
+
+
+def update_features(conn: sqlite3.Connection, changed_ids,
+                    verify: bool = False) -> pd.DataFrame:
+    """Patch the stored matrix for *changed_ids* (see module docstring).
+
+    Falls back to a full build when the store is empty or was written by a
+    different feature set. With *verify* the result is compared with a
+    full build and ValueError is raised on any difference.
+    """
+    key = store_key(conn)
+    stored_key = get_meta(conn, _KEY) or ""
+    if stored_key.split(":")[-1] != schema_hash():
+        df = build_feature_matrix(conn)
+        save_features(conn, df, key)
+        return df
+    old, old_parts = _read(conn)
+    if not old_parts:
+        df = build_feature_matrix(conn)
+        save_features(conn, df, key)
+        return df
+
+    changed = set(changed_ids)
+    if changed:
+        daughters = pd.read_sql_query(
+            "SELECT individual_id, dam_id FROM sows WHERE dam_id IS NOT NULL",
+            conn)
+        changed |= set(daughters.loc[daughters["dam_id"].isin(changed),
+                                     "individual_id"])
+        fresh = build_feature_matrix(conn, changed)
+        keep = old[~old["individual_id"].isin(changed)]
+        if not fresh.empty:
+            fresh = fresh[["individual_id"] + FEATURE_COLS]
+            keep = pd.concat([keep, fresh], ignore_index=True)
+        df = keep.sort_values(["individual_id", "parity"],
+                              ignore_index=True)
+    else:
+        df = old
+
+    # Herd-relative columns: dam scores (sow_scores) and the label
+    dam = load_dam_scores(conn).set_index("child_id")
+    for col in _DAM_SCORE_COLS:
+        df[col] = df["individual_id"].map(dam[col]).astype(float)
+    df = build_label(df)
+
+    parts = _partitions(df)
+    gone = [sid for sid in old_parts if sid not in parts]
+    conn.executemany("DELETE FROM ml_features WHERE individual_id = ?",
+                     ((sid,) for sid in gone))
+    _write(conn, {sid: blob for sid, blob in parts.items()
+                  if old_parts.get(sid) != blob}, key)
+
+    if verify:
+        _verify(df, build_feature_matrix(conn))
+    return df
+
+
+def _verify(patched: pd.DataFrame, full: pd.DataFrame) -> None:
+    if len(patched) != len(full) or not np.array_equal(
+            patched["individual_id"].to_numpy(), full["individual_id"].to_numpy()):
+        raise ValueError("feature store: rows differ from a full rebuild")
+    a = patched[STORE_COLS].to_numpy(dtype=float)
+    b = full[STORE_COLS].to_numpy(dtype=float)
+    bad = ~np.isclose(a, b, rtol=1e-9, atol=1e-12, equal_nan=True).all(axis=0)
+    if bad.any():
+        cols = [c for c, x in zip(STORE_COLS, bad) if x]
+        raise ValueError(f"feature store: columns differ from a full rebuild: {cols}")
+
+
+def get_feature_matrix(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Load the feature matrix from the store, patching or rebuilding it when stale."""
+    df = load_features(conn)
+    if df is not None:
+        return df
+    pending = _pending(conn)
+    if pending is not None:
+        return update_features(conn, pending)
+    df = build_feature_matrix(conn)
+    save_features(conn, df)
+    return df
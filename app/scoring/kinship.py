@@ -0,0 +1,292 @@
+"""Inbreeding and kinship coefficients over the unified pedigree.
+
+The pedigree joins every sow, every piglet that was not kept as a sow
+(a kept piglet *is* sow ``"TB" + piglet_no``) and every sire id referenced
+by either table; sires are founders.  Animals are put in topological order
+(parents first) and processed with the Meuwissen–Luo decomposition
+A = T D T', where row i of T holds the contributions of i's ancestors
+
+    T[i, i] = 1,  T[i, j] = ½ (T[sire, j] + T[dam, j])
+
+and D is the Mendelian sampling variance
+
+    D[i] = ½ − ¼ (F_sire + F_dam)      (F of an unknown parent = −1)
+
+so F_i = f(sire, dam) and the kinship (coancestry) of any two animals is
+
+    f(a, b) = ½ Σ_j T[a, j] T[b, j] D[j].
+
+T rows are only materialised for animals that need them (parents and
+animals asked about) and are cached as sparse dicts; piglets, most of the
+pedigree, never get one.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from collections import deque
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+
+class Pedigree:
+    """Unified animal pedigree in topological order (parents first)."""
+
+    def __init__(self, ids: list[str], types: list[str],
+                 sire: np.ndarray, dam: np.ndarray):
+        self.ids = ids
+        self.types = types
+        self.sire = sire          # index into ids, -1 = unknown
+        self.dam = dam
+        self.index = {a: i for i, a in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def ancestry_stamps(self, ids: list[str]) -> dict[str, str]:
+        """Per-animal hash of its id and, recursively, its parents' stamps.
+
+        f(a, b) only reads a's and b's ancestors, so it is unchanged while
+        both stamps are.  Unknown ids are left out.
+        """
+        todo = [self.index[a] for a in ids if a in self.index]
+        need: set[int] = set()
+        while todo:
+            i = todo.pop()
+            if i not in need:
+                need.add(i)
+                todo += [int(p) for p in (self.sire[i], self.dam[i]) if p >= 0]
+        stamps: dict[int, str] = {}
+        for i in sorted(need):      # topological order: parents first
+            h = hashlib.sha1(self.ids[i].encode())
+            for p in (self.sire[i], self.dam[i]):
+                h.update(b"|" + (stamps[int(p)].encode() if p >= 0 else b"-"))
+            stamps[i] = h.hexdigest()
+        return {a: stamps[self.index[a]] for a in ids if a in self.index}
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection) -> Pedigree:
+        sows = conn.execute(
+            "SELECT individual_id, dam_id, sire_id FROM sows"
+        ).fetchall()
+        sow_ids = {r["individual_id"] for r in sows}
+        piglets = [
+            r for r in conn.execute(
+                "SELECT piglet_no, dam_id, sire_id FROM piglets"
+            ).fetchall()
+            if "TB" + r["piglet_no"] not in sow_ids
+        ]
+
+        animals: dict[str, tuple[str, str | None, str | None]] = {}
+        for r in sows:
+            animals[r["individual_id"]] = ("sow", r["dam_id"], r["sire_id"])
+        for r in piglets:
+            animals.setdefault(r["piglet_no"],
+                               ("piglet", r["dam_id"], r["sire_id"]))
+        for _t, _d, s in list(animals.values()):
+            if s and s not in animals:
+                animals[s] = ("sire", None, None)
+        return cls._ordered(animals)
+
+    @classmethod
+    def _ordered(cls, animals: dict[str, tuple[str, str | None, str | None]]
+                 ) -> Pedigree:
+        """Kahn's algorithm; animals on a pedigree cycle lose their parents."""
+        ids = sorted(animals)
+        pos = {a: i for i, a in enumerate(ids)}
+        parents = [
+            [pos[p] for p in (animals[a][2], animals[a][1])
+             if p in pos and p != a]
+            for a in ids
+        ]
+        children: list[list[int]] = [[] for _ in ids]
+        indeg = [0] * len(ids)
+        for i, ps in enumerate(parents):
+            for p in set(ps):
+                children[p].append(i)
+                indeg[i] += 1
+
+        order: list[int] = []
+        queue = deque(i for i, d in enumerate(indeg) if d == 0)
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for c in children[i]:
+                indeg[c] -= 1
+                if indeg[c] == 0:
+                    queue.append(c)
+        done = set(order)
+        cyclic = [i for i in range(len(ids)) if i not in done]
+        order += cyclic
+        cut = set(cyclic)
+
+        new_pos = {old: new for new, old in enumerate(order)}
+        sire = np.full(len(ids), -1, dtype=np.int64)
+        dam = np.full(len(ids), -1, dtype=np.int64)
+        for new, old in enumerate(order):
+            if old in cut:
+                continue
+            _t, d, s = animals[ids[old]]
+            if s in pos and s != ids[old]:
+                sire[new] = new_pos[pos[s]]
+            if d in pos and d != ids[old]:
+                dam[new] = new_pos[pos[d]]
+        return cls([ids[i] for i in order],
+                   [animals[ids[i]][0] for i in order], sire, dam)
+
+
+class KinshipCalculator:
+    """On-demand kinship from cached sparse T rows (see module docstring)."""
+
+    def __init__(self, pedigree: Pedigree, inbreeding: np.ndarray | None = None):
+        self.ped = pedigree
+        n = len(pedigree)
+        self._rows: dict[int, dict[int, float]] = {}
+        if inbreeding is None:
+            self.F = np.zeros(n)
+            self.D = np.ones(n)
+            self._compute_inbreeding()
+        else:
+            self.F = inbreeding
+            self.D = self._mendelian_var(inbreeding)
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection,
+                pedigree: Pedigree | None = None) -> KinshipCalculator:
+        """Build from the DB, reusing stored F values when they are complete."""
+        ped = pedigree or Pedigree.from_db(conn)
+        stored = {
+            r[0]: r[1] for r in conn.execute(
+                "SELECT animal_id, inbreeding FROM inbreeding_coefficients"
+            ).fetchall()
+        }
+        if len(stored) == len(ped) and all(a in stored for a in ped.ids):
+            return cls(ped, np.array([stored[a] for a in ped.ids], dtype=float))
+        return cls(ped)
+
+    def _mendelian_var(self, F: np.ndarray) -> np.ndarray:
+        fs = np.where(self.ped.sire >= 0, F[self.ped.sire], -1.0)
+        fd = np.where(self.ped.dam >= 0, F[self.ped.dam], -1.0)
+        return 0.5 - 0.25 * (fs + fd)
+
+    def _compute_inbreeding(self) -> None:
+        """Meuwissen–Luo pass in topological order.
+
+        Offspring of the same (sire, dam) pair share F, so each distinct
+        mating is evaluated once.
+        """
+        sire, dam = self.ped.sire, self.ped.dam
+        pair_f: dict[tuple[int, int], float] = {}
+        for i in range(len(self.ped)):
+            s, d = int(sire[i]), int(dam[i])
+            if s >= 0 and d >= 0:
+                key = (s, d)
+                f = pair_f.get(key)
+                if f is None:
+                    f = pair_f[key] = self._coancestry(s, d)
+                self.F[i] = f
+            fs = self.F[s] if s >= 0 else -1.0
+            fd = self.F[d] if d >= 0 else -1.0
+            self.D[i] = 0.5 - 0.25 * (fs + fd)
+
+    def row(self, i: int) -> dict[int, float]:
+        """Sparse T row of animal index i: {ancestor index: contribution}."""
+        row = self._rows.get(i)
+        if row is not None:
+            return row
+        # Build missing ancestor rows bottom-up (no recursion)
+        stack = [i]
+        while stack:
+            j = stack[-1]
+            pending = [p for p in (int(self.ped.sire[j]), int(self.ped.dam[j]))
+                       if p >= 0 and p not in self._rows]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if j in self._rows:
+                continue
+            r = {j: 1.0}
+            for p in (int(self.ped.sire[j]), int(self.ped.dam[j])):
+                if p >= 0:
+                    for k, v in self._rows[p].items():
+                        r[k] = r.get(k, 0.0) + 0.5 * v
+            self._rows[j] = r
+        return self._rows[i]
+
+    def _coancestry(self, i: int, j: int) -> float:
+        ri, rj = self.row(i), self.row(j)
+        if len(ri) > len(rj):
+            ri, rj = rj, ri
+        D = self.D
+        return 0.5 * sum(v * rj[k] * D[k] for k, v in ri.items() if k in rj)
+
+    def kinship(self, a: str, b: str) -> float:
+        """Coefficient of kinship f(a, b); f(a, a) = ½ (1 + F_a).
+
+        The expected inbreeding of an a × b offspring.  Unknown ids → 0.
+        """
+        i, j = self.ped.index.get(a), self.ped.index.get(b)
+        if i is None or j is None:
+            return 0.0
+        return self._coancestry(i, j)
+
+    def relationship(self, a: str, b: str) -> float:
+        """Additive relationship a(a, b) = 2 f(a, b)."""
+        return 2.0 * self.kinship(a, b)
+
+    def inbreeding(self, a: str) -> float:
+        i = self.ped.index.get(a)
+        return float(self.F[i]) if i is not None else 0.0
+
+    def t_matrix(self, ids: list[str]) -> sparse.csr_matrix:
+        """Stacked T rows (len(ids) × n_animals); unknown ids give empty rows."""
+        from scipy import sparse
+
+        indptr = [0]
+        cols: list[int] = []
+        vals: list[float] = []
+        for a in ids:
+            i = self.ped.index.get(a)
+            if i is not None:
+                r = self.row(i)
+                cols.extend(r.keys())
+                vals.extend(r.values())
+            indptr.append(len(cols))
+        return sparse.csr_matrix(
+            (np.array(vals, dtype=float), np.array(cols, dtype=np.int64),
+             np.array(indptr, dtype=np.int64)),
+            shape=(len(ids), len(self.ped)))
+
+    def kinship_block(self, ids_a: list[str], ids_b: list[str]) -> np.ndarray:
+        """Kinship of every a × b pair as a dense (len(ids_a), len(ids_b)) array."""
+        from scipy import sparse
+
+        ta = self.t_matrix(ids_a)
+        tb = self.t_matrix(ids_b)
+        return (ta @ sparse.diags(0.5 * self.D) @ tb.T).toarray()
+
+
+def run_inbreeding(conn: sqlite3.Connection, progress_cb=None) -> None:
+    """Compute F and D for every animal and rebuild inbreeding_coefficients."""
+    if progress_cb:
+        progress_cb("近交係数計算中...")
+    calc = KinshipCalculator(Pedigree.from_db(conn))
+    ped = calc.ped
+    conn.execute("DELETE FROM inbreeding_coefficients")
+    conn.executemany(
+        """INSERT INTO inbreeding_coefficients
+           (animal_id, animal_type, sire_id, dam_id, inbreeding, mendelian_var)
+           VALUES (?,?,?,?,?,?)""",
+        [(a, t,
+          ped.ids[s] if s >= 0 else None, ped.ids[d] if d >= 0 else None,
+          float(f), float(dv))
+         for a, t, s, d, f, dv in zip(ped.ids, ped.types, ped.sire.tolist(),
+                                      ped.dam.tolist(), calc.F, calc.D)],
+    )
+    conn.commit()
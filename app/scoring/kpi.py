@@ -0,0 +1,176 @@
+"""Reproductive KPIs from breeding, farrowing and cull records.
+
+Services, farrowings and weanings are treated as per-sow event streams
+sorted by their integer day numbers (``app.db.days``) and linked with ``merge_asof`` instead of per-sow loops:
+
+- previous weaning  = last weaning on or before the service   (backward)
+- resulting litter  = first farrowing within GESTATION_MAX days (forward)
+- next event        = next service of the same sow, else the cull date
+
+Per service (= per parity in ``breeding_records``):
+
+    wean_to_service_days  service − previous weaning
+    gestation_days        farrowing − service (conceived services only)
+    conceived             a farrowing followed within the window
+    repeat_service        ``return_to_estrus`` is marked (再帰)
+    non_productive_days   conceived: wean_to_service_days
+                          not conceived: next event − (previous weaning
+                          or the service itself)
+
+Sow totals add ``cull_records.non_productive_days`` to the NPD sum.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from app.db.days import from_days
+
+GESTATION_MIN = 100
+GESTATION_MAX = 130
+# A weaning older than this is not the service's "previous weaning"
+# (gilts, or a record gap)
+WEAN_LOOKBACK_DAYS = 120
+
+
+def _services(conn: sqlite3.Connection) -> pd.DataFrame:
+    df = pd.read_sql_query(
+        """SELECT individual_id, parity, breeding_date_day AS service_day,
+                  return_to_estrus
+           FROM breeding_records
+           WHERE breeding_date_day IS NOT NULL
+           ORDER BY breeding_date_day""",
+        conn,
+    )
+    df["repeat_service"] = (
+        df["return_to_estrus"].fillna("").str.strip() != "").astype(int)
+    return df.drop(columns=["return_to_estrus"])
+
+
+def service_kpis(conn: sqlite3.Connection) -> pd.DataFrame:
+    """One row per service with the per-parity KPIs (see module docstring)."""
+    svc = _services(conn)
+    if svc.empty:
+        return svc
+
+    weanings = pd.read_sql_query(
+        """SELECT individual_id, weaning_date_day AS wean_day
+           FROM farrowing_records WHERE weaning_date_day IS NOT NULL
+           ORDER BY weaning_date_day""", conn)
+    farrowings = pd.read_sql_query(
+        """SELECT individual_id, farrowing_date_day AS farrow_day
+           FROM farrowing_records WHERE farrowing_date_day IS NOT NULL
+           ORDER BY farrowing_date_day""", conn)
+    culls = pd.read_sql_query(
+        """SELECT individual_id, MIN(event_date_day) AS cull_day
+           FROM cull_records WHERE event_date_day IS NOT NULL
+           GROUP BY individual_id""", conn)
+
+    df = pd.merge_asof(
+        svc, weanings, left_on="service_day", right_on="wean_day",
+        by="individual_id", direction="backward",
+        tolerance=WEAN_LOOKBACK_DAYS)
+    df = pd.merge_asof(
+        df, farrowings, left_on="service_day", right_on="farrow_day",
+        by="individual_id", direction="forward",
+        tolerance=GESTATION_MAX)
+
+    df = df.sort_values(["individual_id", "service_day"])
+    df["next_service"] = df.groupby("individual_id")["service_day"].shift(-1)
+    df = df.merge(culls, on="individual_id", how="left")
+
+    # Day numbers are plain integers: intervals are subtractions
+    service = df["service_day"].to_numpy(dtype=float)
+    gest = df["farrow_day"].to_numpy(dtype=float) - service
+    conceived = (gest >= GESTATION_MIN) & (gest <= GESTATION_MAX)
+    df["conceived"] = conceived.astype(int)
+    df["gestation_days"] = np.where(conceived, gest, np.nan)
+    wean = df["wean_day"].to_numpy(dtype=float)
+    df["wean_to_service_days"] = service - wean
+
+    next_event = df["next_service"].fillna(df["cull_day"]).to_numpy(dtype=float)
+    open_from = np.where(np.isnan(wean), service, wean)
+    df["non_productive_days"] = np.where(
+        conceived, df["wean_to_service_days"], next_event - open_from)
+    df["breeding_date"] = from_days(df["service_day"])
+    return df[["individual_id", "parity", "breeding_date",
+               "wean_to_service_days", "gestation_days", "conceived",
+               "repeat_service", "non_productive_days"]]
+
+
+def sow_kpis(conn: sqlite3.Connection, per_service: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate per-service KPIs to one row per sow (plus cull NPD)."""
+    agg = per_service.groupby("individual_id").agg(
+        n_services=("parity", "count"),
+        n_farrowed=("conceived", "sum"),
+        repeat_count=("repeat_service", "sum"),
+        avg_wean_to_service=("wean_to_service_days", "mean"),
+        avg_gestation=("gestation_days", "mean"),
+        service_npd=("non_productive_days", "sum"),
+    ).reset_index()
+    agg["conception_rate"] = agg["n_farrowed"] / agg["n_services"]
+    agg["repeat_rate"] = agg["repeat_count"] / agg["n_services"]
+
+    cull = pd.read_sql_query(
+        """SELECT individual_id, SUM(non_productive_days) AS cull_npd
+           FROM cull_records GROUP BY individual_id""",
+        conn,
+    )
+    agg = agg.merge(cull, on="individual_id", how="left")
+    agg["npd_total"] = agg["service_npd"] + agg["cull_npd"].fillna(0)
+    return agg.drop(columns=["service_npd"])
+
+
+def _nullable(v):
+    """numpy/pandas scalar → Python value, NaN → None."""
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return None
+    return v.item() if hasattr(v, "item") else v
+
+
+def run_kpis(conn: sqlite3.Connection, progress_cb=None) -> None:
+    """Rebuild reproductive_kpis and sow_kpis."""
+    if progress_cb:
+        progress_cb("繁殖KPI計算中...")
+    conn.execute("DELETE FROM reproductive_kpis")
+    conn.execute("DELETE FROM sow_kpis")
+    per_service = service_kpis(conn)
+    if per_service.empty:
+        conn.commit()
+        return
+
+    svc = per_service
+    cols = list(svc.columns)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO reproductive_kpis ({','.join(cols)}) "
+        f"VALUES ({','.join('?' * len(cols))})",
+        [tuple(_nullable(v) for v in row)
+         for row in svc.itertuples(index=False, name=None)],
+    )
+
+    sows = sow_kpis(conn, per_service)
+    cols = list(sows.columns)
+    conn.executemany(
+        f"INSERT INTO sow_kpis ({','.join(cols)}) "
+        f"VALUES ({','.join('?' * len(cols))})",
+        [tuple(_nullable(v) for v in row)
+         for row in sows.itertuples(index=False, name=None)],
+    )
+    conn.commit()
+
+
+def load_parity_kpis(conn: sqlite3.Connection,
+                     id_filter: str = "") -> pd.DataFrame:
+    """(individual_id, parity, wean_to_service_days, gestation_days) for ML.
+
+    *id_filter* restricts individual_id, e.g. ``"IN (SELECT ...)"``.
+    """
+    where = f"WHERE individual_id {id_filter}" if id_filter else ""
+    return pd.read_sql_query(
+        f"""SELECT individual_id, parity, wean_to_service_days, gestation_days
+            FROM reproductive_kpis {where}""",
+        conn,
+    )
@@ -0,0 +1,177 @@
+"""Maternal-line (lineage) evaluation.
+
+Every sow belongs to the lineage of her furthest known maternal ancestor
+(the root: a sow whose dam is unknown or not in ``sows``).  Membership is
+resolved for the whole herd at once with pointer jumping over the dam
+index array, and ``has_active`` (the sow or a descendant is active) is
+propagated one generation at a time.  Lineage figures are then a single
+GROUP BY over ``lineage_members``:
+
+    lineage_score = avg_score × log(active_count + 1)
+
+for two views: ``all`` (every member) and ``active`` (members on a branch
+that still has an active sow, as in the pedigree "稼働母豚のみ" filter).
+
+A missing status counts as active, like the ``sows.status`` default and
+the pedigree views.  The pipeline rebuilds lineages in full after every
+ETL (a rescore also moves the top-10% threshold for every lineage).
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+
+import numpy as np
+
+from app.scoring.percentiles import top_threshold
+
+VIEWS = ("all", "active")
+
+
+def _resolve_members(ids: list[str], dams: list[str | None],
+                     active: list[bool]
+                     ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (root index, generation, has_active) per sow.
+
+    Sows caught in a dam cycle never reach a root and get root index -1.
+    """
+    n = len(ids)
+    index = {sid: i for i, sid in enumerate(ids)}
+    parent = np.array([index.get(d, -1) if d else -1 for d in dams],
+                      dtype=np.int64)
+    self_idx = np.arange(n)
+    is_root = parent < 0
+
+    # Pointer jumping: ptr → root, dist → generation
+    ptr = np.where(is_root, self_idx, parent)
+    dist = (~is_root).astype(np.int64)
+    for _ in range(max(1, n).bit_length() + 1):
+        nxt = ptr[ptr]
+        if np.array_equal(nxt, ptr):
+            break
+        dist = dist + dist[ptr]
+        ptr = nxt
+    resolved = is_root[ptr]
+    root = np.where(resolved, ptr, -1)
+    generation = np.where(resolved, dist, -1)
+
+    # has_active: bottom-up, one generation per step
+    has_active = np.asarray(active, dtype=bool) & resolved
+    for g in range(int(generation.max(initial=0)), 0, -1):
+        sel = (generation == g) & has_active
+        has_active[parent[sel]] = True
+    return root, generation, has_active
+
+
+def _write_members(conn: sqlite3.Connection, ids: list[str],
+                   root: np.ndarray, generation: np.ndarray,
+                   has_active: np.ndarray) -> None:
+    conn.executemany(
+        """INSERT OR REPLACE INTO lineage_members
+           (individual_id, root_id, generation, has_active)
+           VALUES (?,?,?,?)""",
+        [(ids[i], ids[root[i]], int(generation[i]), int(has_active[i]))
+         for i in range(len(ids)) if root[i] >= 0],
+    )
+
+
+def _aggregate(conn: sqlite3.Connection) -> None:
+    """Recompute lineage_scores from lineage_members."""
+    thr = top_threshold(conn, 0.10)
+    conn.execute("DELETE FROM lineage_scores")
+
+    out: list[tuple] = []
+    for view in VIEWS:
+        active_only = 1 if view == "active" else 0
+        rows = conn.execute(
+            """SELECT m.root_id,
+                       COUNT(*) AS members,
+                       COUNT(CASE WHEN COALESCE(s.status, 'active') = 'active'
+                                  THEN 1 END) AS active_count,
+                       COUNT(CASE WHEN sc.total_score >= ? THEN 1 END)
+                         AS top_count,
+                       AVG(CASE WHEN sc.total_score != 0
+                                THEN sc.total_score END) AS avg_score
+                FROM lineage_members m
+                JOIN sows s ON m.individual_id = s.individual_id
+                LEFT JOIN sow_scores sc ON m.individual_id = sc.individual_id
+                WHERE (? = 0 OR m.has_active = 1)
+                GROUP BY m.root_id""",
+            [thr, active_only],
+        ).fetchall()
+        for r in rows:
+            avg = r["avg_score"] or 0.0
+            out.append((
+                view, r["root_id"],
+                avg * math.log(r["active_count"] + 1.0), avg,
+                r["active_count"], r["top_count"], r["members"],
+            ))
+    conn.executemany(
+        """INSERT INTO lineage_scores
+           (view, root_id, lineage_score, avg_score,
+            active_count, top_count, members)
+           VALUES (?,?,?,?,?,?,?)""",
+        out,
+    )
+
+
+def run_lineage(conn: sqlite3.Connection, progress_cb=None) -> None:
+    """Full rebuild of lineage_members and lineage_scores."""
+    if progress_cb:
+        progress_cb("系統評価計算中...")
+    rows = conn.execute(
+        "SELECT individual_id, dam_id, status FROM sows"
+    ).fetchall()
+    ids = [r["individual_id"] for r in rows]
+    root, generation, has_active = _resolve_members(
+        ids, [r["dam_id"] for r in rows],
+        [(r["status"] or "active") == "active" for r in rows])
+
+    conn.execute("DELETE FROM lineage_members")
+    _write_members(conn, ids, root, generation, has_active)
+    _aggregate(conn)
+    conn.commit()
+
+
+def load_lineage_lane(conn: sqlite3.Connection,
+                      view: str = "all") -> list[sqlite3.Row]:
+    """Lineage ranking rows for one view, best first."""
+    return conn.execute(
+        """SELECT root_id, lineage_score, avg_score,
+                  active_count, top_count, members
+           FROM lineage_scores
+           WHERE view = ?
+           ORDER BY lineage_score DESC, top_count DESC,
+                    active_count DESC, members DESC, root_id""",
+        (view,),
+    ).fetchall()
+
+
+def load_member_roots(conn: sqlite3.Connection) -> dict[str, str]:
+    """{individual_id: root_id} for every resolved sow."""
+    return {
+        r[0]: r[1] for r in conn.execute(
+            "SELECT individual_id, root_id FROM lineage_members"
+        ).fetchall()
+    }
+
+
+def lineage_ml_summary(conn: sqlite3.Connection, view: str,
+                       threshold: float) -> dict[str, tuple[float, int]]:
+    """{root_id: (mean of members' avg ML prob, members with avg ≥ threshold)}."""
+    active_only = 1 if view == "active" else 0
+    rows = conn.execute(
+        """SELECT m.root_id,
+                  AVG(p.avg_prob) AS ml_avg,
+                  COUNT(CASE WHEN p.avg_prob >= ? THEN 1 END) AS ml_high
+           FROM lineage_members m
+           JOIN (SELECT individual_id,
+                        AVG(pred_excellent_prob) AS avg_prob
+                 FROM ml_predictions GROUP BY individual_id) p
+             ON m.individual_id = p.individual_id
+           WHERE (? = 0 OR m.has_active = 1)
+           GROUP BY m.root_id""",
+        (threshold, active_only),
+    ).fetchall()
+    return {r["root_id"]: (r["ml_avg"] or 0.0, r["ml_high"]) for r in rows}
@@ -0,0 +1,139 @@
+"""Mating recommendations: active sows × candidate sires.
+
+For each pair the expected offspring merit is the mean of the parents'
+EBVs (index over born_alive and weaned) and the offspring's inbreeding
+coefficient is the parents' kinship:
+
+    Merit = ½ (I_sow + I_sire) − INBREEDING_PENALTY · f(sow, sire)
+
+The sow × sire kinship block is computed in one sparse product (see
+``KinshipCalculator.kinship_block``) and cached in ``kinship_cache``.
+Each pair stores the ancestry stamps of its sow and sire (see
+``Pedigree.ancestry_stamps``), so after a data change only pairs whose
+sow or sire gained / lost an ancestor link are recomputed; new piglets
+and unrelated sows leave the rest of the cache valid.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+
+from app.scoring.kinship import KinshipCalculator, Pedigree
+
+# EBV index weights (per piglet)
+W_EBV_BORN_ALIVE = 0.6
+W_EBV_WEANED = 0.4
+
+# Merit lost per unit of offspring inbreeding (F = 0.0625 → −0.625)
+INBREEDING_PENALTY = 10.0
+# Pairs above this offspring F are flagged and ranked after all others
+MAX_OFFSPRING_F = 0.0625
+
+TOP_K = 5
+
+def sow_sire_kinship(conn: sqlite3.Connection, sows: list[str],
+                     sires: list[str]) -> np.ndarray:
+    """(len(sows), len(sires)) kinship, served from kinship_cache when valid."""
+    ped = Pedigree.from_db(conn)
+    stamps = ped.ancestry_stamps(sows + sires)
+
+    sow_pos = {s: i for i, s in enumerate(sows)}
+    sire_pos = {s: j for j, s in enumerate(sires)}
+    out = np.full((len(sows), len(sires)), np.nan)
+    stale = []
+    for r in conn.execute(
+            "SELECT sow_id, sire_id, kinship, sow_stamp, sire_stamp "
+            "FROM kinship_cache"):
+        i, j = sow_pos.get(r[0]), sire_pos.get(r[1])
+        if (i is None or j is None or r[3] != stamps.get(r[0], "")
+                or r[4] != stamps.get(r[1], "")):
+            stale.append((r[0], r[1]))
+        else:
+            out[i, j] = r[2]
+    conn.executemany(
+        "DELETE FROM kinship_cache WHERE sow_id = ? AND sire_id = ?", stale)
+
+    # New / changed sows against every sire, then the remaining gaps
+    # (new / changed sires) only for the sows that still lack them
+    missing = np.isnan(out)
+    calc = None
+    rows = np.flatnonzero(missing.all(axis=1))
+    rest = np.flatnonzero(missing.any(axis=1) & ~missing.all(axis=1))
+    cols = np.flatnonzero(missing[rest].any(axis=0))
+    for ri, ci in ((rows, np.arange(len(sires))), (rest, cols)):
+        if len(ri) == 0 or len(ci) == 0:
+            continue
+        if calc is None:
+            calc = KinshipCalculator.from_db(conn, ped)
+        out[np.ix_(ri, ci)] = calc.kinship_block(
+            [sows[i] for i in ri], [sires[j] for j in ci])
+
+    conn.executemany(
+        """INSERT OR REPLACE INTO kinship_cache
+           (sow_id, sire_id, kinship, sow_stamp, sire_stamp)
+           VALUES (?,?,?,?,?)""",
+        [(sows[i], sires[j], float(out[i, j]),
+          stamps.get(sows[i], ""), stamps.get(sires[j], ""))
+         for i, j in zip(*np.nonzero(missing))],
+    )
+    conn.commit()
+    return out
+
+
+def run_mating_plan(conn: sqlite3.Connection, progress_cb=None,
+                    top_k: int = TOP_K) -> None:
+    """Rebuild mating_plan with the top_k sires for every active sow."""
+    if progress_cb:
+        progress_cb("交配計画計算中...")
+    conn.execute("DELETE FROM mating_plan")
+
+    sows = conn.execute(
+        """SELECT s.individual_id,
+                  COALESCE(bv.ebv_born_alive, 0) AS ebv_ba,
+                  COALESCE(bv.ebv_weaned, 0) AS ebv_w
+           FROM sows s
+           LEFT JOIN breeding_values bv ON s.individual_id = bv.animal_id
+           WHERE s.status = 'active'
+           ORDER BY s.individual_id"""
+    ).fetchall()
+    sires = conn.execute(
+        """SELECT sire_id,
+                  COALESCE(ebv_born_alive, 0) AS ebv_ba,
+                  COALESCE(ebv_weaned, 0) AS ebv_w
+           FROM sire_scores ORDER BY sire_id"""
+    ).fetchall()
+    if not sows or not sires:
+        conn.commit()
+        return
+
+    sow_ids = [r["individual_id"] for r in sows]
+    sire_ids = [r["sire_id"] for r in sires]
+    sow_index = np.array([W_EBV_BORN_ALIVE * r["ebv_ba"] + W_EBV_WEANED * r["ebv_w"]
+                          for r in sows])
+    sire_index = np.array([W_EBV_BORN_ALIVE * r["ebv_ba"] + W_EBV_WEANED * r["ebv_w"]
+                           for r in sires])
+
+    f = sow_sire_kinship(conn, sow_ids, sire_ids)
+    expected = 0.5 * (sow_index[:, None] + sire_index[None, :])
+    merit = expected - INBREEDING_PENALTY * f
+    over = f > MAX_OFFSPRING_F
+
+    # Rank: allowed pairs first, then by merit (ties keep sire_id order)
+    k = min(top_k, len(sire_ids))
+    order = np.lexsort((-merit, over), axis=1)[:, :k]
+
+    rows = []
+    for i, sid in enumerate(sow_ids):
+        for rank, j in enumerate(order[i], 1):
+            rows.append((sid, sire_ids[j], rank, float(merit[i, j]),
+                         float(expected[i, j]), float(f[i, j]), int(over[i, j])))
+    conn.executemany(
+        """INSERT INTO mating_plan
+           (individual_id, sire_id, rank, merit, expected_ebv,
+            offspring_inbreeding, over_limit)
+           VALUES (?,?,?,?,?,?,?)""",
+        rows,
+    )
+    conn.commit()
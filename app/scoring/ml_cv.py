@@ -0,0 +1,92 @@
+"""Cross-validation fold scheduler for MLEngine.train.
+
+Folds run concurrently in a process pool.  The CPU budget is split so the
+machine is not oversubscribed:
+
+    workers      = min(n_folds, cores)
+    num_threads  = max(1, cores // workers)   (LightGBM threads per fold)
+
+Each finished fold's AUC is reported through ``progress_cb`` as it
+arrives.  Worker processes are spawned (the Windows default, and safe
+from a Qt thread); this module keeps its imports light because every
+worker imports it.  ``_fit_fold`` is shared with the hyperparameter
+search (app.scoring.ml_tune), which adds early stopping.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import numpy as np
+
+
+def thread_budget(n_folds: int, max_workers: int | None = None,
+                  cores: int | None = None) -> tuple[int, int]:
+    """(parallel folds, LightGBM threads per fold) for this machine."""
+    cores = cores or os.cpu_count() or 1
+    workers = max(1, min(n_folds, cores, max_workers or cores))
+    return workers, max(1, cores // workers)
+
+
+def _fit_fold(fold: int, X_train: np.ndarray, y_train: np.ndarray,
+              X_val: np.ndarray, y_val: np.ndarray, params: dict,
+              early_stopping: int = 0) -> tuple[int, np.ndarray, float, int]:
+    """Train one fold; returns (fold, validation probabilities, AUC, trees).
+
+    With *early_stopping* > 0 training stops once the validation AUC has
+    not improved for that many rounds, and ``trees`` is the best iteration.
+    """
+    import lightgbm as lgb
+    from sklearn.metrics import roc_auc_score
+
+    callbacks = [lgb.log_evaluation(period=0)]
+    if early_stopping:
+        callbacks.append(lgb.early_stopping(early_stopping, verbose=False))
+    model = lgb.LGBMClassifier(**params)
+    model.fit(
+        X_train, y_train,
+        eval_set=[(X_val, y_val)],
+        callbacks=callbacks,
+    )
+    probs = model.predict_proba(X_val)[:, 1]
+    auc = roc_auc_score(y_val, probs) if len(np.unique(y_val)) > 1 else float("nan")
+    trees = model.best_iteration_ or model.n_estimators
+    return fold, probs, auc, trees
+
+
+def run_folds(X: np.ndarray, y: np.ndarray,
+              splits: list[tuple[np.ndarray, np.ndarray]], params: dict,
+              progress_cb=None,
+              max_workers: int | None = None) -> np.ndarray:
+    """Out-of-fold probabilities for *splits* (list of (train_idx, val_idx))."""
+    n = len(splits)
+    workers, threads = thread_budget(n, max_workers)
+    fold_params = {**params, "n_jobs": threads}
+    oof = np.zeros(len(y))
+
+    def _report(fold: int, auc: float, done: int) -> None:
+        if progress_cb:
+            progress_cb(f"Fold {fold}/{n} 完了 (AUC={auc:.4f})  [{done}/{n}]")
+
+    jobs = [(fold, X[tr], y[tr], X[va], y[va], fold_params)
+            for fold, (tr, va) in enumerate(splits, 1)]
+    if progress_cb:
+        progress_cb(f"CV {n}fold 学習中... (並列{workers} × {threads}スレッド)")
+
+    if workers == 1:
+        for done, job in enumerate(jobs, 1):
+            fold, probs, auc, _ = _fit_fold(*job)
+            oof[splits[fold - 1][1]] = probs
+            _report(fold, auc, done)
+        return oof
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(_fit_fold, *job) for job in jobs]
+        for done, fut in enumerate(as_completed(futures), 1):
+            fold, probs, auc, _ = fut.result()
+            oof[splits[fold - 1][1]] = probs
+            _report(fold, auc, done)
+    return oof
@@ -1,30 +1,51 @@
 """LightGBM-based sow excellence classifier with SHAP explanations.
 
 MLEngine wraps model training (GroupKFold CV), prediction, SHAP value
-computation, and model persistence.
+computation, and model versioning. SHAP values are computed once per
+model version and feature matrix (app.scoring.ml_explain.ShapCache).
+
+Trained models live in the registry (app.scoring.model_registry); the
+booster is read from disk on first use.  ``activate`` switches the
+active version while the app is running: predictions already cached for
+that version (ml_prediction_cache) are republished without re-predicting.
+
+``tune`` searches LightGBM parameters within a time budget
+(app.scoring.ml_tune) and trains the winner; its parameters and
+early-stopping tree count are stored in the registry metadata.
+
+LightGBM and scikit-learn are imported inside ``train`` (and by the
+registry when a booster is first loaded), so importing this module —
+which the GUI does at start-up — stays cheap.
 """
 
 from __future__ import annotations
 
 import json
+import os
 import sqlite3
 from datetime import datetime
-from pathlib import Path
+from itertools import repeat
+from typing import TYPE_CHECKING
 
 import numpy as np
 import pandas as pd
-import lightgbm as lgb
-import shap
-from sklearn.model_selection import GroupKFold
-from sklearn.metrics import roc_auc_score, accuracy_score, f1_score
-
-from app.scoring.ml_features import (
-    FEATURE_COLS,
-    build_feature_matrix,
+
+from app.db.schema import data_generation
+from app.scoring.feature_store import get_feature_matrix, schema_hash, store_key
+from app.scoring.ml_cv import run_folds
+from app.scoring.ml_explain import (
+    DEFAULT_BACKEND,
+    ShapCache,
+    compute_shap_cache,
+    to_explanation,
 )
+from app.scoring.ml_features import FEATURE_COLS
+from app.scoring.ml_tune import successive_halving
+from app.scoring.model_registry import ModelRegistry
 
-MODEL_DIR = Path(__file__).resolve().parent.parent.parent / "models"
-MODEL_PATH = MODEL_DIR / "lgbm_sow.txt"
+if TYPE_CHECKING:
+    import lightgbm as lgb
+    import shap
 
 # Conservative hyperparameters for small dataset (~7,800 rows)
 LGB_PARAMS = {
@@ -43,32 +64,106 @@ LGB_PARAMS = {
     "random_state": 42,
 }
 
+# Model versions whose predictions are kept in ml_prediction_cache
+PREDICTION_CACHE_VERSIONS = 5
+
+# Default wall-clock budget of tune() in seconds
+TUNE_BUDGET_S = 300
+
+
+def is_compatible(meta: dict) -> bool:
+    """Whether a registered model was trained on the current feature set."""
+    if "feature_hash" in meta:
+        return meta["feature_hash"] == schema_hash()
+    return meta.get("feature_cols") == FEATURE_COLS
+
 
 class MLEngine:
     """LightGBM sow excellence classifier."""
 
-    def __init__(self):
-        self.model: lgb.LGBMClassifier | None = None
+    def __init__(self, explain_backend: str = DEFAULT_BACKEND,
+                 registry: ModelRegistry | None = None):
+        self.registry = registry or ModelRegistry()
         self.version: str = ""
+        self._booster: lgb.Booster | None = None
         self._feature_matrix: pd.DataFrame | None = None
+        self._feature_key: str | None = None
+        self._shap: ShapCache | None = None
+        # "native" (LightGBM pred_contrib) or "shap"; see ml_explain
+        self.explain_backend = explain_backend
+
+    @property
+    def booster(self) -> lgb.Booster | None:
+        """Booster of the selected version, loaded on first use."""
+        if self._booster is None and self.version:
+            self._booster = self.registry.booster(self.version)
+        return self._booster
+
+    def _require_model(self) -> lgb.Booster:
+        booster = self.booster
+        if booster is None:
+            raise RuntimeError("モデルが未学習です。先にtrain()を実行してください。")
+        return booster
+
+    def _select(self, version: str, booster: lgb.Booster | None = None) -> None:
+        # Swap the model and drop everything derived from the old one
+        self.version = version
+        self._booster = booster
+        self._shap = None
+
+    def _features(self, conn: sqlite3.Connection) -> pd.DataFrame:
+        """Feature matrix: in memory, else the feature store (rebuilt if stale)."""
+        key = store_key(conn)
+        if self._feature_matrix is None or self._feature_key != key:
+            self._feature_matrix = get_feature_matrix(conn)
+            self._feature_key = key
+        return self._feature_matrix
+
+    def explain(self, conn: sqlite3.Connection) -> ShapCache:
+        """SHAP values for the whole feature matrix (cached per model version)."""
+        booster = self._require_model()
+        df = self._features(conn)
+        if self._shap is None or not self._shap.matches(self.version,
+                                                       self._feature_key):
+            self._shap = compute_shap_cache(
+                booster, df, FEATURE_COLS, self.version, self._feature_key,
+                backend=self.explain_backend)
+        return self._shap
+
+    @staticmethod
+    def _splits(df: pd.DataFrame) -> list[tuple[np.ndarray, np.ndarray]]:
+        """5-fold GroupKFold grouped by individual_id."""
+        from sklearn.model_selection import GroupKFold
+
+        gkf = GroupKFold(n_splits=5)
+        return list(gkf.split(df, groups=df["individual_id"].values))
 
     def train(self, conn: sqlite3.Connection,
-              progress_cb=None) -> dict:
+              progress_cb=None, params: dict | None = None,
+              tuning: dict | None = None) -> dict:
         """Train with 5-fold GroupKFold CV grouped by individual_id.
 
+        Folds run in parallel (see app.scoring.ml_cv); the final fit on all
+        data uses every core.  The model is registered and promoted to the
+        active version.  *params* default to LGB_PARAMS; *tuning* is stored
+        in the registry metadata as is.
+
         Returns dict with cv_auc, cv_accuracy, cv_f1, label_balance.
         """
+        import lightgbm as lgb
+        from sklearn.metrics import roc_auc_score, accuracy_score, f1_score
+
+        params = params or LGB_PARAMS
+
         def _p(msg: str):
             if progress_cb:
                 progress_cb(msg)
 
         _p("特徴量構築中...")
-        df = build_feature_matrix(conn)
-        self._feature_matrix = df
+        df = self._features(conn)
 
         X = df[FEATURE_COLS].copy()
         y = df["is_excellent"].values
-        groups = df["individual_id"].values
 
         # Report label balance
         n_pos = int(y.sum())
@@ -76,27 +171,10 @@ class MLEngine:
         _p(f"ラベル分布: 優秀={n_pos} / 全体={n_total} "
            f"({n_pos / n_total * 100:.1f}%)")
 
-        # 5-fold GroupKFold
-        gkf = GroupKFold(n_splits=5)
-        oof_probs = np.zeros(len(y))
-        oof_preds = np.zeros(len(y), dtype=int)
-
-        for fold, (train_idx, val_idx) in enumerate(
-                gkf.split(X, y, groups), 1):
-            _p(f"Fold {fold}/5 学習中...")
-            X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-            y_train, y_val = y[train_idx], y[val_idx]
-
-            model = lgb.LGBMClassifier(**LGB_PARAMS)
-            model.fit(
-                X_train, y_train,
-                eval_set=[(X_val, y_val)],
-                callbacks=[lgb.log_evaluation(period=0)],
-            )
-
-            probs = model.predict_proba(X_val)[:, 1]
-            oof_probs[val_idx] = probs
-            oof_preds[val_idx] = (probs >= 0.5).astype(int)
+        oof_probs = run_folds(X.to_numpy(dtype=np.float64), y,
+                              self._splits(df), params,
+                              progress_cb=progress_cb)
+        oof_preds = (oof_probs >= 0.5).astype(int)
 
         cv_auc = roc_auc_score(y, oof_probs)
         cv_acc = accuracy_score(y, oof_preds)
@@ -106,79 +184,186 @@ class MLEngine:
 
         # Train final model on all data
         _p("最終モデル学習中...")
-        self.model = lgb.LGBMClassifier(**LGB_PARAMS)
-        self.model.fit(X, y)
-        self.version = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-        self.save_model()
-        _p("モデル保存完了")
+        model = lgb.LGBMClassifier(**params, n_jobs=os.cpu_count() or 1)
+        model.fit(X, y)
 
-        return {
+        metrics = {
             "cv_auc": cv_auc,
             "cv_accuracy": cv_acc,
             "cv_f1": cv_f1,
             "n_positive": n_pos,
             "n_total": n_total,
         }
+        meta = {
+            "feature_cols": FEATURE_COLS,
+            "feature_hash": schema_hash(),
+            "data_generation": data_generation(conn),
+            "params": params,
+            "metrics": metrics,
+        }
+        if tuning:
+            meta["tuning"] = tuning
+        version = self.registry.register(model.booster_, meta)
+        self.registry.promote(version)
+        self._select(version, model.booster_)
+        _p(f"モデル登録完了 ({version})")
+
+        return metrics
+
+    def tune(self, conn: sqlite3.Connection, budget_s: float = TUNE_BUDGET_S,
+             progress_cb=None) -> dict:
+        """Search hyperparameters for *budget_s* seconds, then train the winner.
+
+        The final model uses the winning parameters with ``n_estimators``
+        set to the mean early-stopping iteration of its CV folds.  Returns
+        train()'s metrics plus ``tuning`` (also saved in the registry).
+        """
+        df = self._features(conn)
+        result = successive_halving(
+            df[FEATURE_COLS].to_numpy(dtype=np.float64),
+            df["is_excellent"].values, self._splits(df), LGB_PARAMS,
+            budget_s, progress_cb=progress_cb)
+        params = {**LGB_PARAMS, **result.params,
+                  "n_estimators": result.best_iteration}
+        tuning = {
+            "best_iteration": result.best_iteration,
+            "search_auc": result.cv_auc,
+            "search_folds": result.n_folds,
+            "trials": result.n_trials,
+            "fits": result.n_fits,
+            "budget_s": budget_s,
+            "elapsed_s": round(result.elapsed, 1),
+        }
+        if progress_cb:
+            progress_cb(f"探索完了: {result.n_trials}候補 / {result.n_fits}fit "
+                        f"最良AUC={result.cv_auc:.4f} "
+                        f"木{result.best_iteration}本 → 最終モデル学習")
+        metrics = self.train(conn, progress_cb=progress_cb, params=params,
+                             tuning=tuning)
+        metrics["tuning"] = tuning
+        return metrics
+
+    def load_model(self, version: str | None = None) -> bool:
+        """Select a registered version (default: the active one).
+
+        Only metadata is read here; the booster loads on first use.
+        Returns False if there is no model or it was trained on a
+        different feature set (retrain required).
+        """
+        if version is None:
+            self.registry.import_legacy()
+            version = self.registry.active_version()
+            if version is None:
+                return False
+        if not is_compatible(self.registry.meta(version)):
+            return False
+        if version != self.version:
+            self._select(version)
+        return True
+
+    def activate(self, conn: sqlite3.Connection, version: str,
+                 progress_cb=None) -> bool:
+        """Promote *version* and publish its predictions to ml_predictions.
+
+        Returns True when cached predictions were reused, False when the
+        version had to predict (first use, or the features changed).
+        """
+        if not self.load_model(version):
+            raise ValueError(f"現在の特徴量と互換性のないモデルです: {version}")
+        self.registry.promote(version)
+        if self.has_cached_predictions(conn, version):
+            self._publish(conn, version)
+            conn.commit()
+            return True
+        self.predict_all(conn, progress_cb=progress_cb)
+        return False
+
+    def has_cached_predictions(self, conn: sqlite3.Connection,
+                               version: str) -> bool:
+        """Cached rows exist for *version* on the current feature matrix."""
+        row = conn.execute(
+            """SELECT feature_key FROM ml_model_meta WHERE model_version = ?
+               AND EXISTS (SELECT 1 FROM ml_prediction_cache
+                           WHERE model_version = ?)""",
+            (version, version)).fetchone()
+        return row is not None and row[0] == store_key(conn)
 
     def predict_all(self, conn: sqlite3.Connection,
                     progress_cb=None) -> pd.DataFrame:
         """Predict all records and save to ml_predictions table.
 
+        Rows go to ml_prediction_cache under the model version first and
+        are then published to ml_predictions.
+
         Returns DataFrame with individual_id, parity, prob, shap values.
         """
         def _p(msg: str):
             if progress_cb:
                 progress_cb(msg)
 
-        if self.model is None:
-            raise RuntimeError("モデルが未学習です。先にtrain()を実行してください。")
+        booster = self._require_model()
 
         _p("全レコード予測中...")
-        if self._feature_matrix is None:
-            self._feature_matrix = build_feature_matrix(conn)
-
-        df = self._feature_matrix
-        X = df[FEATURE_COLS]
-        probs = self.model.predict_proba(X)[:, 1]
+        df = self._features(conn)
+        probs = booster.predict(df[FEATURE_COLS])
 
         _p("SHAP値計算中...")
-        explainer = shap.TreeExplainer(self.model)
-        shap_values = explainer.shap_values(X)
-        # For binary classification, shap_values may be a list [neg, pos]
-        if isinstance(shap_values, list):
-            shap_values = shap_values[1]
+        cache = self.explain(conn)
 
-        # Save to DB
+        # Save to DB: one float32 BLOB of SHAP values per row, feature
+        # order recorded once per model version in ml_model_meta
         _p("予測結果保存中...")
         now = datetime.now().isoformat()
-        conn.execute("DELETE FROM ml_predictions")
-
-        results = []
-        for i in range(len(df)):
-            row = df.iloc[i]
-            shap_dict = {
-                FEATURE_COLS[j]: float(shap_values[i, j])
-                for j in range(len(FEATURE_COLS))
-            }
-            conn.execute(
-                """INSERT INTO ml_predictions
-                   (individual_id, parity, pred_excellent_prob,
-                    shap_json, model_version, predicted_at)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (row["individual_id"], int(row["parity"]),
-                 float(probs[i]), json.dumps(shap_dict),
-                 self.version, now),
-            )
-            results.append({
-                "individual_id": row["individual_id"],
-                "parity": int(row["parity"]),
-                "prob": float(probs[i]),
-            })
-
+        conn.execute(
+            """INSERT OR REPLACE INTO ml_model_meta
+               (model_version, feature_cols, base_value, created_at, feature_key)
+               VALUES (?, ?, ?, ?, ?)""",
+            (self.version, json.dumps(FEATURE_COLS), cache.base_value, now,
+             self._feature_key),
+        )
+        conn.execute("DELETE FROM ml_prediction_cache WHERE model_version = ?",
+                     (self.version,))
+        ids = df["individual_id"].tolist()
+        parities = df["parity"].astype(int).tolist()
+        conn.executemany(
+            """INSERT INTO ml_prediction_cache
+               (model_version, individual_id, parity, pred_excellent_prob,
+                shap_values)
+               VALUES (?, ?, ?, ?, ?)""",
+            zip(repeat(self.version), ids, parities, probs.tolist(),
+                (row.tobytes() for row in cache.values)),
+        )
+        self._prune_cache(conn)
+        self._publish(conn, self.version)
         conn.commit()
-        _p(f"予測完了: {len(results)}件")
-        return pd.DataFrame(results)
+        _p(f"予測完了: {len(ids)}件")
+        return pd.DataFrame({"individual_id": ids, "parity": parities,
+                             "prob": probs})
+
+    @staticmethod
+    def _publish(conn: sqlite3.Connection, version: str) -> None:
+        """Replace ml_predictions with the cached rows of *version*."""
+        conn.execute("DELETE FROM ml_predictions")
+        conn.execute(
+            """INSERT INTO ml_predictions
+               (individual_id, parity, pred_excellent_prob,
+                shap_values, model_version, predicted_at)
+               SELECT c.individual_id, c.parity, c.pred_excellent_prob,
+                      c.shap_values, c.model_version, m.created_at
+               FROM ml_prediction_cache c
+               JOIN ml_model_meta m ON m.model_version = c.model_version
+               WHERE c.model_version = ?""",
+            (version,),
+        )
+
+    @staticmethod
+    def _prune_cache(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """DELETE FROM ml_prediction_cache WHERE model_version NOT IN
+               (SELECT model_version FROM ml_model_meta
+                ORDER BY created_at DESC LIMIT ?)""",
+            (PREDICTION_CACHE_VERSIONS,),
+        )
 
     def get_global_shap(self, conn: sqlite3.Connection
                         ) -> tuple[list[str], np.ndarray]:
@@ -186,62 +371,17 @@ class MLEngine:
 
         Returns (feature_names, mean_abs_shap_values).
         """
-        if self.model is None:
-            raise RuntimeError("モデルが未学習です。")
-
-        if self._feature_matrix is None:
-            self._feature_matrix = build_feature_matrix(conn)
-
-        X = self._feature_matrix[FEATURE_COLS]
-        explainer = shap.TreeExplainer(self.model)
-        shap_values = explainer.shap_values(X)
-        if isinstance(shap_values, list):
-            shap_values = shap_values[1]
-
-        mean_abs = np.abs(shap_values).mean(axis=0)
-        return FEATURE_COLS, mean_abs
+        return FEATURE_COLS, self.explain(conn).global_importance()
 
     def get_individual_shap(self, conn: sqlite3.Connection,
                             individual_id: str,
                             parity: int | None = None
                             ) -> shap.Explanation | None:
         """Get SHAP Explanation for a specific sow (and optionally parity)."""
-        if self.model is None:
-            raise RuntimeError("モデルが未学習です。")
-
-        if self._feature_matrix is None:
-            self._feature_matrix = build_feature_matrix(conn)
-
-        mask = self._feature_matrix["individual_id"] == individual_id
-        if parity is not None:
-            mask &= self._feature_matrix["parity"] == parity
-
-        subset = self._feature_matrix[mask]
-        if subset.empty:
+        cache = self.explain(conn)
+        pos = cache.rows(individual_id, parity)
+        if len(pos) == 0:
             return None
 
-        X = subset[FEATURE_COLS]
-        explainer = shap.TreeExplainer(self.model)
-        shap_values = explainer(X)
-        return shap_values
-
-    def save_model(self) -> None:
-        """Save trained model to disk."""
-        if self.model is None:
-            return
-        MODEL_DIR.mkdir(parents=True, exist_ok=True)
-        self.model.booster_.save_model(str(MODEL_PATH))
-
-    def load_model(self) -> bool:
-        """Load model from disk. Returns True if successful."""
-        if not MODEL_PATH.exists():
-            return False
-        booster = lgb.Booster(model_file=str(MODEL_PATH))
-        self.model = lgb.LGBMClassifier(**LGB_PARAMS)
-        self.model._Booster = booster
-        self.model.fitted_ = True
-        self.model._n_features = len(FEATURE_COLS)
-        self.model._n_classes = 2
-        self.model.classes_ = np.array([0, 1])
-        self.version = "loaded"
-        return True
+        X = self._features(conn)[FEATURE_COLS].iloc[pos]
+        return to_explanation(cache, pos, X.to_numpy(), FEATURE_COLS)
@@ -0,0 +1,167 @@
+"""SHAP explanation cache for MLEngine.
+
+One explanation pass over the whole feature matrix per model version;
+``predict_all``, global importance and individual explanations all read
+from it.  Values are kept as float32 (n_rows × n_features) with a per-sow
+row index, so slicing one sow is a dictionary lookup.
+
+Backends (same exact TreeSHAP values, raw log-odds scale):
+
+    native  LightGBM ``predict(pred_contrib=True)`` — default, no shap import
+    shap    ``shap.TreeExplainer`` — reference / fallback
+
+``python -m app.bench.explain`` compares the two on the current DB.
+
+``predict_all`` stores each row's values as a float32 BLOB in
+``ml_predictions.shap_values``; ``decode_shap`` maps one back to feature
+names using the order recorded in ``ml_model_meta``, and
+``stored_importance`` gives a version's global importance from the
+cached BLOBs without loading the model.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class ShapCache:
+    """SHAP values of one model version over one feature matrix."""
+
+    model_version: str
+    feature_key: str
+    individual_ids: np.ndarray      # per row
+    parities: np.ndarray            # per row
+    values: np.ndarray              # float32 (n_rows, n_features)
+    base_value: float
+    _rows: dict[str, tuple[int, int]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        # Rows are grouped by individual_id (feature matrix order)
+        ids = self.individual_ids
+        if len(ids) and not self._rows:
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            ends = np.r_[starts[1:], len(ids)]
+            self._rows = {ids[a]: (int(a), int(b)) for a, b in zip(starts, ends)}
+
+    def matches(self, model_version: str, feature_key: str) -> bool:
+        return (self.model_version == model_version
+                and self.feature_key == feature_key)
+
+    def global_importance(self) -> np.ndarray:
+        """Mean |SHAP| per feature."""
+        return np.abs(self.values).mean(axis=0, dtype=np.float64)
+
+    def rows(self, individual_id: str,
+             parity: int | None = None) -> np.ndarray:
+        """Row positions of one sow (optionally one parity)."""
+        a, b = self._rows.get(individual_id, (0, 0))
+        pos = np.arange(a, b)
+        if parity is not None:
+            pos = pos[self.parities[a:b] == parity]
+        return pos
+
+
+def _native_contrib(model, X: pd.DataFrame) -> tuple[np.ndarray, float]:
+    """LightGBM's own TreeSHAP: (n, k+1) contributions, last column = base."""
+    booster = getattr(model, "booster_", model)  # LGBMClassifier or Booster
+    contrib = booster.predict(X, pred_contrib=True)
+    return contrib[:, :-1], float(contrib[0, -1]) if len(contrib) else 0.0
+
+
+def _shap_tree(model, X: pd.DataFrame) -> tuple[np.ndarray, float]:
+    import shap
+
+    explainer = shap.TreeExplainer(model)
+    values = explainer.shap_values(X)
+    base = explainer.expected_value
+    # Binary classifiers may return [neg, pos]
+    if isinstance(values, list):
+        values = values[1]
+    if np.ndim(base) > 0:
+        base = np.ravel(base)[-1]
+    return values, float(base)
+
+
+BACKENDS: dict[str, Callable[..., tuple[np.ndarray, float]]] = {
+    "native": _native_contrib,
+    "shap": _shap_tree,
+}
+DEFAULT_BACKEND = "native"
+
+
+def compute_shap_cache(model, df: pd.DataFrame, feature_cols: list[str],
+                       model_version: str, feature_key: str,
+                       backend: str = DEFAULT_BACKEND) -> ShapCache:
+    """Explain every row of *df* with *backend* and wrap the result."""
+    values, base = BACKENDS[backend](model, df[feature_cols])
+    return ShapCache(
+        model_version=model_version,
+        feature_key=feature_key,
+        individual_ids=df["individual_id"].to_numpy(),
+        parities=df["parity"].to_numpy(),
+        values=np.asarray(values, dtype=np.float32),
+        base_value=base,
+    )
+
+
+def to_explanation(cache: ShapCache, pos: np.ndarray, data: np.ndarray,
+                   feature_names: list[str]):
+    """shap.Explanation for cached rows *pos* (for shap's plotting API)."""
+    import shap
+
+    return shap.Explanation(
+        values=cache.values[pos],
+        base_values=np.full(len(pos), cache.base_value),
+        data=data,
+        feature_names=feature_names,
+    )
+
+
+# model_version → feature order of stored SHAP BLOBs (ml_model_meta)
+_FEATURE_ORDER: dict[str, list[str]] = {}
+
+
+def feature_order(conn: sqlite3.Connection,
+                  model_version: str) -> list[str] | None:
+    cols = _FEATURE_ORDER.get(model_version)
+    if cols is None:
+        row = conn.execute(
+            "SELECT feature_cols FROM ml_model_meta WHERE model_version = ?",
+            (model_version,)).fetchone()
+        if row is None:
+            return None
+        cols = _FEATURE_ORDER[model_version] = json.loads(row[0])
+    return cols
+
+
+def decode_shap(conn: sqlite3.Connection, model_version: str,
+                blob: bytes) -> dict[str, float] | None:
+    """ml_predictions.shap_values BLOB → {feature: SHAP value}."""
+    cols = feature_order(conn, model_version)
+    if cols is None:
+        return None
+    values = np.frombuffer(blob, dtype=np.float32)
+    return dict(zip(cols, values.tolist()))
+
+
+def stored_importance(conn: sqlite3.Connection, model_version: str
+                      ) -> tuple[list[str], np.ndarray] | None:
+    """Mean |SHAP| per feature from ml_prediction_cache BLOBs."""
+    cols = feature_order(conn, model_version)
+    if cols is None:
+        return None
+    blobs = [r[0] for r in conn.execute(
+        """SELECT shap_values FROM ml_prediction_cache
+           WHERE model_version = ? AND shap_values IS NOT NULL""",
+        (model_version,))]
+    if not blobs:
+        return None
+    values = np.frombuffer(b"".join(blobs), dtype=np.float32)
+    return cols, np.abs(values.reshape(-1, len(cols))).mean(axis=0, dtype=np.float64)
@@ -5,6 +5,7 @@ Builds a per-parity feature matrix from the database, with:
   Tier 2: Rolling cumulative stats from prior parities
   Tier 3: Piglet quality metrics (A-rank, W-promotion, defects)
   Tier 4: Dam (mother) genetic proxy features
+  Tier 5: Reproductive KPIs of the service (app.scoring.kpi)
 
 Also generates the binary `is_excellent` target label.
 """
@@ -16,77 +17,127 @@ import sqlite3
 import numpy as np
 import pandas as pd
 
+from app.scoring.kpi import load_parity_kpis
 
-def _load_farrowing(conn: sqlite3.Connection) -> pd.DataFrame:
+
+# Restricts a query to the sows of a partial build (see _set_scope)
+_SCOPE = "IN (SELECT individual_id FROM temp.feature_scope)"
+
+
+def _set_scope(conn: sqlite3.Connection, individual_ids) -> None:
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS feature_scope "
+                 "(individual_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.feature_scope")
+    conn.executemany("INSERT OR IGNORE INTO temp.feature_scope VALUES (?)",
+                     ((i,) for i in individual_ids))
+
+
+def _load_farrowing(conn: sqlite3.Connection,
+                    scoped: bool = False) -> pd.DataFrame:
     """Load farrowing records as DataFrame."""
+    where = f"WHERE individual_id {_SCOPE}" if scoped else ""
     df = pd.read_sql_query(
-        """SELECT individual_id, parity, total_born, born_alive,
+        f"""SELECT individual_id, parity, total_born, born_alive,
                   stillborn, mummified, foster, weaned, deaths,
                   mortality_rate, nursing_days, farrowing_interval
-           FROM farrowing_records
+           FROM farrowing_records {where}
            ORDER BY individual_id, parity""",
         conn,
     )
     return df
 
 
+# Tier 2 "prior parities" features: (output column, source column, stat).
+# Each stat is computed for all rows at once from grouped cumulative ops
+# over the sow's earlier parities only (current row excluded, NaN skipped):
+#   mean   mean of prior values
+#   max    max of prior values
+#   trend  least-squares slope over prior values vs. row position
+PRIOR_FEATURES: list[tuple[str, str, str]] = [
+    ("avg_born_alive_prev", "born_alive", "mean"),
+    ("avg_weaned_prev", "weaned", "mean"),
+    ("avg_stillborn_prev", "stillborn", "mean"),
+    ("max_born_alive_prev", "born_alive", "max"),
+    ("trend_born_alive", "born_alive", "trend"),
+]
+
+
 def _build_tier2_rolling(df: pd.DataFrame) -> pd.DataFrame:
     """Tier 2: cumulative stats from *prior* parities (no data leakage)."""
     df = df.sort_values(["individual_id", "parity"]).copy()
+    df["prev_parity_count"] = df.groupby("individual_id").cumcount()
+    prior = _prior_stats(df, PRIOR_FEATURES)
+    df[prior.columns] = prior
+    return df
 
-    # Expanding (cumulative) stats shifted by 1 so current row is excluded
-    grp = df.groupby("individual_id")
-
-    df["avg_born_alive_prev"] = grp["born_alive"].apply(
-        lambda s: s.expanding().mean().shift(1)
-    ).values
-    df["avg_weaned_prev"] = grp["weaned"].apply(
-        lambda s: s.expanding().mean().shift(1)
-    ).values
-    df["avg_stillborn_prev"] = grp["stillborn"].apply(
-        lambda s: s.expanding().mean().shift(1)
-    ).values
-    df["max_born_alive_prev"] = grp["born_alive"].apply(
-        lambda s: s.expanding().max().shift(1)
-    ).values
-    df["prev_parity_count"] = grp.cumcount()  # 0-based count of prior parities
-
-    # Trend: linear regression slope over all prior born_alive values
-    def _trend(series: pd.Series) -> pd.Series:
-        result = pd.Series(np.nan, index=series.index)
-        vals = series.values
-        for i in range(len(vals)):
-            if i < 2:
-                result.iloc[i] = np.nan
-                continue
-            y = vals[:i].astype(float)
-            mask = ~np.isnan(y)
-            if mask.sum() < 2:
-                result.iloc[i] = np.nan
-                continue
-            x = np.arange(len(y))[mask]
-            y = y[mask]
-            slope = np.polyfit(x, y, 1)[0]
-            result.iloc[i] = slope
-        return result
-
-    df["trend_born_alive"] = grp["born_alive"].transform(_trend)
 
-    return df
+def _prior_stats(df: pd.DataFrame,
+                 specs: list[tuple[str, str, str]]) -> pd.DataFrame:
+    """Evaluate *specs* (see PRIOR_FEATURES) over each sow's prior rows.
+
+    All additive terms (counts, Σy, and Σx, Σxy, Σx² for trends) go through
+    one grouped cumsum and all maxima through one grouped cummax, so the
+    cost is linear in rows and one vectorised column per feature.
+    *df* must be sorted by individual_id, then parity.
+    """
+    sow = df["individual_id"]
+    x = df.groupby("individual_id").cumcount().to_numpy(dtype=float)
+
+    sums: dict[str, np.ndarray] = {}
+    maxes: dict[str, np.ndarray] = {}
+    for _, col, stat in specs:
+        y = df[col].to_numpy(dtype=float)
+        valid = ~np.isnan(y)
+        if stat == "max":
+            maxes[col] = np.where(valid, y, -np.inf)
+            continue
+        w = valid.astype(float)
+        y = np.where(valid, y, 0.0)
+        sums[f"n:{col}"] = w
+        sums[f"sy:{col}"] = y
+        if stat == "trend":
+            sums[f"sx:{col}"] = w * x
+            sums[f"sxy:{col}"] = x * y
+            sums[f"sxx:{col}"] = w * x * x
+
+    out = pd.DataFrame(index=df.index)
+    if sums:
+        terms = pd.DataFrame(sums, index=df.index)
+        # Running sum minus the current row = sum over prior rows only
+        prior = terms.groupby(sow).cumsum() - terms
+    if maxes:
+        # Running max shifted one row within the sow = max over prior rows
+        run_max = pd.DataFrame(maxes, index=df.index).groupby(sow).cummax()
+        prior_max = run_max.groupby(sow).shift(1).replace(-np.inf, np.nan)
+
+    for name, col, stat in specs:
+        if stat == "max":
+            out[name] = prior_max[col]
+            continue
+        n, sy = prior[f"n:{col}"], prior[f"sy:{col}"]
+        if stat == "mean":
+            out[name] = sy / n.where(n > 0)
+        elif stat == "trend":
+            # slope = (n·Σxy − Σx·Σy) / (n·Σx² − (Σx)²), needs 2+ points
+            sx = prior[f"sx:{col}"]
+            denom = n * prior[f"sxx:{col}"] - sx * sx
+            out[name] = (n * prior[f"sxy:{col}"] - sx * sy) / denom.where(n >= 2)
+        else:
+            raise ValueError(f"unknown prior stat: {stat}")
+    return out
 
 
 def _build_tier3_piglet_quality(conn: sqlite3.Connection,
-                                df: pd.DataFrame) -> pd.DataFrame:
+                                df: pd.DataFrame,
+                                scoped: bool = False) -> pd.DataFrame:
     """Tier 3: per-parity piglet quality from piglets table."""
+    scope = f"AND p.dam_id {_SCOPE}" if scoped else ""
     pig = pd.read_sql_query(
-        """SELECT p.dam_id AS individual_id,
-                  fr.parity,
+        f"""SELECT p.dam_id AS individual_id,
+                  p.parity,
                   p.rank, p.teat_score, p.ps_shipment, p.remarks
            FROM piglets p
-           JOIN farrowing_records fr
-             ON p.dam_id = fr.individual_id
-             AND p.birth_date = fr.farrowing_date
-           WHERE p.dam_id IS NOT NULL""",
+           WHERE p.dam_id IS NOT NULL AND p.parity IS NOT NULL {scope}""",
         conn,
     )
 
@@ -153,40 +204,49 @@ def _build_tier3_piglet_quality(conn: sqlite3.Connection,
     return df
 
 
-def _build_tier4_dam_genetics(conn: sqlite3.Connection,
-                              df: pd.DataFrame) -> pd.DataFrame:
-    """Tier 4: dam (mother) performance features."""
-    dam_scores = pd.read_sql_query(
-        """SELECT s.individual_id AS child_id,
+def load_dam_scores(conn: sqlite3.Connection,
+                    scoped: bool = False) -> pd.DataFrame:
+    """(child_id, dam_total_score, dam_peak) from the dam's sow_scores."""
+    scope = f"AND s.individual_id {_SCOPE}" if scoped else ""
+    return pd.read_sql_query(
+        f"""SELECT s.individual_id AS child_id,
                   sc.total_score AS dam_total_score,
                   sc.peak AS dam_peak
            FROM sows s
            JOIN sow_scores sc ON s.dam_id = sc.individual_id
-           WHERE s.dam_id IS NOT NULL""",
+           WHERE s.dam_id IS NOT NULL {scope}""",
         conn,
     )
 
+
+def _build_tier4_dam_genetics(conn: sqlite3.Connection,
+                              df: pd.DataFrame,
+                              scoped: bool = False) -> pd.DataFrame:
+    """Tier 4: dam (mother) performance features."""
+    dam_scores = load_dam_scores(conn, scoped)
+    scope = f"AND s.individual_id {_SCOPE}" if scoped else ""
+
     # Dam's W promotion rate and avg born_alive
     dam_stats = pd.read_sql_query(
-        """SELECT s.individual_id AS child_id,
+        f"""SELECT s.individual_id AS child_id,
                   AVG(fr.born_alive) AS dam_avg_born_alive
            FROM sows s
            JOIN farrowing_records fr ON s.dam_id = fr.individual_id
-           WHERE s.dam_id IS NOT NULL
+           WHERE s.dam_id IS NOT NULL {scope}
            GROUP BY s.individual_id""",
         conn,
     )
 
     # Dam W promotion rate
     dam_w = pd.read_sql_query(
-        """SELECT s2.individual_id AS child_id,
+        f"""SELECT s.individual_id AS child_id,
                   CAST(SUM(CASE WHEN p.ps_shipment='W' THEN 1 ELSE 0 END) AS REAL)
                     / NULLIF(SUM(CASE WHEN p.rank='W' THEN 1 ELSE 0 END), 0)
                     AS dam_w_promotion_rate
-           FROM sows s2
-           JOIN piglets p ON s2.dam_id = p.dam_id
-           WHERE s2.dam_id IS NOT NULL
-           GROUP BY s2.individual_id""",
+           FROM sows s
+           JOIN piglets p ON s.dam_id = p.dam_id
+           WHERE s.dam_id IS NOT NULL {scope}
+           GROUP BY s.individual_id""",
         conn,
     )
 
@@ -218,7 +278,19 @@ def _build_tier4_dam_genetics(conn: sqlite3.Connection,
     return df
 
 
-def _build_label(df: pd.DataFrame) -> pd.DataFrame:
+def _build_tier5_reproductive(conn: sqlite3.Connection,
+                              df: pd.DataFrame,
+                              scoped: bool = False) -> pd.DataFrame:
+    """Tier 5: wean-to-service interval and gestation length of the parity."""
+    kpis = load_parity_kpis(conn, _SCOPE if scoped else "")
+    if kpis.empty:
+        df["wean_to_service_days"] = np.nan
+        df["gestation_days"] = np.nan
+        return df
+    return df.merge(kpis, on=["individual_id", "parity"], how="left")
+
+
+def build_label(df: pd.DataFrame) -> pd.DataFrame:
     """Generate is_excellent binary label based on 7 criteria within each parity."""
     df = df.copy()
 
@@ -269,8 +341,14 @@ FEATURE_COLS = [
     # Tier 4
     "dam_total_score", "dam_peak", "dam_avg_born_alive",
     "dam_w_promotion_rate",
+    # Tier 5
+    "wean_to_service_days", "gestation_days",
 ]
 
+# Bump whenever feature semantics change without FEATURE_COLS changing;
+# it is part of the feature store key (app.scoring.feature_store).
+FEATURE_CODE_VERSION = 1
+
 # Japanese display names for SHAP plots
 FEATURE_NAMES_JA = {
     "parity": "産歴",
@@ -301,23 +379,35 @@ FEATURE_NAMES_JA = {
     "dam_peak": "母Peak",
     "dam_avg_born_alive": "母平均生存産子",
     "dam_w_promotion_rate": "母W繰上率",
+    "wean_to_service_days": "離乳後種付日数",
+    "gestation_days": "妊娠期間",
 }
 
 
-def build_feature_matrix(conn: sqlite3.Connection) -> pd.DataFrame:
+def build_feature_matrix(conn: sqlite3.Connection,
+                         individual_ids=None) -> pd.DataFrame:
     """Build full feature matrix with labels from DB.
 
     Returns DataFrame with columns:
         individual_id, parity, <FEATURE_COLS>, is_excellent
+
+    With *individual_ids* only those sows' rows are built and no label is
+    added: the label ranks each row against the whole herd, so partial
+    builds are labelled by the caller (see app.scoring.feature_store).
     """
-    df = _load_farrowing(conn)
+    scoped = individual_ids is not None
+    if scoped:
+        _set_scope(conn, individual_ids)
+    df = _load_farrowing(conn, scoped)
     if df.empty:
         return df
 
     df = _build_tier2_rolling(df)
-    df = _build_tier3_piglet_quality(conn, df)
-    df = _build_tier4_dam_genetics(conn, df)
-    df = _build_label(df)
+    df = _build_tier3_piglet_quality(conn, df, scoped)
+    df = _build_tier4_dam_genetics(conn, df, scoped)
+    df = _build_tier5_reproductive(conn, df, scoped)
+    if not scoped:
+        df = build_label(df)
 
     # Ensure all feature columns exist
     for col in FEATURE_COLS:
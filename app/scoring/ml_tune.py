@@ -0,0 +1,177 @@
+"""Time-budgeted hyperparameter search for MLEngine.tune.
+
+Successive halving over random LightGBM parameters, with the CV folds
+as the resource:
+
+    rung 0   n_configs          configs × 1 fold
+    rung 1   n_configs / eta    configs × eta folds
+    ...      (last rung: all folds)
+
+After each rung the best 1/eta by mean validation AUC move on; earlier
+fold results are reused, so a config only trains the folds it has not
+seen.  Every fold fit early-stops on its own validation fold (at most
+``MAX_TREES`` trees), which also gives the tree count for the final fit.
+
+Brackets repeat with new random configs until the wall-clock budget
+runs out; the first config of the first bracket is the hand-picked
+``LGB_PARAMS``.  Fits run in one spawned process pool (app.scoring.ml_cv).
+When the budget expires, queued fits are cancelled and the best config
+seen so far wins — more folds evaluated first, then mean AUC.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+
+import numpy as np
+
+from app.scoring.ml_cv import _fit_fold, thread_budget
+
+MAX_TREES = 2000
+EARLY_STOPPING_ROUNDS = 50
+
+# name → (kind, low, high) or ("choice", options)
+SEARCH_SPACE: dict[str, tuple] = {
+    "num_leaves": ("int", 7, 63),
+    "max_depth": ("choice", [-1, 4, 5, 6, 8]),
+    "min_child_samples": ("int", 10, 80),
+    "learning_rate": ("log", 0.02, 0.15),
+    "lambda_l1": ("log", 1e-3, 10.0),
+    "lambda_l2": ("log", 1e-3, 10.0),
+    "subsample": ("float", 0.6, 1.0),
+    "colsample_bytree": ("float", 0.5, 1.0),
+}
+
+
+def sample_params(rng: np.random.Generator) -> dict:
+    """One random draw from SEARCH_SPACE."""
+    params = {}
+    for name, (kind, *spec) in SEARCH_SPACE.items():
+        if kind == "int":
+            params[name] = int(rng.integers(spec[0], spec[1] + 1))
+        elif kind == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(spec[0]),
+                                                    np.log(spec[1]))))
+        elif kind == "float":
+            params[name] = float(rng.uniform(spec[0], spec[1]))
+        else:
+            params[name] = spec[0][int(rng.integers(len(spec[0])))]
+    return params
+
+
+@dataclass
+class _Trial:
+    params: dict
+    # fold index → (AUC, best iteration)
+    folds: dict[int, tuple[float, int]] = field(default_factory=dict)
+
+    @property
+    def score(self) -> tuple[int, float]:
+        aucs = [a for a, _ in self.folds.values()]
+        return len(aucs), float(np.nanmean(aucs)) if aucs else float("-inf")
+
+    @property
+    def best_iteration(self) -> int:
+        return int(round(np.mean([t for _, t in self.folds.values()])))
+
+
+@dataclass
+class TuneResult:
+    params: dict                # search-space params of the winner
+    best_iteration: int         # mean early-stopping iteration over its folds
+    cv_auc: float               # mean validation AUC over those folds
+    n_folds: int                # folds the winner was evaluated on
+    n_trials: int               # configs tried
+    n_fits: int                 # fold fits completed
+    elapsed: float              # seconds
+
+
+def successive_halving(X: np.ndarray, y: np.ndarray,
+                       splits: list[tuple[np.ndarray, np.ndarray]],
+                       base_params: dict, budget_s: float,
+                       progress_cb=None, n_configs: int = 27, eta: int = 3,
+                       max_workers: int | None = None,
+                       seed: int = 0) -> TuneResult:
+    """Search within *budget_s* seconds; *base_params* fill unsearched keys."""
+    start = time.monotonic()
+    deadline = start + budget_s
+    rng = np.random.default_rng(seed)
+    n_folds = len(splits)
+    rungs = sorted({min(n_folds, eta ** r)
+                    for r in range(math.ceil(math.log(n_folds, eta)) + 1)})
+    workers, threads = thread_budget(n_configs, max_workers)
+    trials: list[_Trial] = []
+    n_fits = 0
+
+    def _p(msg: str) -> None:
+        if progress_cb:
+            left = max(0.0, deadline - time.monotonic())
+            progress_cb(f"{msg}  (残り{left:.0f}秒)")
+
+    def _run_rung(pool, rung: list[_Trial], folds: int) -> bool:
+        """Fit missing folds of *rung*; False if the budget ran out."""
+        nonlocal n_fits
+        pending = {}
+        for trial in rung:
+            fit_params = {**base_params, **trial.params,
+                          "n_estimators": MAX_TREES, "n_jobs": threads}
+            for k in range(folds):
+                if k in trial.folds:
+                    continue
+                tr, va = splits[k]
+                fut = pool.submit(_fit_fold, k, X[tr], y[tr], X[va], y[va],
+                                  fit_params, EARLY_STOPPING_ROUNDS)
+                pending[fut] = trial
+        while pending:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                for fut in pending:
+                    fut.cancel()
+                return False
+            done, _ = wait(pending, timeout=timeout,
+                           return_when=FIRST_COMPLETED)
+            for fut in done:
+                trial = pending.pop(fut)
+                k, _, auc, trees = fut.result()
+                trial.folds[k] = (auc, trees)
+                n_fits += 1
+        return True
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=get_context("spawn")) as pool:
+        bracket = 0
+        while time.monotonic() < deadline:
+            bracket += 1
+            rung = [_Trial(sample_params(rng)) for _ in range(n_configs)]
+            if bracket == 1:
+                rung[0] = _Trial({k: base_params[k] for k in SEARCH_SPACE
+                                  if k in base_params})
+            trials += rung
+            for folds in rungs:
+                _p(f"探索 {bracket}巡目: {len(rung)}候補 × {folds}fold "
+                   f"(並列{workers} × {threads}スレッド)")
+                if not _run_rung(pool, rung, folds):
+                    break
+                rung.sort(key=lambda t: t.score, reverse=True)
+                if folds != rungs[-1]:
+                    rung = rung[:max(1, math.ceil(len(rung) / eta))]
+            best = max((t for t in trials if t.folds), key=lambda t: t.score,
+                       default=None)
+            if best is not None:
+                _p(f"探索 {bracket}巡目完了: 最良AUC={best.score[1]:.4f} "
+                   f"({best.score[0]}fold, {best.best_iteration}本)")
+        # Running fits are not interruptible; wait for them, drop queued ones
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    best = max((t for t in trials if t.folds), key=lambda t: t.score,
+               default=None)
+    if best is None:
+        raise RuntimeError("時間内に探索が1件も完了しませんでした。")
+    n, auc = best.score
+    return TuneResult(params=best.params, best_iteration=best.best_iteration,
+                      cv_auc=auc, n_folds=n, n_trials=len(trials),
+                      n_fits=n_fits, elapsed=time.monotonic() - start)
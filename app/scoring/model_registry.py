@@ -0,0 +1,136 @@
+"""Versioned model registry under models/registry/.
+
+    models/registry/
+        ACTIVE                  version id of the promoted model
+        <version>/model.txt     LightGBM booster
+        <version>/meta.json     feature_cols, feature_hash, data_generation,
+                                cv metrics, params, created_at
+
+Artifacts are written to a temporary directory and renamed into place,
+and ``ACTIVE`` is replaced with ``os.replace``, so a reader (the GUI)
+never sees a half-written model and promotion needs no restart.
+Boosters are loaded on first use and kept per version; lightgbm itself
+is only imported then, so listing versions and reading metadata is cheap.
+
+The pre-registry ``models/lgbm_sow.txt`` is imported once as
+``legacy_<mtime>`` when the registry is empty.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import lightgbm as lgb
+
+MODEL_DIR = Path(__file__).resolve().parent.parent.parent / "models"
+REGISTRY_DIR = MODEL_DIR / "registry"
+LEGACY_MODEL_PATH = MODEL_DIR / "lgbm_sow.txt"
+
+_ACTIVE = "ACTIVE"
+_MODEL = "model.txt"
+_META = "meta.json"
+
+
+class ModelRegistry:
+    """Model artifacts and the active-version pointer."""
+
+    def __init__(self, root: Path = REGISTRY_DIR):
+        self.root = root
+        self._boosters: dict[str, lgb.Booster] = {}
+
+    # ── Queries ──
+
+    def versions(self) -> list[str]:
+        """Registered versions, newest first."""
+        if not self.root.exists():
+            return []
+        found = [p.name for p in self.root.iterdir()
+                 if p.is_dir() and (p / _META).exists()]
+        return sorted(found, key=lambda v: (self.meta(v).get("created_at", ""), v),
+                      reverse=True)
+
+    def meta(self, version: str) -> dict:
+        return json.loads((self.root / version / _META).read_text(encoding="utf-8"))
+
+    def active_version(self) -> str | None:
+        try:
+            version = (self.root / _ACTIVE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        return version if (self.root / version / _MODEL).exists() else None
+
+    def booster(self, version: str) -> lgb.Booster:
+        """Booster of *version*, loaded from disk on first use."""
+        b = self._boosters.get(version)
+        if b is None:
+            import lightgbm as lgb
+
+            b = lgb.Booster(model_file=str(self.root / version / _MODEL))
+            self._boosters[version] = b
+        return b
+
+    # ── Updates ──
+
+    def register(self, booster: lgb.Booster, meta: dict,
+                 version: str | None = None) -> str:
+        """Store a new artifact; returns its version (not yet active).
+
+        Generated ids are the timestamp to the second, with ``_2``, ``_3``…
+        appended when that second is already taken (e.g. tune, then train).
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        if version is None:
+            version = base = datetime.now().strftime("%Y%m%d_%H%M%S")
+            n = 1
+            while (self.root / version).exists():
+                n += 1
+                version = f"{base}_{n}"
+        final = self.root / version
+        if final.exists():
+            raise FileExistsError(f"model version already registered: {version}")
+        tmp = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=self.root))
+        try:
+            booster.save_model(str(tmp / _MODEL))
+            meta = {**meta, "version": version,
+                    "created_at": meta.get("created_at")
+                    or datetime.now().isoformat(timespec="seconds")}
+            (tmp / _META).write_text(
+                json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, final)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self._boosters[version] = booster
+        return version
+
+    def promote(self, version: str) -> None:
+        """Atomically make *version* the active model."""
+        if not (self.root / version / _MODEL).exists():
+            raise KeyError(version)
+        fd, tmp = tempfile.mkstemp(prefix=".active-", dir=self.root)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, self.root / _ACTIVE)
+
+    def import_legacy(self, path: Path = LEGACY_MODEL_PATH) -> str | None:
+        """Register models/lgbm_sow.txt when the registry is still empty."""
+        if self.versions() or not path.exists():
+            return None
+        import lightgbm as lgb
+
+        booster = lgb.Booster(model_file=str(path))
+        mtime = datetime.fromtimestamp(path.stat().st_mtime)
+        version = self.register(booster, {
+            "feature_cols": booster.feature_name(),
+            "source": str(path.name),
+            "created_at": mtime.isoformat(timespec="seconds"),
+        }, version=f"legacy_{mtime:%Y%m%d_%H%M%S}")
+        self.promote(version)
+        return version
@@ -0,0 +1,98 @@
+"""Streaming per-parity group statistics (Welford accumulators).
+
+The z-score stage standardises every indicator within its parity group.
+Instead of rescanning ``farrowing_records`` for each group, the count,
+mean and M2 (sum of squared deviations) of every (parity, metric) pair
+are kept in the ``parity_stats`` table, so the scoring engine and what-if
+tooling can read group statistics without touching the raw records.
+``accumulate`` adds one record's metrics in O(1); the table itself is
+rebuilt in full by the scoring engine, since ETL reloads every record.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+from dataclasses import dataclass
+
+# Metrics tracked per parity group (order = storage order)
+METRICS = ("own_w", "born_alive", "total_born", "stillborn", "own_rate")
+
+
+@dataclass
+class RunningStat:
+    """Welford accumulator for one (parity, metric) group."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def sd(self) -> float:
+        """Population SD (same definition as the original ``_mean_sd``)."""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / self.count)
+
+
+def metric_values(weaned: int | None, foster: int | None,
+                  born_alive: int | None, total_born: int | None,
+                  stillborn: int | None) -> dict[str, float | None]:
+    """Derive the tracked metrics for one farrowing record.
+
+    OWN_W = W - F, OWN_RATE = OWN_W / W (None when W is 0 or missing).
+    """
+    own_w = own_rate = None
+    if weaned is not None:
+        f = foster if foster is not None else 0
+        own_w = weaned - f
+        own_rate = own_w / weaned if weaned > 0 else None
+    return {
+        "own_w": own_w,
+        "born_alive": born_alive,
+        "total_born": total_born,
+        "stillborn": stillborn,
+        "own_rate": own_rate,
+    }
+
+
+StatsMap = dict[tuple[int, str], RunningStat]
+
+
+def accumulate(stats: StatsMap, parity: int,
+               values: dict[str, float | None]) -> None:
+    """Add one record's metrics in memory."""
+    for metric in METRICS:
+        v = values.get(metric)
+        if v is None:
+            continue
+        stats.setdefault((parity, metric), RunningStat()).add(v)
+
+
+def group_stat(stats: StatsMap, parity: int, metric: str) -> RunningStat:
+    return stats.get((parity, metric), RunningStat())
+
+
+def save_parity_stats(conn: sqlite3.Connection, stats: StatsMap) -> None:
+    """Replace the parity_stats table with the given accumulators."""
+    conn.execute("DELETE FROM parity_stats")
+    conn.executemany(
+        """INSERT INTO parity_stats (parity, metric, count, mean, m2)
+           VALUES (?,?,?,?,?)""",
+        [(k, m, st.count, st.mean, st.m2)
+         for (k, m), st in sorted(stats.items())],
+    )
+
+
+def load_parity_stats(conn: sqlite3.Connection) -> StatsMap:
+    return {
+        (r["parity"], r["metric"]): RunningStat(r["count"], r["mean"], r["m2"])
+        for r in conn.execute(
+            "SELECT parity, metric, count, mean, m2 FROM parity_stats"
+        ).fetchall()
+    }
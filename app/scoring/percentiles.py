@@ -0,0 +1,93 @@
+"""Score percentile table and threshold lookup.
+
+The scoring stage persists "top X%" TotalScore thresholds for all scored
+sows and for active sows only, so the pedigree views and the HTML report
+read one precomputed value instead of sorting every node on each redraw.
+
+A threshold for fraction f is the score of the ⌊n·f⌋-th best sow (at least
+the best one); sows with a NULL or exactly-zero score are not ranked.  The
+bootstrap ``top10_prob`` (app.scoring.bootstrap) uses the same population
+and count, via ``RANKED`` and ``top_count``.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+DECILES = tuple(round(0.1 * i, 2) for i in range(1, 10))
+# Additional "top X%" cut-offs persisted alongside the deciles
+EXTRA_CUTOFFS = (0.01, 0.05, 0.25)
+PERCENTILE_CUTOFFS = tuple(sorted(set(DECILES + EXTRA_CUTOFFS)))
+
+# sow_scores rows that take part in the ranking
+RANKED = "sc.total_score IS NOT NULL AND sc.total_score != 0"
+
+POPULATIONS = {
+    "all": "",
+    "active": "AND s.status = 'active'",
+}
+
+
+def top_count(n_ranked: int, fraction: float) -> int:
+    """Number of sows in the top ``fraction`` of ``n_ranked`` (at least 1)."""
+    return max(1, int(n_ranked * fraction + 1e-9))
+
+
+def _threshold(scores_desc: list[float], fraction: float) -> float:
+    return scores_desc[top_count(len(scores_desc), fraction) - 1]
+
+
+def run_percentiles(conn: sqlite3.Connection, progress_cb=None,
+                    cutoffs: tuple[float, ...] = PERCENTILE_CUTOFFS) -> None:
+    """Rebuild score_percentiles from sow_scores."""
+    if progress_cb:
+        progress_cb("スコア分位点計算中...")
+    conn.execute("DELETE FROM score_percentiles")
+    rows: list[tuple] = []
+    for population, where in POPULATIONS.items():
+        scores = [
+            r[0] for r in conn.execute(
+                f"""SELECT sc.total_score FROM sow_scores sc
+                    JOIN sows s ON sc.individual_id = s.individual_id
+                    WHERE {RANKED} {where}
+                    ORDER BY sc.total_score DESC"""
+            ).fetchall()
+        ]
+        if not scores:
+            continue
+        for f in cutoffs:
+            rows.append((population, f, _threshold(scores, f), len(scores)))
+    conn.executemany(
+        """INSERT INTO score_percentiles
+           (population, top_fraction, threshold, n_scored)
+           VALUES (?,?,?,?)""",
+        rows,
+    )
+    conn.commit()
+
+
+def top_threshold(conn: sqlite3.Connection, fraction: float = 0.10,
+                  population: str = "all") -> float:
+    """TotalScore needed to be in the top ``fraction`` of ``population``.
+
+    Returns +inf when no threshold is stored (nothing scored yet), so
+    ``score >= threshold`` is never true.
+    """
+    row = conn.execute(
+        """SELECT threshold FROM score_percentiles
+           WHERE population = ? AND abs(top_fraction - ?) < 1e-9""",
+        (population, fraction),
+    ).fetchone()
+    return row[0] if row else float("inf")
+
+
+def percentile_table(conn: sqlite3.Connection,
+                     population: str = "all") -> dict[float, float]:
+    """{top_fraction: threshold} for one population."""
+    return {
+        r[0]: r[1] for r in conn.execute(
+            """SELECT top_fraction, threshold FROM score_percentiles
+               WHERE population = ? ORDER BY top_fraction""",
+            (population,),
+        ).fetchall()
+    }
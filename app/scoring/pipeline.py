@@ -0,0 +1,74 @@
+"""Scoring pipeline – Ver.1 scoring followed by the derived-table stages."""
+
+from __future__ import annotations
+
+import sqlite3
+
+from app.db.schema import bump_data_generation, data_generation, get_meta, set_meta
+from app.scoring.blup import run_blup
+from app.scoring.bootstrap import run_bootstrap
+from app.scoring.engine import run_scoring
+from app.scoring.kinship import run_inbreeding
+from app.scoring.kpi import run_kpis
+from app.scoring.lineage import run_lineage
+from app.scoring.mating import run_mating_plan
+from app.scoring.percentiles import run_percentiles
+from app.scoring.sire import run_sire_evaluation
+
+# (output table, stage) in execution order. Stages read sow_scores /
+# parity_scores written by run_scoring (inbreeding / BLUP only need the
+# pedigree and raw records). Each completed stage is recorded in app_meta
+# under "stage_done:<table>" (value: data_generation it ran against), so
+# an existing DB that predates a stage is filled in once without a full
+# rescore — an empty table alone (no active sires, no breeding records)
+# does not mean the stage is missing.
+STAGES = [
+    ("score_percentiles", run_percentiles),
+    ("lineage_scores", run_lineage),
+    ("sow_rank_intervals", run_bootstrap),
+    ("inbreeding_coefficients", run_inbreeding),
+    ("breeding_values", run_blup),
+    ("sire_scores", run_sire_evaluation),
+    ("mating_plan", run_mating_plan),
+    ("sow_kpis", run_kpis),
+]
+
+
+_DONE = "stage_done:"
+
+
+def _mark_done(conn: sqlite3.Connection, table: str) -> None:
+    set_meta(conn, _DONE + table, str(data_generation(conn)))
+    conn.commit()
+
+
+def run_scoring_pipeline(conn: sqlite3.Connection, progress_cb=None) -> None:
+    """Run the scoring engine and every derived stage."""
+    # Stages left unmarked by an aborted run are picked up by
+    # run_missing_stages on the next start
+    conn.execute("DELETE FROM app_meta WHERE key LIKE ?", (_DONE + "%",))
+    run_scoring(conn, progress_cb=progress_cb)
+    for table, stage in STAGES:
+        stage(conn, progress_cb=progress_cb)
+        _mark_done(conn, table)
+    bump_data_generation(conn)
+
+
+def run_missing_stages(conn: sqlite3.Connection, progress_cb=None) -> int:
+    """Run only the stages that have not completed on this DB.
+
+    DBs from before the completion records count a stage as done when its
+    table has rows. The stages only read existing scores and records, so
+    data_generation (feature store / prediction cache key) is unchanged.
+
+    Returns the number of stages executed.
+    """
+    ran = 0
+    for table, stage in STAGES:
+        if get_meta(conn, _DONE + table) is not None:
+            continue
+        if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None:
+            stage(conn, progress_cb=progress_cb)
+            ran += 1
+        _mark_done(conn, table)
+    return ran
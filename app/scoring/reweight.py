@@ -0,0 +1,207 @@
+"""What-if weight tuning from cached score components.
+
+The z components of every parity row and the offspring-quality z values of
+every sow are loaded once into NumPy arrays.  A :class:`WeightProfile` can
+then be applied in a few vectorised passes, recomputing ParityScore, the
+three axes, TotalScore and both rankings in milliseconds without rerunning
+the scoring engine.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.scoring.engine import (
+    W_LIVE_BORN,
+    W_OFFSPRING,
+    W_OWN_RATE,
+    W_PEAK,
+    W_PS_RATE,
+    W_STABILITY,
+    W_STILLBORN,
+    W_SUSTAIN,
+    W_TOTAL_BORN,
+    W_W_RATE,
+)
+
+
+@dataclass(frozen=True)
+class WeightProfile:
+    """One set of scoring weights (defaults = Ver.1 engine constants)."""
+    live_born: float = W_LIVE_BORN
+    total_born: float = W_TOTAL_BORN
+    stillborn: float = W_STILLBORN
+    own_rate: float = W_OWN_RATE
+    peak: float = W_PEAK
+    stability: float = W_STABILITY
+    sustain: float = W_SUSTAIN
+    offspring: float = W_OFFSPRING
+    w_rate: float = W_W_RATE
+    ps_rate: float = W_PS_RATE
+
+
+DEFAULT_PROFILE_NAME = "Ver.1 標準"
+
+# Named profiles offered in the GUI (first entry = engine default)
+WEIGHT_PROFILES: dict[str, WeightProfile] = {
+    DEFAULT_PROFILE_NAME: WeightProfile(),
+    "産子数重視": WeightProfile(live_born=0.55, total_born=0.30,
+                              stillborn=0.10, own_rate=0.05),
+    "哺育力重視": WeightProfile(live_born=0.35, total_born=0.15,
+                              stillborn=0.15, own_rate=0.35),
+    "持続性重視": WeightProfile(peak=0.25, stability=0.25,
+                              sustain=0.35, offspring=0.15),
+    "子豚品質重視": WeightProfile(peak=0.30, stability=0.20,
+                                sustain=0.20, offspring=0.30),
+}
+
+
+@dataclass
+class ReweightResult:
+    """Sow-level scores for one weight profile (arrays aligned to sow_ids)."""
+    sow_ids: np.ndarray
+    total_score: np.ndarray
+    rank_all: np.ndarray
+    rank_active: np.ndarray   # 0 = not active
+    baseline_rank_all: np.ndarray
+
+    def as_dict(self) -> dict[str, tuple[float, int, int | None, int]]:
+        """{individual_id: (total_score, rank_all, rank_active, baseline_rank_all)}"""
+        return {
+            sid: (float(ts), int(ra), int(rk) if rk else None, int(br))
+            for sid, ts, ra, rk, br in zip(
+                self.sow_ids, self.total_score, self.rank_all,
+                self.rank_active, self.baseline_rank_all)
+        }
+
+
+class ScoreComponents:
+    """Cached per-parity z components and per-sow offspring z values."""
+
+    def __init__(self, sow_ids: np.ndarray, active: np.ndarray,
+                 baseline_rank: np.ndarray, row_sow: np.ndarray,
+                 row_parity: np.ndarray, z: np.ndarray,
+                 z_w_rate: np.ndarray, z_ps_rate: np.ndarray):
+        self.sow_ids = sow_ids
+        self.active = active
+        self.baseline_rank = baseline_rank
+        self.row_sow = row_sow
+        self.row_parity = row_parity
+        self.z = z                      # (n_rows, 4): live, total, still, own_rate
+        self.z_w_rate = z_w_rate
+        self.z_ps_rate = z_ps_rate
+
+        n = len(sow_ids)
+        self.n_parities = np.bincount(row_sow, minlength=n).astype(float)
+        self.peak_row = np.isin(row_parity, (2, 3))
+        self.n_peak = np.bincount(row_sow, weights=self.peak_row, minlength=n)
+
+        # Sustain halves: position of each row within its sow (rows sorted
+        # by sow, parity), first half = positions < n // 2
+        starts = np.r_[0, np.cumsum(self.n_parities)[:-1]].astype(int)
+        pos = np.arange(len(row_sow)) - starts[row_sow]
+        mid = (self.n_parities // 2).astype(int)
+        self.second_half = pos >= mid[row_sow]
+        self.n_second = np.bincount(row_sow, weights=self.second_half,
+                                    minlength=n)
+        self.n_first = self.n_parities - self.n_second
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection) -> ScoreComponents:
+        sows = conn.execute(
+            """SELECT sc.individual_id, sc.rank_all,
+                      COALESCE(sc.z_w_rate, 0) AS z_w_rate,
+                      COALESCE(sc.z_ps_rate, 0) AS z_ps_rate,
+                      s.status = 'active' AS is_active
+               FROM sow_scores sc
+               JOIN sows s ON sc.individual_id = s.individual_id
+               ORDER BY sc.rank_all"""
+        ).fetchall()
+        sow_ids = np.array([r["individual_id"] for r in sows], dtype=object)
+        index = {sid: i for i, sid in enumerate(sow_ids)}
+
+        rows = conn.execute(
+            """SELECT individual_id, parity, z_live_born, z_total_born,
+                      z_stillborn, z_own_rate
+               FROM parity_scores"""
+        ).fetchall()
+        rows = [r for r in rows if r["individual_id"] in index]
+        rows.sort(key=lambda r: (index[r["individual_id"]], r["parity"]))
+
+        return cls(
+            sow_ids=sow_ids,
+            active=np.array([bool(r["is_active"]) for r in sows]),
+            baseline_rank=np.array([r["rank_all"] for r in sows], dtype=int),
+            row_sow=np.array([index[r["individual_id"]] for r in rows],
+                             dtype=int),
+            row_parity=np.array([r["parity"] for r in rows], dtype=int),
+            z=np.array([[r["z_live_born"] or 0.0, r["z_total_born"] or 0.0,
+                         r["z_stillborn"] or 0.0, r["z_own_rate"] or 0.0]
+                        for r in rows], dtype=float).reshape(-1, 4),
+            z_w_rate=np.array([r["z_w_rate"] for r in sows], dtype=float),
+            z_ps_rate=np.array([r["z_ps_rate"] for r in sows], dtype=float),
+        )
+
+    def parity_scores(self, profile: WeightProfile) -> np.ndarray:
+        w = np.array([profile.live_born, profile.total_born,
+                      profile.stillborn, profile.own_rate])
+        return self.z @ w
+
+    def axes(self, parity_scores: np.ndarray
+             ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Peak / Stability / Sustain from per-row parity scores."""
+        n = len(self.sow_ids)
+        cnt = self.n_parities
+        sums = np.bincount(self.row_sow, weights=parity_scores, minlength=n)
+        mean = sums / cnt
+
+        peak_sum = np.bincount(self.row_sow,
+                               weights=parity_scores * self.peak_row,
+                               minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            peak = np.where(self.n_peak > 0, peak_sum / self.n_peak, mean)
+
+            dev = parity_scores - mean[self.row_sow]
+            var = np.bincount(self.row_sow, weights=dev * dev,
+                              minlength=n) / cnt
+            stability = np.where(cnt >= 2, -var, 0.0)
+
+            second = np.bincount(self.row_sow,
+                                 weights=parity_scores * self.second_half,
+                                 minlength=n)
+            first = sums - second
+            sustain = np.where(
+                cnt >= 2, second / self.n_second - first / self.n_first, 0.0)
+        return peak, stability, sustain
+
+    def total_scores(self, profile: WeightProfile) -> np.ndarray:
+        peak, stability, sustain = self.axes(self.parity_scores(profile))
+        oq = profile.w_rate * self.z_w_rate + profile.ps_rate * self.z_ps_rate
+        return (profile.peak * peak + profile.stability * stability +
+                profile.sustain * sustain + profile.offspring * oq)
+
+    def reweight(self, profile: WeightProfile) -> ReweightResult:
+        """Recompute TotalScore and both rankings for a weight profile.
+
+        Ties keep the stored ranking order (sows are held in rank_all order
+        and the sort is stable), so the default profile reproduces it.
+        """
+        total = self.total_scores(profile)
+        order = np.argsort(-total, kind="stable")
+        rank_all = np.empty(len(total), dtype=int)
+        rank_all[order] = np.arange(1, len(total) + 1)
+
+        active_order = order[self.active[order]]
+        rank_active = np.zeros(len(total), dtype=int)
+        rank_active[active_order] = np.arange(1, len(active_order) + 1)
+
+        return ReweightResult(
+            sow_ids=self.sow_ids,
+            total_score=total,
+            rank_all=rank_all,
+            rank_active=rank_active,
+            baseline_rank_all=self.baseline_rank,
+        )
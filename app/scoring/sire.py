@@ -0,0 +1,180 @@
+"""Sire (boar) evaluation from daughters, sired litters and offspring.
+
+Three set-based components per sire, each shrunk toward the herd mean by
+n / (n + ALPHA) like the parity scores of the sow engine:
+
+- daughters: mean TotalScore of his scored daughters (``sows.sire_id``)
+- litters:   parity-adjusted born_alive z of litters he sired
+             (``breeding_records`` ⋈ ``farrowing_records`` on
+             (individual_id, parity); sire = sire_first, else sire_second)
+- offspring: W_RATE / PS_RATE of his piglets (``piglets.sire_id``),
+             z-scored across sires as in the sow offspring quality,
+             shrunk by his graded piglets (W + A/B/C ranks)
+
+    SireScore = W_SIRE_DAUGHTERS·daughters + W_SIRE_LITTERS·litters
+              + W_SIRE_OFFSPRING·offspring
+
+EBVs from ``breeding_values`` are stored alongside for reference.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+
+from app.scoring.engine import ALPHA, W_PS_RATE, W_W_RATE
+from app.scoring.parity_stats import group_stat, load_parity_stats
+
+W_SIRE_DAUGHTERS = 0.40
+W_SIRE_LITTERS = 0.35
+W_SIRE_OFFSPRING = 0.25
+
+
+def _shrink(n: int) -> float:
+    return n / (n + ALPHA) if n > 0 else 0.0
+
+
+def _z_across(values: dict[str, float]) -> dict[str, float]:
+    if not values:
+        return {}
+    vals = list(values.values())
+    mean = sum(vals) / len(vals)
+    sd = math.sqrt(sum((v - mean) ** 2 for v in vals) / len(vals))
+    if sd == 0:
+        return {k: 0.0 for k in values}
+    return {k: (v - mean) / sd for k, v in values.items()}
+
+
+def run_sire_evaluation(conn: sqlite3.Connection, progress_cb=None) -> None:
+    """Rebuild sire_scores."""
+    if progress_cb:
+        progress_cb("種雄豚評価計算中...")
+
+    sires: dict[str, dict] = {}
+
+    def _sire(sid: str) -> dict:
+        return sires.setdefault(sid, {
+            "n_daughters": 0, "n_daughters_scored": 0,
+            "daughter_avg_score": None,
+            "n_litters": 0, "avg_born_alive": None, "litter_z": None,
+            "n_piglets": 0, "n_graded": 0, "w_rate": None, "ps_rate": None,
+            "offspring_z": None,
+        })
+
+    # Daughters
+    for r in conn.execute(
+        """SELECT s.sire_id,
+                  COUNT(*) AS n,
+                  COUNT(sc.total_score) AS n_scored,
+                  AVG(sc.total_score) AS avg_score
+           FROM sows s
+           LEFT JOIN sow_scores sc ON s.individual_id = sc.individual_id
+           WHERE s.sire_id IS NOT NULL AND s.sire_id != ''
+           GROUP BY s.sire_id"""
+    ).fetchall():
+        d = _sire(r["sire_id"])
+        d["n_daughters"] = r["n"]
+        d["n_daughters_scored"] = r["n_scored"]
+        d["daughter_avg_score"] = r["avg_score"]
+
+    # Sired litters, aggregated per (sire, parity) and z-adjusted with the
+    # parity group statistics
+    stats = load_parity_stats(conn)
+    litter_sum_z: dict[str, float] = {}
+    litter_sum_ba: dict[str, float] = {}
+    for r in conn.execute(
+        """SELECT COALESCE(NULLIF(b.sire_first, ''), b.sire_second) AS sire,
+                  f.parity, COUNT(f.born_alive) AS n, SUM(f.born_alive) AS s
+           FROM breeding_records b
+           JOIN farrowing_records f
+             ON b.individual_id = f.individual_id AND b.parity = f.parity
+           WHERE COALESCE(NULLIF(b.sire_first, ''), b.sire_second) IS NOT NULL
+             AND f.born_alive IS NOT NULL
+           GROUP BY sire, f.parity"""
+    ).fetchall():
+        d = _sire(r["sire"])
+        st = group_stat(stats, r["parity"], "born_alive")
+        d["n_litters"] += r["n"]
+        litter_sum_ba[r["sire"]] = litter_sum_ba.get(r["sire"], 0.0) + r["s"]
+        if st.sd > 0:
+            litter_sum_z[r["sire"]] = (litter_sum_z.get(r["sire"], 0.0) +
+                                       (r["s"] - r["n"] * st.mean) / st.sd)
+    for sid, total in litter_sum_ba.items():
+        d = sires[sid]
+        d["avg_born_alive"] = total / d["n_litters"]
+        d["litter_z"] = litter_sum_z.get(sid, 0.0) / d["n_litters"]
+
+    # Offspring outcomes
+    w_rates: dict[str, float] = {}
+    ps_rates: dict[str, float] = {}
+    for r in conn.execute(
+        """SELECT sire_id,
+                  COUNT(*) AS n,
+                  COUNT(CASE WHEN rank = 'W' THEN 1 END) AS w_total,
+                  COUNT(CASE WHEN rank = 'W' AND ps_shipment = 'W'
+                             THEN 1 END) AS w_promoted,
+                  COUNT(CASE WHEN rank IN ('A','B','C') THEN 1 END) AS l_total,
+                  COUNT(CASE WHEN rank IN ('A','B','C') AND ps_shipment = '○'
+                             THEN 1 END) AS ps_sold
+           FROM piglets
+           WHERE sire_id IS NOT NULL AND sire_id != ''
+           GROUP BY sire_id"""
+    ).fetchall():
+        d = _sire(r["sire_id"])
+        d["n_piglets"] = r["n"]
+        d["n_graded"] = r["w_total"] + r["l_total"]
+        if r["w_total"]:
+            w_rates[r["sire_id"]] = d["w_rate"] = r["w_promoted"] / r["w_total"]
+        if r["l_total"]:
+            ps_rates[r["sire_id"]] = d["ps_rate"] = r["ps_sold"] / r["l_total"]
+    z_w, z_ps = _z_across(w_rates), _z_across(ps_rates)
+    for sid in set(z_w) | set(z_ps):
+        sires[sid]["offspring_z"] = (W_W_RATE * z_w.get(sid, 0.0) +
+                                     W_PS_RATE * z_ps.get(sid, 0.0))
+
+    # Daughter scores are centred on the herd mean before shrinkage
+    herd_mean = conn.execute(
+        "SELECT AVG(total_score) FROM sow_scores"
+    ).fetchone()[0] or 0.0
+
+    # By animal_id only: a sire may be typed 'sow' / 'piglet' in the
+    # pedigree (kept piglet, dam)
+    ebv = {
+        r["animal_id"]: (r["ebv_born_alive"], r["ebv_weaned"])
+        for r in conn.execute(
+            "SELECT animal_id, ebv_born_alive, ebv_weaned FROM breeding_values"
+        ).fetchall()
+    }
+
+    rows: list[dict] = []
+    for sid, d in sires.items():
+        daughters = ((d["daughter_avg_score"] - herd_mean) *
+                     _shrink(d["n_daughters_scored"])
+                     if d["daughter_avg_score"] is not None else 0.0)
+        litters = (d["litter_z"] or 0.0) * _shrink(d["n_litters"])
+        offspring = (d["offspring_z"] or 0.0) * _shrink(d["n_graded"])
+        d["sire_id"] = sid
+        d["sire_score"] = (W_SIRE_DAUGHTERS * daughters +
+                           W_SIRE_LITTERS * litters +
+                           W_SIRE_OFFSPRING * offspring)
+        d["ebv_born_alive"], d["ebv_weaned"] = ebv.get(sid, (None, None))
+        rows.append(d)
+
+    rows.sort(key=lambda x: (-x["sire_score"], x["sire_id"]))
+    for rank, d in enumerate(rows, 1):
+        d["rank"] = rank
+
+    conn.execute("DELETE FROM sire_scores")
+    conn.executemany(
+        """INSERT INTO sire_scores
+           (sire_id, n_daughters, n_daughters_scored, daughter_avg_score,
+            n_litters, avg_born_alive, litter_z,
+            n_piglets, w_rate, ps_rate, offspring_z,
+            ebv_born_alive, ebv_weaned, sire_score, rank)
+           VALUES (:sire_id, :n_daughters, :n_daughters_scored,
+                   :daughter_avg_score, :n_litters, :avg_born_alive,
+                   :litter_z, :n_piglets, :w_rate, :ps_rate, :offspring_z,
+                   :ebv_born_alive, :ebv_weaned, :sire_score, :rank)""",
+        rows,
+    )
+    conn.commit()